@@ -0,0 +1,99 @@
+import re
+from typing import List, Dict, Optional
+
+# 默认规则，与原来硬编码的过滤关键词相同
+DEFAULT_FILTER_RULES = {
+    'exclude': {
+        'name': ['Loopback', 'Teredo', 'ISATAP', 'Tunnel', '隧道', '环回', '本地连接* '],
+        'description': ['Microsoft', 'Teredo', 'ISATAP', 'Loopback', 'WAN Miniport',
+                        'Hyper-V', 'Virtual', 'Tailscale', 'Tunnel', 'Wintun'],
+        'mac_prefix': [],
+    },
+    'include': {
+        'name': [],
+        'description': [],
+        'mac_prefix': [],
+    },
+}
+
+_FIELDS = ('name', 'description', 'mac_prefix')
+
+def merge_filter_rules(rules: Optional[Dict]) -> Dict:
+    """把设置中的规则合并到默认规则：每组每个字段在默认模式之后追加设置的模式（去重）。
+    设置了 "replace_defaults": true 时不合并，只使用设置的规则"""
+    if not rules:
+        return DEFAULT_FILTER_RULES
+    if rules.get('replace_defaults'):
+        return rules
+    merged = {}
+    for group in ('include', 'exclude'):
+        defaults, extra = DEFAULT_FILTER_RULES[group], rules.get(group) or {}
+        merged[group] = {field: list(dict.fromkeys(list(defaults[field]) + list(extra.get(field) or [])))
+                         for field in _FIELDS}
+    return merged
+
+def _normalize_mac(mac: Optional[str]) -> str:
+    """物理地址转换为不带分隔符的大写十六进制，便于按前缀匹配"""
+    return (mac or '').replace('-', '').replace(':', '').upper()
+
+def _compile(patterns: List[str], field: str) -> Optional[re.Pattern]:
+    """把同一字段的所有模式合并为一个正则，没有模式时返回None
+
+    名称和描述按子串匹配（区分大小写，与原来的关键词过滤一致），MAC按前缀匹配。
+    """
+    if not patterns:
+        return None
+    if field == 'mac_prefix':
+        return re.compile('^(?:' + '|'.join(re.escape(_normalize_mac(p)) for p in patterns) + ')')
+    return re.compile('|'.join(re.escape(p) for p in patterns))
+
+class AdapterFilter:
+    """适配器过滤规则
+
+    规则按 include / exclude 分组，每组可以按名称、描述和MAC前缀匹配，
+    每个字段的所有模式预先编译为一个正则。匹配任一 exclude 模式的适配器被隐藏，
+    但同时匹配 include 模式时仍然显示；没有描述的适配器总是隐藏。
+    结果按（MAC, 名称, 描述）缓存，重复枚举时只做一次字典查找。
+    """
+
+    def __init__(self, rules: Dict = None):
+        rules = rules if rules is not None else DEFAULT_FILTER_RULES
+        self.rules = {group: {field: list((rules.get(group) or {}).get(field) or []) for field in _FIELDS}
+                      for group in ('include', 'exclude')}
+        self._include = self._compile_group('include')
+        self._exclude = self._compile_group('exclude')
+        self._cache = {}
+
+    def _compile_group(self, group: str) -> tuple:
+        """(名称, 描述, MAC前缀) 三个字段各自的正则"""
+        return tuple(_compile(self.rules[group][field], field) for field in _FIELDS)
+
+    @staticmethod
+    def _matches(compiled: tuple, name: str, description: str, mac: Optional[str]) -> bool:
+        name_re, description_re, mac_re = compiled
+        return bool((name_re and name_re.search(name))
+                    or (description_re and description_re.search(description))
+                    or (mac_re and mac and mac_re.match(_normalize_mac(mac))))
+
+    def is_visible(self, name: str, description: str, mac: str = None) -> bool:
+        """适配器是否应该显示"""
+        key = (mac, name, description)
+        visible = self._cache.get(key)
+        if visible is None:
+            if not description:
+                visible = False
+            elif self._matches(self._exclude, name, description, mac):
+                visible = self._matches(self._include, name, description, mac)
+            else:
+                visible = True
+            self._cache[key] = visible
+        return visible
+
+    def to_dict(self) -> Dict:
+        return {group: {field: list(patterns) for field, patterns in fields.items()}
+                for group, fields in self.rules.items()}
+
+    @classmethod
+    def from_settings(cls, settings: Dict):
+        """从应用设置的 adapter_filter 项创建：设置的模式追加到默认规则（见 merge_filter_rules），未设置时使用默认规则"""
+        return cls(merge_filter_rules(settings.get('adapter_filter')))
@@ -0,0 +1,61 @@
+from typing import List, Optional, Iterable
+from parsers import AdapterRecord
+
+class AdapterIdentity:
+    """单个适配器的稳定标识和各种名称
+
+    key 优先使用物理地址（MAC），没有物理地址（隧道、部分VPN适配器）
+    或物理地址重复时使用 ipconfig 中的适配器名称。
+    connection_name 为 netsh 可识别的连接名称，netsh中没有该接口时为None。
+    """
+    def __init__(self, key: str, name: str, description: str = '', mac: str = None,
+                 connection_name: str = None):
+        self.key = key
+        self.name = name
+        self.description = description
+        self.mac = mac
+        self.connection_name = connection_name
+
+    def __repr__(self):
+        return f"AdapterIdentity({self.key!r}, {self.name!r}, connection={self.connection_name!r})"
+
+class AdapterRegistry:
+    """适配器标识注册表
+
+    由同一份 ipconfig / netsh 快照一次性建立，按 ipconfig 名称、描述和 netsh 连接名称
+    预先建立到适配器标识的索引，查找为字典访问，只做精确匹配（忽略大小写），不做模糊猜测。
+    """
+    def __init__(self, records: List[AdapterRecord], connection_names: Iterable[str]):
+        self.identities = {}
+        self.by_name = {}
+        self.by_description = {}
+        self.by_connection = {}
+
+        connections = {name.lower(): name for name in connection_names}
+        for record in records:
+            key = f"mac:{record.mac.upper()}" if record.mac else f"name:{record.name}"
+            if key in self.identities:
+                key = f"name:{record.name}"
+            identity = AdapterIdentity(key, record.name, record.description, record.mac,
+                                       connections.get(record.name.lower()))
+            self.identities[key] = identity
+            self.by_name.setdefault(record.name.lower(), identity)
+            if record.description:
+                self.by_description.setdefault(record.description.lower(), identity)
+            if identity.connection_name:
+                self.by_connection[identity.connection_name.lower()] = identity
+
+        # netsh中有但ipconfig中没有的接口，只能按连接名称识别
+        for lower, name in connections.items():
+            if lower not in self.by_connection:
+                identity = AdapterIdentity(f"name:{name}", name, connection_name=name)
+                self.identities.setdefault(identity.key, identity)
+                self.by_connection[lower] = identity
+
+    def resolve(self, name: str) -> Optional[AdapterIdentity]:
+        """按连接名称、ipconfig名称或描述查找适配器，找不到时返回None"""
+        lower = name.lower()
+        return self.by_connection.get(lower) or self.by_name.get(lower) or self.by_description.get(lower)
+
+    def __len__(self):
+        return len(self.identities)
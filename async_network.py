@@ -0,0 +1,182 @@
+import asyncio
+import time
+from typing import List, Dict, Optional
+from network_manager import (
+    NetworkManager, NetworkAdapter, NetworkConfig, NetworkScene, ApplyPlan, BulkApplyResult,
+    IPCONFIG_COMMAND, NETSH_CONFIG_COMMAND
+)
+from parsers import index_records
+from snapshot_cache import SnapshotCache
+from readiness import ReadinessProbe, ReadinessResult
+
+class AsyncNetworkManager:
+    """NetworkManager 的 asyncio 接口
+
+    与同步接口共享执行器和快照缓存，命令通过 asyncio 子进程执行，
+    支持取消和整体超时（单条命令的超时由执行器按命令类别确定）。相互独立的查询并发执行，
+    同一时刻的相同查询只启动一个进程。
+    """
+
+    def __init__(self, manager: NetworkManager, timeout: float = 10.0):
+        self.manager = manager
+        self.timeout = timeout
+        self._inflight = {}
+
+    async def _shared(self, key: str, factory):
+        """合并同一时刻的相同查询，单个调用方被取消不影响其他调用方"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _get_ipconfig_records(self):
+        records = self.manager.cache.get('ipconfig')
+        if records is not SnapshotCache.MISSING:
+            return records
+
+        async def query():
+            result = await self.manager.runner.run_async(IPCONFIG_COMMAND)
+            return self.manager._store_ipconfig_result(result)
+        return await self._shared('ipconfig', query)
+
+    async def _get_netsh_configs(self):
+        configs = self.manager.cache.get('netsh_configs')
+        if configs is not SnapshotCache.MISSING:
+            return configs
+
+        async def query():
+            result = await self.manager.runner.run_async(NETSH_CONFIG_COMMAND)
+            return self.manager._store_netsh_result(result)
+        return await self._shared('netsh_configs', query)
+
+    async def get_network_adapters(self, refresh: bool = False, timeout: float = None) -> List[NetworkAdapter]:
+        """异步获取网络适配器列表"""
+        if refresh:
+            self.manager.invalidate_cache()
+        cached = self.manager.cache.get('adapters')
+        if cached is not SnapshotCache.MISSING:
+            return list(cached)
+
+        records = await asyncio.wait_for(self._get_ipconfig_records(), timeout or self.timeout)
+        return self.manager._build_adapters(records)
+
+    async def iter_network_adapters(self, refresh: bool = False, timeout: float = None):
+        """异步逐个生成网络适配器（活跃的先返回），顺序与 get_network_adapters 相同"""
+        manager = self.manager
+        if refresh:
+            manager.invalidate_cache()
+        cached = manager.cache.get('adapters')
+        if cached is not SnapshotCache.MISSING:
+            for adapter in list(cached):
+                yield adapter
+            return
+
+        records = manager.cache.get('ipconfig')
+        if records is SnapshotCache.MISSING:
+            result = await asyncio.wait_for(manager.runner.run_async(IPCONFIG_COMMAND), timeout or self.timeout)
+            records = manager._stream_ipconfig_result(result)
+        for adapter in manager._iter_adapters(records):
+            yield adapter
+
+    async def get_all_current_configs(self, refresh: bool = False, timeout: float = None) -> Dict[str, Dict]:
+        """异步获取所有接口的当前配置"""
+        if refresh:
+            self.manager.invalidate_cache()
+        configs = await asyncio.wait_for(self._get_netsh_configs(), timeout or self.timeout)
+        return {name: dict(config) for name, config in (configs or {}).items()}
+
+    async def get_current_config(self, adapter_name: str, refresh: bool = False,
+                                 timeout: float = None) -> Optional[Dict]:
+        """异步获取当前网络配置，netsh中没有该接口时使用ipconfig备选方案"""
+        configs = await self.get_all_current_configs(refresh=refresh, timeout=timeout)
+        config = configs.get(adapter_name)
+        if config is None:
+            records = await asyncio.wait_for(self._get_ipconfig_records(), timeout or self.timeout)
+            record = index_records(records).get(adapter_name) if records else None
+            config = record.to_config() if record else None
+        return config
+
+    async def get_current_configs(self, adapter_names: List[str], timeout: float = None) -> Dict[str, Optional[Dict]]:
+        """并发获取多个适配器的当前配置"""
+        configs = await asyncio.gather(
+            *[self.get_current_config(name, timeout=timeout) for name in adapter_names]
+        )
+        return dict(zip(adapter_names, configs))
+
+    async def refresh_snapshot(self, timeout: float = None):
+        """丢弃快照并并发重新查询ipconfig和netsh，返回(适配器列表, 全部接口配置)"""
+        self.manager.invalidate_cache()
+        return await asyncio.gather(
+            self.get_network_adapters(timeout=timeout),
+            self.get_all_current_configs(timeout=timeout)
+        )
+
+    async def ping(self, address: str, wait_ms: int = 1000, timeout: float = None) -> bool:
+        """异步ping一次目标地址"""
+        cmd = ['ping', '-n', '1', '-w', str(wait_ms), address]
+        result = await self.manager.runner.run_async(cmd, timeout)
+        return result.returncode == 0
+
+    async def apply_config(self, adapter_name: str, config: NetworkConfig, timeout: float = None,
+                           current_configs: Dict[str, Dict] = None) -> ApplyPlan:
+        """异步应用网络配置，只改写与当前配置不同的部分（超时或取消时终止正在执行的netsh），
+        current_configs 同 NetworkManager.apply_config"""
+        manager = self.manager
+        plan = ApplyPlan(adapter_name, config)
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_event_loop()
+            script = await loop.run_in_executor(None, manager._prepare_apply, plan, current_configs)
+            if script is not None:
+                rollback = manager._finish_apply(plan, await script.run_async(manager.runner, timeout))
+                if rollback is not None:
+                    rollback_start = time.perf_counter()
+                    results = await rollback.run_async(manager.runner, timeout)
+                    manager._finish_rollback(plan, results, time.perf_counter() - rollback_start)
+
+        except asyncio.CancelledError:
+            print(f"应用配置已取消: {adapter_name}")
+            manager.invalidate_cache()
+            raise
+        except Exception as e:
+            manager._fail_apply(plan, f"应用配置失败: {e}")
+        finally:
+            manager._complete_apply(plan, start, invalidate=current_configs is None)
+        return plan
+
+    async def apply_configs(self, assignments: Dict[str, NetworkConfig], max_workers: int = 4,
+                            timeout: float = None) -> BulkApplyResult:
+        """并发切换多个适配器（适配器名称 -> 配置），最多 max_workers 个同时执行"""
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+        # 预先获取一次配置快照，各适配器共享；全部完成后才使快照失效
+        current_configs = await self.get_all_current_configs() if assignments else {}
+
+        async def apply(adapter_name, config):
+            async with semaphore:
+                return await self.apply_config(adapter_name, config, timeout, current_configs)
+
+        plans = dict(zip(assignments, await asyncio.gather(*[apply(name, config)
+                                                               for name, config in assignments.items()])))
+        self.manager._complete_bulk_apply(plans)
+        result = BulkApplyResult(plans, time.perf_counter() - start)
+        print(result)
+        return result
+
+    async def apply_scene(self, scene: NetworkScene, max_workers: int = 4,
+                          timeout: float = None) -> BulkApplyResult:
+        """异步应用多适配器场景，场景中不存在的配置记为失败"""
+        manager = self.manager
+        assignments = manager.resolve_scene(scene)
+        result = await self.apply_configs(
+            {name: config for name, config in assignments.items() if config is not None}, max_workers, timeout
+        )
+        manager._fail_missing_configs(scene, assignments, result)
+        return result
+
+    async def wait_until_ready(self, adapter_name: str, config: NetworkConfig,
+                               deadline: float = 30.0, start: float = None) -> ReadinessResult:
+        """等待切换后的配置生效（地址绑定、DHCP租约、网关可达），返回从 start（切换完成时，time.monotonic()）起的就绪耗时"""
+        return await ReadinessProbe(self.manager, deadline=deadline).wait_async(adapter_name, config, start)
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准工具
+使用录制的命令输出（fixtures）回放，在任意平台上测量解析/切换耗时和进程启动次数
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+import argparse
+import asyncio
+import tracemalloc
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from command_runner import ReplayRunner
+from network_manager import NetworkManager, NetworkConfig, ApplyPlan
+from parsers import parse_ipconfig_all
+from async_network import AsyncNetworkManager
+from netsh_session import NetshSession, NetshSessionRunner
+from command_policy import CommandPolicy
+from readiness import ReadinessProbe
+from adapter_filter import AdapterFilter, DEFAULT_FILTER_RULES
+from profile_store import ProfileStore, SqliteProfileStore, ProfileUsage
+from menu_index import ConfigGroups, usage_sections, pages
+from change_monitor import start_change_source
+from search_index import ProfileSearchIndex, config_tokens
+
+LOCALES = ['zh_CN', 'en_US']
+# netsh设置DNS失败时的提示（用于模拟切换失败）
+DNS_ERRORS = {
+    'zh_CN': "配置的 DNS 服务器不正确或不存在。",
+    'en_US': "The configured DNS server is incorrect or does not exist.",
+}
+# 模拟的交互式netsh，用于测量常驻会话
+FAKE_NETSH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fake_netsh.py')
+
+def create_manager(locale, latency=0.0):
+    """创建使用回放执行器的NetworkManager（配置文件写入临时目录）"""
+    runner = ReplayRunner.from_fixture(locale, latency=latency)
+    manager = NetworkManager(runner=runner)
+    manager._is_admin = lambda: True
+    return manager
+
+def measure(func, repeat):
+    """执行repeat次，返回(平均耗时毫秒, 最后一次结果)"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return elapsed, result
+
+def bench_actions(locale, latency, repeat):
+    """测量各用户操作的耗时和进程启动次数"""
+    print(f"\n=== {locale} (模拟延迟 {latency * 1000:.0f}ms/进程) ===")
+    manager = create_manager(locale, latency)
+    runner = manager.runner
+
+    runner.reset_stats()
+    elapsed, adapters = measure(lambda: manager.get_network_adapters(refresh=True), repeat)
+    print(f"枚举适配器:   {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}  适配器 {len(adapters)} 个")
+    print(f"检测到的输出编码: {runner.encoding}")
+
+    for adapter in adapters:
+        runner.reset_stats()
+        elapsed, config = measure(lambda: manager.get_current_config(adapter.name, refresh=True), repeat)
+        print(f"读取配置 {adapter.name}: {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}  {config}")
+
+    # 所有适配器的配置面板：一次批量查询
+    def dashboard():
+        manager.invalidate_cache()
+        return [manager.get_current_config(adapter.name) for adapter in adapters]
+    runner.reset_stats()
+    elapsed, _ = measure(dashboard, repeat)
+    print(f"读取全部配置: {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}")
+
+    # 启动流程：托盘自动选择适配器 + 主界面加载适配器 + 首次刷新状态 + 网络测试
+    def startup():
+        manager.invalidate_cache()
+        first = manager.get_network_adapters()[0]
+        manager.get_network_adapters()
+        manager.get_current_config(first.name)
+        manager.get_current_config(first.name)
+    runner.reset_stats()
+    elapsed, _ = measure(startup, repeat)
+    print(f"启动流程:     {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}")
+
+    # 异步接口：ipconfig与netsh并发执行
+    async_manager = AsyncNetworkManager(manager)
+    runner.reset_stats()
+    elapsed, _ = measure(lambda: asyncio.run(async_manager.refresh_snapshot()), repeat)
+    print(f"异步刷新快照: {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}")
+
+    # 状态轮询：每次启动netsh与常驻netsh会话对比
+    runner.reset_stats()
+    elapsed, _ = measure(lambda: manager.get_all_current_configs(refresh=True), repeat)
+    print(f"状态轮询:     {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}")
+    session_runner = NetshSessionRunner(runner, NetshSession([sys.executable, FAKE_NETSH, locale]))
+    session_manager = NetworkManager(runner=session_runner)
+    session_manager.get_all_current_configs()
+    session_runner.reset_stats()
+    elapsed, _ = measure(lambda: session_manager.get_all_current_configs(refresh=True), repeat)
+    print(f"会话状态轮询: {elapsed:8.2f}ms  进程数 {session_runner.spawn_count / repeat:.1f}")
+    session_manager.close()
+
+    # 纯解析耗时（不含进程启动）
+    output = runner.run(['ipconfig', '/all']).stdout
+    elapsed, records = measure(lambda: parse_ipconfig_all(output), repeat * 100)
+    print(f"解析ipconfig: {elapsed * 1000:8.1f}us  记录 {len(records)} 条")
+    # 连接名称解析：注册表建立后查找不再启动进程
+    if adapters:
+        manager.adapter_registry()
+        runner.reset_stats()
+        elapsed, connection = measure(lambda: manager._get_connection_name(adapters[-1].description), repeat * 100)
+        print(f"解析连接名称: {elapsed * 1000:8.1f}us  进程数 {runner.spawn_count:.1f}  {connection}")
+
+    if adapters:
+        target = NetworkConfig(name="基准测试", ip="192.168.50.10", subnet="255.255.255.0",
+                               gateway="192.168.50.1", dns1="114.114.114.114", dns2="1.2.4.8")
+        runner.reset_stats()
+        elapsed, success = measure(lambda: manager.apply_config(adapters[0].name, target), repeat)
+        print(f"切换配置:     {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}  结果 {bool(success)}")
+        # 目标与当前配置相同时不执行netsh；只有DNS不同时只改写DNS
+        current = manager.get_current_config(adapters[0].name)
+        same = NetworkConfig(name="当前配置", ip=current.get('ip'), subnet=current.get('subnet'),
+                             gateway=current.get('gateway'), dns1=current.get('dns1'),
+                             dns2=current.get('dns2'), dhcp=current.get('dhcp', False))
+        runner.reset_stats()
+        elapsed, plan = measure(lambda: manager.apply_config(adapters[0].name, same), repeat)
+        print(f"切换到当前配置: {elapsed:6.2f}ms  进程数 {runner.spawn_count / repeat:.1f}  {plan}")
+        # 切换后等待就绪：地址已绑定时只需一次ipconfig和一次ping
+        result = ReadinessProbe(manager).wait(adapters[0].name, same)
+        print(f"切换后就绪:   {result.elapsed * 1000:8.2f}ms  检查 {result.attempts} 次  {result.checks}")
+        dns_only = NetworkConfig(**dict(same.to_dict(), name="只改DNS", dns1="223.5.5.5", dns2=None))
+        runner.reset_stats()
+        elapsed, plan = measure(lambda: manager.apply_config(adapters[0].name, dns_only), repeat)
+        print(f"只改DNS:      {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}  跳过 {plan.skipped}")
+        # 设置DNS失败：一次批量命令恢复切换前的配置
+        responses = dict(runner.responses)
+        failing_dns = f"netsh interface ip set dns name={adapters[0].name} static 223.5.5.5 validate=no"
+        message = DNS_ERRORS[locale]
+        runner.responses = {failing_dns: (0, message, '')}
+        runner.responses.update(responses)
+        runner.reset_stats()
+        plan = manager.apply_config(adapters[0].name, NetworkConfig(**dict(target.to_dict(), dns1="223.5.5.5")))
+        runner.responses = responses
+        print(f"失败后回滚:   {plan.rollback_seconds * 1000:8.2f}ms  进程数 {runner.spawn_count:.1f}  {plan}")
+        script = manager._build_apply_script(adapters[0].name, target)
+        print(f"  单次netsh调用执行 {len(script)} 条命令:")
+        for command in script.commands:
+            print(f"    {' '.join(command)}")
+        # 多适配器同时切换：逐个执行与并发执行的总耗时
+        assignments = {adapter.name: NetworkConfig(**dict(target.to_dict(), name=f"场景{i}",
+                                                          ip=f"192.168.{60 + i}.10", gateway=f"192.168.{60 + i}.1"))
+                       for i, adapter in enumerate(adapters)}
+        for workers in (1, 4):
+            manager.invalidate_cache()
+            runner.reset_stats()
+            result = manager.apply_configs(assignments, max_workers=workers)
+            print(f"切换{len(assignments)}个适配器（{workers}并发）: {result.elapsed * 1000:8.2f}ms  "
+                  f"进程数 {runner.spawn_count:.1f}  结果 {bool(result)}")
+
+    # 命令卡死：超时后熔断，之后直接返回上次成功的快照
+    manager.get_all_current_configs(refresh=True)
+    runner.policy = CommandPolicy(timeouts={'netsh_query': latency})
+    runner.latencies = {'netsh': latency * 10}
+    runner.reset_stats()
+    elapsed, configs = measure(lambda: manager.get_all_current_configs(refresh=True), repeat)
+    print(f"netsh卡死轮询: {elapsed:8.2f}ms  进程数 {runner.spawn_count / repeat:.1f}  返回接口 {len(configs)} 个")
+    print(f"  命令指标: {manager.command_metrics()}")
+
+# 合成的适配器描述（虚拟适配器占多数，模拟Hyper-V、WSL、Docker和VPN较多的主机）
+SYNTHETIC_DESCRIPTIONS = [
+    'Hyper-V Virtual Ethernet Adapter #{}', 'Microsoft Wi-Fi Direct Virtual Adapter #{}',
+    'WAN Miniport (IP) #{}', 'TAP-Windows Adapter V9 #{}', 'Wintun Userspace Tunnel #{}',
+    'Realtek PCIe GbE Family Controller #{}', 'Intel(R) Ethernet Connection I219-LM #{}',
+]
+
+def synthetic_ipconfig(count):
+    """生成包含count个适配器的英文 ipconfig /all 输出"""
+    lines = ["Windows IP Configuration", ""]
+    for i in range(count):
+        description = SYNTHETIC_DESCRIPTIONS[i % len(SYNTHETIC_DESCRIPTIONS)].format(i)
+        lines += [
+            f"Ethernet adapter vEthernet {i}:", "",
+            f"   Description . . . . . . . . . . . : {description}",
+            f"   Physical Address. . . . . . . . . : 00-15-5D-{i >> 8:02X}-{i & 0xFF:02X}-01",
+            f"   DHCP Enabled. . . . . . . . . . . : No",
+            f"   IPv4 Address. . . . . . . . . . . : 172.{16 + i // 250}.{i % 250}.1(Preferred)",
+            f"   Subnet Mask . . . . . . . . . . . : 255.255.255.0", "",
+        ]
+    return '\n'.join(lines)
+
+def keyword_filter(record):
+    """原来的过滤方式：逐个关键词做子串判断"""
+    rules = DEFAULT_FILTER_RULES['exclude']
+    if any(keyword in record.name for keyword in rules['name']) or not record.description:
+        return False
+    return not any(keyword in record.description for keyword in rules['description'])
+
+def bench_adapter_filter(count, repeat):
+    """测量大量适配器时的过滤耗时：逐关键词判断、编译后的规则（首次/缓存）"""
+    print(f"\n=== 适配器过滤 (合成 {count} 个适配器) ===")
+    records = parse_ipconfig_all(synthetic_ipconfig(count))
+    elapsed, visible = measure(lambda: [r for r in records if keyword_filter(r)], repeat)
+    print(f"关键词过滤:   {elapsed * 1000:8.1f}us  显示 {len(visible)} 个")
+    def first_pass():
+        adapter_filter = AdapterFilter()
+        return [r for r in records if adapter_filter.is_visible(r.name, r.description, r.mac)]
+    elapsed, visible = measure(first_pass, repeat)
+    print(f"编译规则首次: {elapsed * 1000:8.1f}us  显示 {len(visible)} 个")
+    adapter_filter = AdapterFilter()
+    elapsed, visible = measure(
+        lambda: [r for r in records if adapter_filter.is_visible(r.name, r.description, r.mac)], repeat)
+    print(f"编译规则缓存: {elapsed * 1000:8.1f}us  显示 {len(visible)} 个")
+    # 在默认规则之外按MAC前缀隐藏Hyper-V适配器（00-15-5D），但保留名称中含 vEthernet 1 的适配器
+    custom = AdapterFilter.from_settings(
+        {'adapter_filter': {'exclude': {'mac_prefix': ['00-15-5D']}, 'include': {'name': ['vEthernet 1']}}})
+    visible = [r for r in records if custom.is_visible(r.name, r.description, r.mac)]
+    print(f"自定义规则:   显示 {len(visible)} 个")
+    # 逐步枚举：第一个适配器可用的时间与完整列表的时间
+    manager = NetworkManager(runner=ReplayRunner({'ipconfig /all': (0, synthetic_ipconfig(count), '')}, 'ascii'))
+    start = time.perf_counter()
+    adapters = manager.iter_network_adapters(refresh=True)
+    next(adapters)
+    first = (time.perf_counter() - start) * 1000
+    rest = sum(1 for _ in adapters) + 1
+    total = (time.perf_counter() - start) * 1000
+    print(f"逐步枚举:     首个适配器 {first:6.2f}ms  全部 {rest} 个 {total:6.2f}ms")
+
+def synthetic_profiles(count):
+    """生成count个站点配置（每个站点50个配置，标签为站点名）"""
+    return [NetworkConfig(f"站点{i // 50}-{i % 50}", f"10.{i // 250 % 256}.{i % 250}.10", "255.255.255.0",
+                          f"10.{i // 250 % 256}.{i % 250}.1", "114.114.114.114", tags=[f"站点{i // 50}"])
+            for i in range(count)]
+
+def bench_profile_store(count, repeat):
+    """测量大量配置时JSON文件与SQLite配置库的加载、查找和保存耗时"""
+    print(f"\n=== 配置库 ({count} 个配置) ===")
+    profiles = synthetic_profiles(count)
+    name, tag, address = profiles[-1].name, profiles[-1].tags[0], profiles[-1].ip
+    stores = [('JSON', ProfileStore('bench_profiles.json', NetworkConfig)),
+              ('SQLite', SqliteProfileStore('bench_profiles.db', NetworkConfig))]
+    for label, store in stores:
+        start = time.perf_counter()
+        store.replace_all(profiles)
+        print(f"{label:6} 写入全部: {(time.perf_counter() - start) * 1000:8.2f}ms")
+        elapsed, _ = measure(store.load, repeat)
+        print(f"{label:6} 加载:     {elapsed:8.2f}ms")
+        elapsed, _ = measure(lambda: store.get(name), repeat * 100)
+        print(f"{label:6} 按名称:   {elapsed * 1000:8.2f}us")
+        elapsed, found = measure(lambda: store.find_by_tag(tag), repeat)
+        print(f"{label:6} 按标签:   {elapsed:8.2f}ms  找到 {len(found)} 个")
+        elapsed, found = measure(lambda: store.find_by_subnet(address), repeat)
+        print(f"{label:6} 按网段:   {elapsed:8.2f}ms  找到 {len(found)} 个")
+        edited = NetworkConfig(**dict(profiles[0].to_dict(), dns2="1.2.4.8"))
+        elapsed, _ = measure(lambda: store.update(edited.name, edited), repeat)
+        print(f"{label:6} 修改一个: {elapsed:8.2f}ms")
+
+class LegacyNetworkConfig:
+    """原来的配置类（普通对象、字符串字段），用于对比"""
+    def __init__(self, name, ip=None, subnet=None, gateway=None, dns1=None, dns2=None, dhcp=False, tags=None):
+        self.name = name
+        self.ip = ip
+        self.subnet = subnet
+        self.gateway = gateway
+        self.dns1 = dns1
+        self.dns2 = dns2
+        self.dhcp = dhcp
+        self.tags = list(tags or [])
+
+    def to_dict(self):
+        return {'name': self.name, 'ip': self.ip, 'subnet': self.subnet, 'gateway': self.gateway,
+                'dns1': self.dns1, 'dns2': self.dns2, 'dhcp': self.dhcp, 'tags': list(self.tags)}
+
+    def __eq__(self, other):
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((self.name, self.ip, self.subnet, self.gateway, self.dns1, self.dns2, self.dhcp))
+
+def bench_config_repr(count, repeat):
+    """对比紧凑配置类与原来的配置类的内存占用、创建、比较、哈希和序列化耗时"""
+    print(f"\n=== 配置对象 ({count} 个) ===")
+    data = [profile.to_dict() for profile in synthetic_profiles(count)]
+    for label, cls in (('原配置类', LegacyNetworkConfig), ('紧凑配置类', NetworkConfig)):
+        # 从JSON重新读取，地址文本不与其他对象共享，统计配置对象保留的全部内存
+        text = json.dumps(data)
+        tracemalloc.start()
+        configs = [cls(**item) for item in json.loads(text)]
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        others = [cls(**item) for item in data]
+        elapsed_new, _ = measure(lambda: [cls(**item) for item in data], repeat)
+        elapsed_eq, _ = measure(lambda: sum(a == b for a, b in zip(configs, others)), repeat)
+        elapsed_hash, _ = measure(lambda: len(set(configs)), repeat)
+        elapsed_dict, _ = measure(lambda: [config.to_dict() for config in configs], repeat)
+        print(f"{label:6} 内存 {memory / count:6.0f}B/个  创建 {elapsed_new:7.2f}ms  比较 {elapsed_eq:7.2f}ms  "
+              f"哈希 {elapsed_hash:7.2f}ms  to_dict {elapsed_dict:7.2f}ms")
+    # 与当前配置比较（切换前判断哪些部分需要改写）
+    manager = NetworkManager.__new__(NetworkManager)
+    current = {'dhcp': False, 'ip': data[0]['ip'], 'subnet': data[0]['subnet'], 'gateway': data[0]['gateway'],
+               'dns1': data[0]['dns1'], 'dns2': None}
+    configs = [NetworkConfig(**item) for item in data]
+    def diff():
+        for config in configs:
+            plan = ApplyPlan('基准', config)
+            manager._plan_apply(plan, current)
+    elapsed, _ = measure(diff, repeat)
+    print(f"与当前配置比较: {elapsed / count * 1000:6.2f}us/个")
+
+def process_memory() -> int:
+    """当前进程的常驻内存（字节，含Qt分配的内存），无法获取时返回0"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                           [(name, ctypes.c_size_t) for name in (
+                               'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                               'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                               'PagefileUsage', 'PeakPagefileUsage')]
+            counters = PROCESS_MEMORY_COUNTERS(cb=ctypes.sizeof(PROCESS_MEMORY_COUNTERS))
+            ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                     ctypes.byref(counters), counters.cb)
+            return counters.WorkingSetSize
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return 0
+
+def bench_config_list_soak(hours, count, legacy_hours=1):
+    """长时间运行：每5秒刷新一次配置列表，每分钟修改一次配置。
+    对比原来的 QListWidget（每次清空重建并再连接一次选择信号）与 ConfigListModel + QListView
+    实际发出的行信号、选择信号的连接数和进程内存；原实现每次选择变化调用的处理函数随刷新次数增长，
+    只模拟前 legacy_hours 小时。需要PyQt5（无界面时使用 offscreen 平台）。"""
+    print(f"\n=== 配置列表长时间运行 ({count} 个配置，模拟 {hours} 小时) ===")
+    try:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtCore import Qt, QItemSelectionModel
+        from PyQt5.QtWidgets import QApplication, QListWidget, QListWidgetItem, QListView
+        from config_list_model import ConfigListModel
+    except ImportError:
+        print("跳过: 未安装PyQt5")
+        return
+    app = QApplication.instance() or QApplication([])
+    ticks_per_hour = 3600 // 5
+    counts = {'rows': 0, 'handled': 0}
+
+    def count_rows(parent, first, last):
+        counts['rows'] += last - first + 1
+
+    def count_changed(top_left, bottom_right, roles=()):
+        counts['rows'] += bottom_right.row() - top_left.row() + 1
+
+    def count_handled(*args):
+        counts['handled'] += 1
+
+    def run(label, hours, refresh, receivers):
+        store = ProfileStore(f'soak_profiles_{label}.json', NetworkConfig)
+        store.replace_all(synthetic_profiles(count))
+        refresh(store)
+        app.processEvents()
+        baseline = process_memory()
+        start = time.perf_counter()
+        for tick in range(1, hours * ticks_per_hour + 1):
+            if tick % 12 == 0:
+                # 轮流修改、新建、删除配置（每轮之后配置数量和内容复原）
+                action = tick // 12 % 3
+                target = store.configs[tick // 36 % 10]
+                if action == 0:
+                    dns = "8.8.8.8" if target.dns1 != "8.8.8.8" else "114.114.114.114"
+                    store.update(target.name, NetworkConfig(target.name, target.ip, target.subnet, target.gateway,
+                                                            dns, tags=target.tags))
+                elif action == 1:
+                    store.add(NetworkConfig("临时配置", dhcp=True))
+                else:
+                    store.remove("临时配置")
+            refresh(store)
+            app.processEvents()
+            if tick % ticks_per_hour == 0:
+                print(f"{label:6} 第{tick // ticks_per_hour:3}小时  行信号 {counts['rows']:9}  "
+                      f"选择处理函数调用 {counts['handled']:10}  选择信号连接 {receivers():6}  "
+                      f"内存 {(process_memory() - baseline) / 1024:+9.1f}KB")
+        elapsed = (time.perf_counter() - start) / (hours * ticks_per_hour) * 1000
+        print(f"{label:6} 每次刷新平均 {elapsed:.3f}ms（含配置修改）")
+
+    # 原实现：QListWidget 清空并逐项重建，每次刷新再连接一次选择变化信号
+    widget = QListWidget()
+    widget.model().rowsInserted.connect(count_rows)
+    widget.model().rowsRemoved.connect(count_rows)
+
+    def refresh_widget(store):
+        widget.clear()
+        for config in store.configs:
+            item = QListWidgetItem(config.name)
+            item.setData(Qt.UserRole, config)
+            widget.addItem(item)
+        if widget.count() > 0:
+            widget.setCurrentRow(0)
+        widget.currentItemChanged.connect(count_handled)
+    run('原实现', min(hours, legacy_hours), refresh_widget,
+        lambda: widget.receivers(widget.currentItemChanged))
+    widget.deleteLater()
+
+    # 模型：修订号未变时跳过，否则按增量发出行信号；选择信号只连接一次
+    counts.update(rows=0, handled=0)
+    model = ConfigListModel()
+    view = QListView()
+    view.setModel(model)
+    # 在Python中创建选择模型，才能用 receivers 统计其信号的连接数
+    selection = QItemSelectionModel(model)
+    view.setSelectionModel(selection)
+    model.rowsInserted.connect(count_rows)
+    model.rowsRemoved.connect(count_rows)
+    model.dataChanged.connect(count_changed)
+    model.modelReset.connect(lambda: count_rows(None, 0, model.rowCount() - 1))
+    selection.currentChanged.connect(count_handled)
+
+    def refresh_model(store):
+        if model.sync(store.configs, store.revision) and not view.currentIndex().isValid():
+            view.setCurrentIndex(model.index(0))
+    run('模型', hours, refresh_model, lambda: selection.receivers(selection.currentChanged))
+    view.deleteLater()
+    app.processEvents()
+
+def bench_tray_menu(count, repeat):
+    """托盘菜单打开前的准备耗时（分组索引、最近使用和常用、展开一个分组），预算 50ms；不含Qt控件本身"""
+    print(f"\n=== 托盘菜单 ({count} 个配置) ===")
+    store = ProfileStore('menu_profiles.json', NetworkConfig)
+    store.replace_all(synthetic_profiles(count))
+    usage = ProfileUsage('menu_usage.json')
+    for config in store.configs[::max(1, count // 20)]:
+        usage.record(config.name)
+
+    def open_menu(groups):
+        groups.sync(store.configs, store.revision)
+        titles = groups.titles()
+        sections = usage_sections(usage, store.get)
+        entries = groups.entries(titles[-1])
+        return len(titles), len(sections['recent']), len(pages(entries, 50))
+
+    elapsed_first, (group_count, _, _) = measure(lambda: open_menu(ConfigGroups()), repeat)
+    groups = ConfigGroups()
+    open_menu(groups)
+    elapsed_again, _ = measure(lambda: open_menu(groups), repeat)
+    target = store.configs[count // 2]
+
+    def edit_and_open():
+        dns = "8.8.8.8" if target.dns1 != "8.8.8.8" else "114.114.114.114"
+        store.update(target.name, NetworkConfig(target.name, target.ip, target.subnet, target.gateway, dns,
+                                                tags=target.tags))
+        start = time.perf_counter()
+        open_menu(groups)
+        return time.perf_counter() - start
+    elapsed_edit = sum(edit_and_open() for _ in range(repeat)) / repeat * 1000
+    print(f"首次打开 {elapsed_first:7.2f}ms  无变化再次打开 {elapsed_again:7.3f}ms  "
+          f"修改一个配置后打开 {elapsed_edit:7.2f}ms  （{group_count} 个分组子菜单，展开时才生成）")
+
+def bench_search(count, repeat):
+    """配置搜索：建立索引、增量更新，以及各类查询与逐个配置扫描的耗时（目标每次查询 1ms 以内）"""
+    print(f"\n=== 配置搜索 ({count} 个配置) ===")
+    profiles = synthetic_profiles(count)
+    elapsed, index = measure(lambda: ProfileSearchIndex(profiles), 1)
+    print(f"建立索引 {elapsed:8.2f}ms")
+    target = profiles[count // 2]
+    renamed = NetworkConfig(target.name + "-改名", target.ip, target.subnet, target.gateway, target.dns1,
+                            tags=target.tags)
+
+    def rename_back_and_forth():
+        index.add(renamed, target.name)
+        index.add(target, renamed.name)
+    elapsed, _ = measure(rename_back_and_forth, repeat * 20)
+    print(f"增量更新 {elapsed * 1000 / 2:8.2f}us/次")
+
+    tokens = [config_tokens(config) for config in profiles]
+
+    def scan(query):
+        # 不用索引：逐个配置检查每个词是否为某个索引词的前缀
+        words = query.lower().split()
+        return [config for config, terms in zip(profiles, tokens)
+                if all(any(term.startswith(word) for term in terms) for word in words)]
+    last = profiles[-1]
+    queries = [last.name, last.tags[0], last.ip, last.ip.rsplit('.', 1)[0] + '.', '10.', '114.114',
+               f"{last.tags[0]} {last.gateway}"]
+    for query in queries:
+        elapsed, found = measure(lambda: index.search(query), repeat * 20)
+        elapsed_limit, _ = measure(lambda: index.search(query, 15), repeat * 20)
+        elapsed_scan, _ = measure(lambda: scan(query), 1)
+        print(f"{query!r:24} 找到 {len(found):6} 个  索引 {elapsed * 1000:8.1f}us  前15个 {elapsed_limit * 1000:8.1f}us  "
+              f"逐个扫描 {elapsed_scan * 1000:9.1f}us")
+
+def bench_change_detection(seconds):
+    """空闲时的开销：5秒轮询（每次查询ipconfig和netsh）与系统变化通知的进程启动次数和CPU时间"""
+    print(f"\n=== 空闲变化检测 ===")
+    manager = create_manager('zh_CN')
+    # 轮询：按单次查询的开销折算
+    manager.runner.reset_stats()
+    cpu = time.process_time()
+    manager.state_fingerprint()
+    cpu = time.process_time() - cpu
+    interval = 5.0
+    print(f"5秒轮询          进程启动 {manager.runner.spawn_count * 3600 / interval:6.0f} 次/小时  "
+          f"CPU {cpu / interval * 1000:6.3f}ms/秒（不含进程本身）")
+    # 系统通知：实际空闲等待
+    source = start_change_source(lambda kinds: None)
+    if source is None:
+        print("系统通知: 不可用")
+        return
+    cpu = time.process_time()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu
+    source.stop()
+    print(f"系统通知 ({source.name:7}) 进程启动 {0:6.0f} 次/小时  CPU {cpu / seconds * 1000:6.3f}ms/秒")
+
+def main():
+    parser = argparse.ArgumentParser(description="网络配置切换工具性能基准")
+    parser.add_argument('--latency', type=float, default=0.05, help="每个进程的模拟启动延迟（秒）")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument('--adapters', type=int, default=500, help="适配器过滤基准的合成适配器数量")
+    parser.add_argument('--profiles', type=int, default=10000, help="配置库基准的配置数量")
+    parser.add_argument('--hours', type=int, default=24, help="配置列表长时间运行基准模拟的小时数")
+    parser.add_argument('--idle', type=float, default=2.0, help="空闲变化检测基准的持续时间（秒）")
+    args = parser.parse_args()
+
+    # 配置文件写入临时目录，避免覆盖用户配置
+    os.chdir(tempfile.mkdtemp(prefix='netswitch_bench_'))
+
+    for locale in LOCALES:
+        bench_actions(locale, args.latency, args.repeat)
+    bench_adapter_filter(args.adapters, args.repeat * 20)
+    bench_profile_store(args.profiles, args.repeat)
+    bench_config_repr(args.profiles, args.repeat)
+    bench_tray_menu(max(args.profiles, 5000), args.repeat)
+    bench_search(args.profiles, args.repeat)
+    bench_config_list_soak(args.hours, min(args.profiles, 200))
+    bench_change_detection(args.idle)
+
+if __name__ == "__main__":
+    main()
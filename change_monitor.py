@@ -0,0 +1,346 @@
+import os
+import sys
+import time
+import socket
+import struct
+import threading
+from typing import Callable, Dict, Optional, Set
+
+# 变化类型：适配器增删/启停、地址、路由、DNS
+LINK = 'link'
+ADDRESS = 'address'
+ROUTE = 'route'
+DNS = 'dns'
+
+class ChangeSource:
+    """网络变化通知源
+
+    start 后在后台线程等待系统通知，短时间内的多次变化合并为一次回调，
+    回调参数为变化类型的集合，在后台线程中调用。
+    子类实现 _open / _wait / _close，_wait 最多阻塞 timeout 秒（None 时最多1秒，以便响应 stop）。
+    _wait 出错时等待 retry_interval 秒再试；连续出错 max_failures 次且设置了 fallback 时，
+    关闭本通知源并改用 fallback（如轮询）。
+    """
+
+    name = 'base'
+    retry_interval = 1.0
+    max_failures = 3
+
+    def __init__(self, debounce: float = 0.5):
+        self.debounce = debounce
+        # 系统通知持续失败时改用的通知源
+        self.fallback = None
+        self._active_fallback = None
+        self._callback = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, callback: Callable[[Set[str]], None]):
+        """打开通知源（失败时抛出OSError）并启动后台线程"""
+        self._callback = callback
+        self._stop.clear()
+        self._open()
+        self._thread = threading.Thread(target=self._run, name=f"change-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._active_fallback is not None:
+            self._active_fallback.stop()
+            self._active_fallback = None
+
+    def _run(self):
+        pending = set()
+        deadline = None
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    kinds = self._wait(timeout)
+                except Exception as e:
+                    failures += 1
+                    print(f"等待网络变化通知失败: {e}")
+                    if self.fallback is not None and failures >= self.max_failures and not self._stop.is_set():
+                        self._start_fallback()
+                        return
+                    self._stop.wait(self.retry_interval)
+                    continue
+                failures = 0
+                if kinds:
+                    pending |= kinds
+                    if deadline is None:
+                        deadline = time.monotonic() + self.debounce
+                if pending and time.monotonic() >= deadline:
+                    changed, pending, deadline = pending, set(), None
+                    try:
+                        self._callback(changed)
+                    except Exception as e:
+                        print(f"处理网络变化通知失败: {e}")
+        finally:
+            self._close()
+
+    def _start_fallback(self):
+        """在通知线程中改用 fallback，stop 时一并停止"""
+        print(f"网络变化通知源 {self.name} 连续失败，改用 {self.fallback.name}")
+        self._active_fallback = self.fallback
+        try:
+            self.fallback.start(self._callback)
+        except Exception as e:
+            self._active_fallback = None
+            print(f"无法启动网络变化通知源 {self.fallback.name}: {e}")
+
+    def _open(self):
+        pass
+
+    def _wait(self, timeout: Optional[float]) -> Set[str]:
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+class PollingChangeSource(ChangeSource):
+    """轮询快照比较（没有系统通知时的备用方案）
+
+    每 interval 秒调用 snapshot 获取 {变化类型: 状态值}，与上次的值比较，
+    值不同的类型即为发生变化的类型；值为None（查询失败）时不比较。
+    """
+
+    name = 'polling'
+
+    def __init__(self, snapshot: Callable[[], Dict[str, object]], interval: float = 5.0,
+                 debounce: float = 0.0):
+        super().__init__(debounce)
+        self.snapshot = snapshot
+        self.interval = interval
+        self._last = {}
+        self._next_poll = 0.0
+
+    def _open(self):
+        # 第一次轮询只建立基准
+        self._last = self._take_snapshot()
+        self._next_poll = time.monotonic() + self.interval
+
+    def _take_snapshot(self) -> Dict[str, object]:
+        try:
+            return self.snapshot() or {}
+        except Exception as e:
+            print(f"轮询网络状态失败: {e}")
+            return {}
+
+    def _wait(self, timeout: Optional[float]) -> Set[str]:
+        wait = self._next_poll - time.monotonic()
+        if timeout is not None:
+            wait = min(wait, timeout)
+        if self._stop.wait(max(0.0, min(wait, 1.0))) or time.monotonic() < self._next_poll:
+            return set()
+        self._next_poll = time.monotonic() + self.interval
+        changed = set()
+        for kind, value in self._take_snapshot().items():
+            if value is None:
+                continue
+            if kind in self._last and self._last[kind] != value:
+                changed.add(kind)
+            self._last[kind] = value
+        return changed
+
+# rtnetlink 多播组和消息类型（linux/rtnetlink.h）
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+_NLMSG_HEADER = struct.Struct('=IHHII')
+_RTM_KINDS = {
+    16: LINK, 17: LINK,        # RTM_NEWLINK / RTM_DELLINK
+    20: ADDRESS, 21: ADDRESS,  # RTM_NEWADDR / RTM_DELADDR
+    24: ROUTE, 25: ROUTE,      # RTM_NEWROUTE / RTM_DELROUTE
+}
+
+def parse_netlink_kinds(data: bytes) -> Set[str]:
+    """解析一次 recv 得到的 netlink 消息，返回其中的变化类型"""
+    kinds = set()
+    offset = 0
+    while offset + _NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSG_HEADER.unpack_from(data, offset)
+        if length < _NLMSG_HEADER.size:
+            break
+        kind = _RTM_KINDS.get(msg_type)
+        if kind:
+            kinds.add(kind)
+        offset += (length + 3) & ~3
+    return kinds
+
+class NetlinkChangeSource(ChangeSource):
+    """Linux rtnetlink 通知（链路、IPv4地址、IPv4路由），DNS 通过 resolv.conf 的修改时间检测"""
+
+    name = 'netlink'
+
+    def __init__(self, debounce: float = 0.5, resolv_conf: str = '/etc/resolv.conf'):
+        super().__init__(debounce)
+        self.resolv_conf = resolv_conf
+        self._sock = None
+        self._resolv_mtime = None
+
+    @staticmethod
+    def available() -> bool:
+        return hasattr(socket, 'AF_NETLINK')
+
+    def _open(self):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        try:
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        self._sock = sock
+        self._resolv_mtime = self._dns_mtime()
+
+    def _dns_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.resolv_conf).st_mtime
+        except OSError:
+            return None
+
+    def _wait(self, timeout: Optional[float]) -> Set[str]:
+        kinds = set()
+        self._sock.settimeout(1.0 if timeout is None else min(timeout, 1.0))
+        try:
+            kinds |= parse_netlink_kinds(self._sock.recv(65536))
+        except socket.timeout:
+            pass
+        mtime = self._dns_mtime()
+        if mtime != self._resolv_mtime:
+            self._resolv_mtime = mtime
+            kinds.add(DNS)
+        return kinds
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+class WindowsChangeSource(ChangeSource):
+    """Windows IP Helper 通知（NotifyAddrChange / NotifyRouteChange），
+    DNS 通过 Tcpip 接口注册表项的修改通知检测，三者在同一个 WaitForMultipleObjects 中等待"""
+
+    name = 'windows'
+
+    _ERROR_IO_PENDING = 997
+    _WAIT_FAILED = 0xFFFFFFFF
+    _INTERFACES_KEY = r"SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces"
+
+    def __init__(self, debounce: float = 0.5):
+        super().__init__(debounce)
+        self._kinds = (ADDRESS, ROUTE, DNS)
+        self._events = {}
+        self._overlapped = {}
+        self._key = None
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform == 'win32'
+
+    def _open(self):
+        import ctypes
+        import winreg
+        from ctypes import wintypes
+
+        class OVERLAPPED(ctypes.Structure):
+            _fields_ = [('Internal', ctypes.c_void_p), ('InternalHigh', ctypes.c_void_p),
+                        ('Offset', wintypes.DWORD), ('OffsetHigh', wintypes.DWORD),
+                        ('hEvent', wintypes.HANDLE)]
+
+        self._ctypes = ctypes
+        self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._iphlpapi = ctypes.WinDLL('iphlpapi')
+        self._advapi32 = ctypes.WinDLL('advapi32')
+        self._kernel32.CreateEventW.restype = wintypes.HANDLE
+        self._kernel32.CreateEventW.argtypes = [ctypes.c_void_p, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+        self._kernel32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE),
+                                                          wintypes.BOOL, wintypes.DWORD]
+        self._kernel32.WaitForMultipleObjects.restype = wintypes.DWORD
+        self._kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        for name in ('NotifyAddrChange', 'NotifyRouteChange'):
+            getattr(self._iphlpapi, name).argtypes = [ctypes.POINTER(wintypes.HANDLE), ctypes.POINTER(OVERLAPPED)]
+        self._iphlpapi.CancelIPChangeNotify.argtypes = [ctypes.POINTER(OVERLAPPED)]
+        self._advapi32.RegNotifyChangeKeyValue.argtypes = [wintypes.HANDLE, wintypes.BOOL, wintypes.DWORD,
+                                                           wintypes.HANDLE, wintypes.BOOL]
+
+        for kind in self._kinds:
+            event = self._kernel32.CreateEventW(None, False, False, None)
+            if not event:
+                raise ctypes.WinError(ctypes.get_last_error())
+            self._events[kind] = event
+        for kind in (ADDRESS, ROUTE):
+            self._overlapped[kind] = OVERLAPPED(hEvent=self._events[kind])
+        self._key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self._INTERFACES_KEY, 0, winreg.KEY_NOTIFY)
+        self._handles = (wintypes.HANDLE * len(self._kinds))(*(self._events[kind] for kind in self._kinds))
+        for kind in self._kinds:
+            self._arm(kind)
+
+    def _arm(self, kind: str):
+        """重新登记一次性通知"""
+        ctypes = self._ctypes
+        if kind == DNS:
+            # REG_NOTIFY_CHANGE_NAME | REG_NOTIFY_CHANGE_LAST_SET，异步
+            error = self._advapi32.RegNotifyChangeKeyValue(self._key.handle, True, 0x1 | 0x4,
+                                                           self._events[kind], True)
+            if error:
+                raise ctypes.WinError(error)
+            return
+        handle = ctypes.wintypes.HANDLE()
+        notify = self._iphlpapi.NotifyAddrChange if kind == ADDRESS else self._iphlpapi.NotifyRouteChange
+        error = notify(ctypes.byref(handle), ctypes.byref(self._overlapped[kind]))
+        if error not in (0, self._ERROR_IO_PENDING):
+            raise ctypes.WinError(error)
+
+    def _wait(self, timeout: Optional[float]) -> Set[str]:
+        milliseconds = int((1.0 if timeout is None else min(timeout, 1.0)) * 1000)
+        index = self._kernel32.WaitForMultipleObjects(len(self._kinds), self._handles, False, milliseconds)
+        if index == self._WAIT_FAILED:
+            # 句柄失效等错误会立即返回，当作超时会空转占满CPU，交给 _run 退避或改用轮询
+            raise self._ctypes.WinError(self._ctypes.get_last_error())
+        if not 0 <= index < len(self._kinds):
+            return set()
+        kind = self._kinds[index]
+        self._arm(kind)
+        # 适配器启用、禁用或插拔网线时地址表随之变化
+        return {LINK, ADDRESS} if kind == ADDRESS else {kind}
+
+    def _close(self):
+        for overlapped in self._overlapped.values():
+            self._iphlpapi.CancelIPChangeNotify(self._ctypes.byref(overlapped))
+        self._overlapped = {}
+        if self._key is not None:
+            self._key.Close()
+            self._key = None
+        for event in self._events.values():
+            self._kernel32.CloseHandle(event)
+        self._events = {}
+
+def start_change_source(callback: Callable[[Set[str]], None],
+                        snapshot: Callable[[], Dict[str, object]] = None,
+                        interval: float = 5.0) -> Optional[ChangeSource]:
+    """启动当前系统可用的通知源，系统通知不可用或运行中持续失败时退回到轮询 snapshot，都不可用时返回None"""
+    candidates = []
+    if WindowsChangeSource.available():
+        candidates.append(WindowsChangeSource())
+    elif NetlinkChangeSource.available():
+        candidates.append(NetlinkChangeSource())
+    if snapshot is not None:
+        polling = PollingChangeSource(snapshot, interval)
+        for source in candidates:
+            source.fallback = polling
+        candidates.append(polling)
+
+    for source in candidates:
+        try:
+            source.start(callback)
+            print(f"网络变化通知源: {source.name}")
+            return source
+        except Exception as e:
+            print(f"无法启动网络变化通知源 {source.name}: {e}")
+    return None
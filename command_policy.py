@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import List, Dict
+
+# 各类命令的超时时间（秒）
+COMMAND_TIMEOUTS = {
+    'ipconfig': 10.0,
+    'netsh_query': 10.0,
+    'netsh_apply': 30.0,
+    'ping': 5.0,
+}
+DEFAULT_TIMEOUT = 15.0
+
+def command_class(args: List[str]) -> str:
+    """命令分类：netsh按查询/修改区分，其他命令按程序名"""
+    if not args:
+        return 'default'
+    if args[0] == 'netsh':
+        return 'netsh_query' if 'show' in args else 'netsh_apply'
+    return args[0]
+
+class CircuitBreaker:
+    """单类命令的熔断器
+
+    连续超时、启动失败或异常终止达到阈值后断开，断开期间直接拒绝执行；
+    经过 reset_timeout 秒后放行一次试探调用，成功则恢复，失败则继续断开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否允许执行，拒绝时计数"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._probing):
+                self.rejected += 1
+                return False
+            if self.state == self.HALF_OPEN:
+                self._probing = True
+            self.calls += 1
+            return True
+
+    def release(self):
+        """试探调用被取消时归还试探名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            self._probing = False
+
+    def record_failure(self, timed_out: bool = False):
+        with self._lock:
+            self.failures += 1
+            if timed_out:
+                self.timeouts += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"命令连续失败 {self.consecutive_failures} 次，暂停执行 {self.reset_timeout:g} 秒")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'calls': self.calls,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+            }
+
+class CommandPolicy:
+    """外部命令的统一执行策略：按命令类别的超时时间和熔断器"""
+
+    def __init__(self, timeouts: Dict[str, float] = None, failure_threshold: int = 3,
+                 reset_timeout: float = 30.0):
+        self.timeouts = dict(COMMAND_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, args: List[str]) -> float:
+        return self.timeouts.get(command_class(args), DEFAULT_TIMEOUT)
+
+    def breaker_for(self, args: List[str]) -> CircuitBreaker:
+        name = command_class(args)
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[name]
+
+    def metrics(self) -> Dict[str, Dict]:
+        """各类命令的熔断状态和超时/失败/拒绝计数"""
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {name: breaker.metrics() for name, breaker in breakers.items()}
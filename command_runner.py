@@ -0,0 +1,347 @@
+import asyncio
+import subprocess
+import json
+import os
+import signal
+import sys
+import time
+from typing import List, Dict, Optional
+from command_policy import CommandPolicy
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 无法从控制台代码页确定编码时，按顺序尝试的候选编码
+CANDIDATE_ENCODINGS = ['gbk', 'utf-8', 'cp936', 'gb2312']
+
+def format_command(args: List[str]) -> str:
+    """将参数列表格式化为命令行字符串（用于日志、统计和回放匹配）"""
+    return ' '.join(args)
+
+def console_encoding() -> Optional[str]:
+    """根据控制台代码页获取命令输出编码（仅Windows，无控制台时使用OEM代码页）"""
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        code_page = kernel32.GetConsoleOutputCP() or kernel32.GetOEMCP()
+    except Exception:
+        return None
+    if not code_page:
+        return None
+    return 'utf-8' if code_page == 65001 else f'cp{code_page}'
+
+def kill_process_tree(pid: int):
+    """终止进程及其所有子进程（非Windows平台要求进程以新会话启动）"""
+    try:
+        if sys.platform == 'win32':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)], capture_output=True,
+                           timeout=5, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+# 子进程单独成组，超时时可以连同其子进程一起终止
+POPEN_KWARGS = {'creationflags': getattr(subprocess, 'CREATE_NO_WINDOW', 0)}
+if sys.platform != 'win32':
+    POPEN_KWARGS['start_new_session'] = True
+
+def _abnormal_exit(returncode: int) -> bool:
+    """进程是否异常终止：被信号终止（负数，netsh会话意外退出时也为-1）或Windows的错误状态码（如 0xC0000005 崩溃）"""
+    return returncode < 0 or returncode >= 0xC0000000
+
+class CommandResult:
+    """外部命令执行结果（raw_stdout/raw_stderr 为原始字节，stdout/stderr 为解码后的文本）
+
+    超时（timed_out）或被熔断器拒绝（rejected）时返回码为 -1，stderr 为原因说明。
+    """
+    def __init__(self, args: List[str], returncode: int, raw_stdout: bytes = b'', raw_stderr: bytes = b'',
+                 timed_out: bool = False, rejected: bool = False):
+        self.args = args
+        self.returncode = returncode
+        self.raw_stdout = raw_stdout
+        self.raw_stderr = raw_stderr
+        self.timed_out = timed_out
+        self.rejected = rejected
+        self.stdout = ''
+        self.stderr = ''
+
+    def __str__(self):
+        return f"{format_command(self.args)} -> {self.returncode}"
+
+class CommandRunner:
+    """命令执行器基类
+
+    NetworkManager 中所有的 ipconfig / netsh 调用都通过执行器完成，
+    执行器同时记录每次启动的进程，便于统计一次用户操作的开销。
+    输出只捕获一次原始字节，编码在首次解码时确定并缓存，之后所有命令复用。
+    所有命令按 policy 中所属类别的超时时间执行，超时终止整个进程树；
+    同类命令连续超时、无法启动或异常终止时熔断，熔断期间直接返回被拒绝的结果。
+    """
+
+    def __init__(self, policy: CommandPolicy = None):
+        self.calls = []
+        self.encoding = None
+        self.policy = policy or CommandPolicy()
+
+    def run(self, args: List[str], input: str = None, timeout: float = None) -> CommandResult:
+        """执行命令并返回结果，input为写入标准输入的文本，timeout默认按命令类别确定"""
+        breaker = self.policy.breaker_for(args)
+        if not breaker.allow():
+            return self._rejected_result(args)
+        timeout = timeout or self.policy.timeout_for(args)
+        self.calls.append(format_command(args))
+        try:
+            result = self._execute(args, self._encode_input(input), timeout)
+        except OSError:
+            breaker.record_failure()
+            raise
+        return self._finish(breaker, result, timeout)
+
+    async def run_async(self, args: List[str], timeout: float = None, input: str = None) -> CommandResult:
+        """异步执行命令，超时时终止子进程并返回超时结果，被取消时终止子进程"""
+        breaker = self.policy.breaker_for(args)
+        if not breaker.allow():
+            return self._rejected_result(args)
+        timeout = timeout or self.policy.timeout_for(args)
+        self.calls.append(format_command(args))
+        try:
+            result = await asyncio.wait_for(self._execute_async(args, self._encode_input(input), timeout), timeout)
+        except asyncio.TimeoutError:
+            result = CommandResult(args, -1, timed_out=True)
+        except OSError:
+            breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # 取消不代表命令有问题，归还半开状态下的试探名额
+            breaker.release()
+            raise
+        return self._finish(breaker, result, timeout)
+
+    def _finish(self, breaker, result: CommandResult, timeout: float) -> CommandResult:
+        """记录执行结果并解码输出"""
+        result = self._decode_result(result)
+        if result.timed_out:
+            breaker.record_failure(timed_out=True)
+            result.stderr = f"命令执行超时（{timeout:g}秒）: {format_command(result.args)}"
+        elif _abnormal_exit(result.returncode):
+            breaker.record_failure()
+        else:
+            # 正常结束时返回码非0是命令本身的应答（ping目标不可达、netsh找不到接口或参数错误），
+            # 很快返回且结果确定，不拖慢其他操作，不计为失败；否则等待网络就绪时的几次ping失败
+            # 就会让之后所有的ping被拒绝，删除一块网卡后的几次查询也会暂停全部netsh查询
+            breaker.record_success()
+        return result
+
+    def _rejected_result(self, args: List[str]) -> CommandResult:
+        result = CommandResult(args, -1, rejected=True)
+        result.stderr = f"命令连续失败，暂停执行: {format_command(args)}"
+        return result
+
+    def metrics(self) -> Dict[str, Dict]:
+        """各类命令的熔断状态和超时/失败/拒绝计数"""
+        return self.policy.metrics()
+
+    def _encode_input(self, text: Optional[str]) -> Optional[bytes]:
+        """按命令输出的编码编码标准输入（命令行程序按控制台代码页读取）"""
+        if text is None:
+            return None
+        if self.encoding is None:
+            self.encoding = self._detect_encoding()
+        return text.encode(self.encoding or CANDIDATE_ENCODINGS[0], errors='replace')
+
+    def _decode_result(self, result: CommandResult) -> CommandResult:
+        """解码输出，并与文本模式一致统一换行符"""
+        result.stdout = self.decode(result.raw_stdout).replace('\r\n', '\n')
+        result.stderr = self.decode(result.raw_stderr).replace('\r\n', '\n')
+        return result
+
+    def _execute(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        raise NotImplementedError
+
+    async def _execute_async(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        """默认在线程池中执行同步实现"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._execute, args, input, timeout)
+
+    def _detect_encoding(self) -> Optional[str]:
+        """检测输出编码，返回None时按候选编码逐个尝试"""
+        return None
+
+    def decode(self, data: bytes) -> str:
+        """使用缓存的编码解码命令输出"""
+        if not data:
+            return ''
+        if self.encoding is None:
+            self.encoding = self._detect_encoding()
+        if self.encoding:
+            try:
+                return data.decode(self.encoding)
+            except UnicodeDecodeError:
+                pass
+
+        for encoding in CANDIDATE_ENCODINGS:
+            try:
+                text = data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+            print(f"命令输出编码: {encoding}")
+            self.encoding = encoding
+            return text
+
+        return data.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def spawn_count(self) -> int:
+        """已启动的进程数"""
+        return len(self.calls)
+
+    def reset_stats(self):
+        """清空调用记录"""
+        self.calls = []
+
+    def close(self):
+        """释放执行器持有的资源（常驻进程等）"""
+        pass
+
+class SubprocessRunner(CommandRunner):
+    """真实执行器：直接启动系统命令"""
+
+    def _detect_encoding(self) -> Optional[str]:
+        return console_encoding()
+
+    def _execute(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        process = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            **POPEN_KWARGS
+        )
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # 终止整个进程树并回收进程，避免遗留僵尸进程
+            kill_process_tree(process.pid)
+            process.kill()
+            stdout = stderr = b''
+            try:
+                # 保留超时前的输出
+                stdout, stderr = process.communicate(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+            return CommandResult(args, -1, stdout or b'', stderr or b'', timed_out=True)
+        return CommandResult(args, process.returncode, stdout, stderr)
+
+    async def _execute_async(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            **POPEN_KWARGS
+        )
+        try:
+            stdout, stderr = await process.communicate(input)
+        except BaseException:
+            # 超时或被取消时终止进程树，避免遗留僵尸进程
+            if process.returncode is None:
+                kill_process_tree(process.pid)
+                process.kill()
+                await process.wait()
+            raise
+        return CommandResult(args, process.returncode, stdout, stderr)
+
+class ReplayRunner(CommandRunner):
+    """回放执行器：用录制的命令输出应答，不启动任何进程
+
+    responses 的键为命令行字符串，以 '*' 结尾的键按前缀匹配；
+    值为 (returncode, stdout, stderr)。输出按录制时的控制台编码转换为原始字节，
+    解码与真实执行器一样经过编码检测，从而还原真实环境中的编码问题。
+    """
+
+    def __init__(self, responses: Dict[str, tuple], encoding: str = 'gbk',
+                 latency: float = 0.0, latencies: Dict[str, float] = None,
+                 unknown_command: str = "The following command was not found: {command}."):
+        super().__init__()
+        self.responses = dict(responses)
+        self.console_encoding = encoding
+        self.unknown_command = unknown_command
+        self.latency = latency
+        self.latencies = latencies or {}
+
+    @classmethod
+    def from_fixture(cls, locale: str, latency: float = 0.0,
+                     latencies: Dict[str, float] = None, fixtures_dir: str = None):
+        """从 fixtures/<locale>/manifest.json 加载录制的输出"""
+        locale_dir = os.path.join(fixtures_dir or FIXTURES_DIR, locale)
+        with open(os.path.join(locale_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        responses = {}
+        for command, entry in manifest['commands'].items():
+            stdout = entry.get('stdout', '')
+            if 'file' in entry:
+                with open(os.path.join(locale_dir, entry['file']), 'r', encoding='utf-8') as f:
+                    stdout = f.read()
+            responses[command] = (entry.get('returncode', 0), stdout, entry.get('stderr', ''))
+
+        kwargs = {}
+        if 'unknown_command' in manifest:
+            kwargs['unknown_command'] = manifest['unknown_command']
+        return cls(responses, encoding=manifest.get('encoding', 'gbk'),
+                   latency=latency, latencies=latencies, **kwargs)
+
+    def _lookup(self, command: str) -> Optional[tuple]:
+        if command in self.responses:
+            return self.responses[command]
+        for key, response in self.responses.items():
+            if key.endswith('*') and command.startswith(key[:-1]):
+                return response
+        return None
+
+    def _execute(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        delay = self.latencies.get(args[0], self.latency)
+        # 延迟超过超时时间时模拟命令卡死
+        if delay > timeout:
+            time.sleep(timeout)
+            return CommandResult(args, -1, timed_out=True)
+        if delay:
+            time.sleep(delay)
+        return self._replay(args, input)
+
+    async def _execute_async(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        delay = self.latencies.get(args[0], self.latency)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._replay(args, input)
+
+    def _replay(self, args: List[str], input: Optional[bytes]) -> CommandResult:
+        if args == ['netsh'] and input is not None:
+            return self._replay_netsh_stdin(args, input)
+
+        response = self._lookup(format_command(args))
+        if response is None:
+            message = f"回放数据中没有该命令: {format_command(args)}"
+            return CommandResult(args, 1, b'', message.encode(self.console_encoding, errors='replace'))
+
+        returncode, stdout, stderr = response
+        return CommandResult(args, returncode, stdout.encode(self.console_encoding),
+                             stderr.encode(self.console_encoding))
+
+    def _replay_netsh_stdin(self, args: List[str], input: bytes) -> CommandResult:
+        """模拟从标准输入读取命令的交互式netsh：逐行应答，每条命令前输出提示符"""
+        output = []
+        for line in input.decode(self.console_encoding).splitlines():
+            line = line.strip()
+            output.append('netsh>')
+            if line in ('exit', 'quit', 'bye'):
+                break
+            if line:
+                output.append(self.netsh_response(line))
+        return CommandResult(args, 0, '\n'.join(output).encode(self.console_encoding), b'')
+
+    def netsh_response(self, line: str) -> str:
+        """交互式netsh对一行命令的应答文本（未录制的命令按未知命令应答）"""
+        # 录制数据的键不带引号（name="以太网 2" 与 name=以太网 2 等价）
+        command = line.replace('"', '')
+        response = self._lookup(f"netsh {command}")
+        if response is None:
+            return self.unknown_command.format(command=line)
+        returncode, stdout, stderr = response
+        return stdout + stderr
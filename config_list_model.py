@@ -0,0 +1,77 @@
+from typing import List, Optional
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from profile_store import diff_configs
+
+class ConfigListModel(QAbstractListModel):
+    """配置列表模型
+
+    sync 只在配置修订号变化时比较新旧列表，并按增量发出插入、删除和数据变化信号，
+    视图中的选中项和滚动位置随之保留；只有配置顺序改变时才整体重建。
+    """
+
+    ConfigRole = Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._configs = []
+        self._rows = None
+        self._revision = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._configs)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._configs):
+            return None
+        config = self._configs[index.row()]
+        if role == Qt.DisplayRole:
+            return config.name
+        if role == Qt.ToolTipRole:
+            return "DHCP" if config.dhcp else f"{config.ip or ''}/{config.subnet or ''}"
+        if role == self.ConfigRole:
+            return config
+        return None
+
+    def config_at(self, row: int):
+        """指定行的配置，超出范围时返回None"""
+        return self._configs[row] if 0 <= row < len(self._configs) else None
+
+    def row_of(self, name: str) -> int:
+        """配置所在的行，不存在时返回-1"""
+        if self._rows is None:
+            self._rows = {config.name: row for row, config in enumerate(self._configs)}
+        return self._rows.get(name, -1)
+
+    def sync(self, configs, revision: Optional[int] = None) -> bool:
+        """与配置列表同步，修订号未变时直接返回；返回列表是否有变化"""
+        if revision is not None and revision == self._revision:
+            return False
+        self._revision = revision
+        configs = list(configs)
+        operations = diff_configs(self._configs, configs)
+        if operations is None:
+            self.beginResetModel()
+            self._configs = configs
+            self._rows = None
+            self.endResetModel()
+            return True
+
+        for operation in operations:
+            kind, first = operation[0], operation[1]
+            if kind == 'remove':
+                self.beginRemoveRows(QModelIndex(), first, operation[2])
+                del self._configs[first:operation[2] + 1]
+                self._rows = None
+                self.endRemoveRows()
+            elif kind == 'insert':
+                self.beginInsertRows(QModelIndex(), first, operation[2])
+                self._configs[first:first] = configs[first:operation[2] + 1]
+                self._rows = None
+                self.endInsertRows()
+            else:
+                self._configs[first] = configs[first]
+                index = self.index(first)
+                self.dataChanged.emit(index, index)
+        # 内容相同但重新创建的配置对象也换成新的
+        self._configs = configs
+        return bool(operations)
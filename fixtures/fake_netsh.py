@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟交互式netsh
+按回放数据应答标准输入中的命令，用于在非Windows平台测试常驻netsh会话（NetshSession）
+
+用法: python fake_netsh.py <locale>
+测试用命令: __hang__ 之后不再应答（模拟卡死），__die__ 立即退出（模拟崩溃）
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_runner import ReplayRunner
+
+def main():
+    runner = ReplayRunner.from_fixture(sys.argv[1] if len(sys.argv) > 1 else 'zh_CN')
+    stdout = sys.stdout.buffer
+
+    def write(text):
+        stdout.write(text.replace('\n', '\r\n').encode(runner.console_encoding))
+        stdout.flush()
+
+    while True:
+        write('netsh>')
+        line = sys.stdin.buffer.readline()
+        if not line:
+            break
+        line = line.decode(runner.console_encoding).strip()
+        if line in ('exit', 'quit', 'bye'):
+            break
+        if line == '__hang__':
+            while True:
+                time.sleep(60)
+        if line == '__die__':
+            sys.exit(1)
+        if line:
+            write(runner.netsh_response(line) + '\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import socket
+import struct
+from typing import Optional, Union
+
+_UINT32 = struct.Struct('!I')
+
+def pack(address: str) -> int:
+    """点分十进制IPv4地址转换为32位整数，不是规范的点分十进制地址时抛出ValueError"""
+    try:
+        packed = socket.inet_aton(address)
+    except (OSError, ValueError, TypeError):
+        raise ValueError(f"无效的IPv4地址: {address}") from None
+    # inet_aton 也接受 "10.1"、"010.0.0.1" 等写法，只认可能原样还原的规范写法
+    if socket.inet_ntoa(packed) != address:
+        raise ValueError(f"无效的IPv4地址: {address}")
+    return _UINT32.unpack(packed)[0]
+
+def unpack(value: int) -> str:
+    """32位整数转换为点分十进制IPv4地址"""
+    return socket.inet_ntoa(_UINT32.pack(value))
+
+def compact(address: Optional[str]) -> Union[int, str, None]:
+    """紧凑保存的地址：规范的点分十进制地址转换为整数，
+    其他文本（空字符串、前导零、非法地址等）原样保留，保证 expand(compact(x)) == x"""
+    # 未填写的地址很常见（DHCP配置、没有备用DNS），不经过异常处理
+    if not address:
+        return address
+    try:
+        packed = socket.inet_aton(address)
+    except (OSError, ValueError, TypeError):
+        return address
+    return _UINT32.unpack(packed)[0] if socket.inet_ntoa(packed) == address else address
+
+def expand(value: Union[int, str, None]) -> Optional[str]:
+    """compact 的逆操作"""
+    if value.__class__ is int:
+        return socket.inet_ntoa(_UINT32.pack(value))
+    return value
+
+# 前缀长度 /0 到 /32 对应的子网掩码（整数和点分十进制）及反向索引
+MASKS = tuple((0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF for prefix in range(33))
+NETMASKS = tuple(unpack(mask) for mask in MASKS)
+_PREFIX_BY_MASK = {mask: prefix for prefix, mask in enumerate(MASKS)}
+_PREFIX_BY_NETMASK = {netmask: prefix for prefix, netmask in enumerate(NETMASKS)}
+
+def prefix_to_netmask(prefix_length: int) -> str:
+    """前缀长度转换为子网掩码，超出 0-32 时抛出ValueError"""
+    if not 0 <= prefix_length <= 32:
+        raise ValueError(f"无效的前缀长度: {prefix_length}")
+    return NETMASKS[prefix_length]
+
+def netmask_to_prefix(netmask: Union[int, str]) -> int:
+    """子网掩码（整数或点分十进制）转换为前缀长度，掩码不连续或无效时抛出ValueError"""
+    prefix = (_PREFIX_BY_MASK if netmask.__class__ is int else _PREFIX_BY_NETMASK).get(netmask)
+    if prefix is None:
+        raise ValueError(f"子网掩码无效或不连续: {netmask}")
+    return prefix
+
+def is_valid_netmask(netmask: Union[int, str]) -> bool:
+    """是否为连续的子网掩码"""
+    return netmask in (_PREFIX_BY_MASK if netmask.__class__ is int else _PREFIX_BY_NETMASK)
+
+def check_interface(ip: Union[int, str, None], netmask: Union[int, str, None],
+                    gateway: Union[int, str, None] = None) -> Optional[str]:
+    """检查静态地址配置（参数为 compact 形式），返回错误说明，没有问题时返回None"""
+    if ip.__class__ is not int:
+        return f"IP地址无效: {ip}" if ip else "缺少IP地址"
+    if netmask is None or netmask == '':
+        return "缺少子网掩码"
+    if netmask.__class__ is not int or netmask not in _PREFIX_BY_MASK or not netmask:
+        return f"子网掩码无效或不连续: {expand(netmask)}"
+    prefix = _PREFIX_BY_MASK[netmask]
+    if prefix <= 30:
+        # /31、/32 没有网络地址和广播地址
+        host = ip & ~netmask & 0xFFFFFFFF
+        if host == 0:
+            return f"IP地址 {unpack(ip)} 是网络地址（/{prefix}）"
+        if host == ~netmask & 0xFFFFFFFF:
+            return f"IP地址 {unpack(ip)} 是广播地址（/{prefix}）"
+    if gateway is not None and gateway != '':
+        if gateway.__class__ is not int:
+            return f"默认网关无效: {gateway}"
+        if gateway == ip:
+            return "默认网关不能与IP地址相同"
+    return None
+
+def check_gateway(ip: Union[int, str, None], netmask: Union[int, str, None],
+                  gateway: Union[int, str, None]) -> Optional[str]:
+    """默认网关不在IP地址所在网段时返回提示（参数为 compact 形式）。
+    Windows 允许这样配置（网关通过 on-link 路由可达），因此只作为提醒，不拒绝应用"""
+    if ip.__class__ is not int or gateway.__class__ is not int or netmask not in _PREFIX_BY_MASK:
+        return None
+    if gateway & netmask != ip & netmask:
+        return f"默认网关 {unpack(gateway)} 不在 {unpack(ip & netmask)}/{_PREFIX_BY_MASK[netmask]} 网段内"
+    return None
+
+class AddressField:
+    """以 compact 形式保存在指定槽位中的地址属性，读写时为点分十进制字符串"""
+
+    def __init__(self, slot: str):
+        self.slot = slot
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return expand(getattr(obj, self.slot))
+
+    def __set__(self, obj, value):
+        setattr(obj, self.slot, compact(value))
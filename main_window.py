@@ -7,30 +7,49 @@
 import sys
 import json
 import os
+import asyncio
+import time
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QGroupBox, QListWidget, QListWidgetItem,
+    QPushButton, QGroupBox, QListView,
     QMessageBox, QSplitter, QTextEdit, QFrame, QComboBox,
-    QCheckBox
+    QCheckBox, QLineEdit
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QIcon
 from network_manager import NetworkManager, NetworkConfig
-from system_tray import NetworkConfigDialog
+from async_network import AsyncNetworkManager
+from qt_workers import AsyncBridge, StatusRefresher
+from config_list_model import ConfigListModel
+from system_tray import NetworkConfigDialog, SceneDialog
 
 class MainWindow(QMainWindow):
     """主界面窗口"""
     
-    def __init__(self, network_manager, current_adapter=None):
+    def __init__(self, network_manager, current_adapter=None, change_notifier=None):
         super().__init__()
         self.network_manager = network_manager
         self.current_adapter = current_adapter
+        self.change_notifier = change_notifier
+        # 查询在后台事件循环中执行，避免阻塞界面线程
+        self.async_manager = AsyncNetworkManager(network_manager)
+        self.async_bridge = AsyncBridge(self)
         self.settings_file = 'app_settings.json'
         self.settings = self.load_settings()
+        # 每次加载适配器递增，丢弃过期加载的结果
+        self._adapter_generation = 0
         self.init_ui()
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.refresh_status)
-        self.refresh_timer.start(5000)  # 每5秒刷新一次
+        # 在后台刷新当前配置，上一次未完成时跳过
+        self.refresher = StatusRefresher(
+            self.async_bridge, lambda adapter: self.async_manager.get_current_config(adapter.name), 5000, self)
+        self.refresher.refreshed.connect(self.show_current_config)
+        self.refresher.failed.connect(lambda adapter, error: self.show_current_config(adapter, None))
+        if self.change_notifier is not None and self.change_notifier.available:
+            # 只在适配器、地址、路由或DNS实际变化时刷新
+            self.change_notifier.changed.connect(self.on_network_changed)
+        else:
+            # 没有变化通知时每5秒刷新一次，窗口隐藏时暂停
+            self.refresher.start()
         self.load_adapters()
         self.refresh_status()
     
@@ -106,7 +125,7 @@ class MainWindow(QMainWindow):
         config_layout.addWidget(self.status_text)
         
         refresh_btn = QPushButton("刷新状态")
-        refresh_btn.clicked.connect(self.refresh_status)
+        refresh_btn.clicked.connect(self.force_refresh)
         config_layout.addWidget(refresh_btn)
         
         status_layout.addWidget(config_group)
@@ -136,8 +155,20 @@ class MainWindow(QMainWindow):
         list_group = QGroupBox("网络配置模板")
         list_layout = QVBoxLayout(list_group)
         
-        self.config_list = QListWidget()
-        self.config_list.itemDoubleClicked.connect(self.apply_selected_config)
+        # 按名称、IP、网关、DNS、标签即时筛选
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("搜索配置：名称、IP、网关、DNS、标签")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(lambda text: self.refresh_config_list())
+        list_layout.addWidget(self.filter_edit)
+        
+        # 模型按增量更新，信号只在这里连接一次
+        self.config_model = ConfigListModel(self)
+        self.config_list = QListView()
+        self.config_list.setModel(self.config_model)
+        self.config_list.setSelectionMode(QListView.SingleSelection)
+        self.config_list.doubleClicked.connect(self.apply_selected_config)
+        self.config_list.selectionModel().currentChanged.connect(self.on_config_selection_changed)
         list_layout.addWidget(self.config_list)
         
         # 配置操作按钮
@@ -162,6 +193,28 @@ class MainWindow(QMainWindow):
         list_layout.addLayout(config_btn_layout)
         config_layout.addWidget(list_group)
         
+        # 多适配器场景
+        scene_group = QGroupBox("网络场景（多适配器）")
+        scene_layout = QHBoxLayout(scene_group)
+        
+        self.scene_combo = QComboBox()
+        scene_layout.addWidget(self.scene_combo, 1)
+        
+        apply_scene_btn = QPushButton("应用场景")
+        apply_scene_btn.clicked.connect(self.apply_selected_scene)
+        scene_layout.addWidget(apply_scene_btn)
+        
+        new_scene_btn = QPushButton("新建场景")
+        new_scene_btn.clicked.connect(self.new_scene)
+        scene_layout.addWidget(new_scene_btn)
+        
+        delete_scene_btn = QPushButton("删除场景")
+        delete_scene_btn.clicked.connect(self.delete_scene)
+        scene_layout.addWidget(delete_scene_btn)
+        
+        config_layout.addWidget(scene_group)
+        self.refresh_scene_list()
+        
         # 配置详情
         detail_group = QGroupBox("配置详情")
         detail_layout = QVBoxLayout(detail_group)
@@ -204,27 +257,38 @@ class MainWindow(QMainWindow):
         parent_layout.addLayout(button_layout)
     
     def load_adapters(self):
-        """加载网络适配器到下拉框"""
-        adapters = self.network_manager.get_network_adapters()
+        """逐步加载网络适配器到下拉框（每解析出一个适配器即可选择）"""
+        self._adapter_generation += 1
+        generation = self._adapter_generation
+        wanted = self.current_adapter.name if self.current_adapter else None
         self.adapter_combo.clear()
-        
-        if adapters:
-            # 添加适配器到下拉框
-            for adapter in adapters:
-                self.adapter_combo.addItem(f"{adapter.description}", adapter)
-            
-            # 设置当前适配器或默认选择第一个
-            if self.current_adapter:
-                for i in range(self.adapter_combo.count()):
-                    adapter = self.adapter_combo.itemData(i)
-                    if adapter and adapter.name == self.current_adapter.name:
-                        self.adapter_combo.setCurrentIndex(i)
-                        break
-            else:
-                # 默认选择第一个适配器
-                if self.adapter_combo.count() > 0:
-                    self.current_adapter = self.adapter_combo.itemData(0)
-        else:
+        self.async_bridge.stream(
+            self.async_manager.iter_network_adapters(),
+            lambda adapter: self.add_adapter_item(generation, adapter, wanted),
+            lambda count: self.on_adapters_loaded(generation, count),
+            lambda error: self.on_adapters_loaded(generation, 0)
+        )
+    
+    def add_adapter_item(self, generation, adapter, wanted):
+        """添加一个适配器到下拉框，是当前适配器（或没有当前适配器时的第一个）则立即选中"""
+        if generation != self._adapter_generation:
+            return
+        # 添加时不触发选择改变，选中哪一项由下面决定
+        self.adapter_combo.blockSignals(True)
+        self.adapter_combo.addItem(f"{adapter.description}", adapter)
+        self.adapter_combo.blockSignals(False)
+        
+        if adapter.name == wanted:
+            self.adapter_combo.setCurrentIndex(self.adapter_combo.count() - 1)
+            self.current_adapter = adapter
+        elif wanted is None and self.adapter_combo.count() == 1:
+            # 默认选择第一个适配器
+            self.current_adapter = adapter
+            self.refresh_status()
+    
+    def on_adapters_loaded(self, generation, count):
+        """适配器加载完成"""
+        if generation == self._adapter_generation and not count:
             self.adapter_combo.addItem("未找到可用适配器", None)
     
     def on_adapter_changed(self):
@@ -234,6 +298,19 @@ class MainWindow(QMainWindow):
             self.current_adapter = current_adapter
             self.refresh_status()
     
+    def force_refresh(self):
+        """丢弃系统状态快照后刷新"""
+        self.network_manager.invalidate_cache()
+        self.refresh_status()
+    
+    def on_network_changed(self, kinds):
+        """网络发生变化（快照已由托盘使失效），隐藏时不刷新，显示时会刷新"""
+        if not self.isVisible():
+            return
+        if 'link' in kinds:
+            self.load_adapters()
+        self.refresher.refresh(force=True)
+    
     def refresh_status(self):
         """刷新状态信息"""
         # 更新适配器信息
@@ -244,64 +321,97 @@ class MainWindow(QMainWindow):
                 f"索引: {self.current_adapter.index}"
             )
             
-            # 获取当前配置
-            current_config = self.network_manager.get_current_config(self.current_adapter.name)
-            if current_config:
-                status_text = "当前网络配置:\n\n"
-                
-                if current_config.get('dhcp', False):
-                    status_text += "配置类型: DHCP (自动获取)\n"
-                else:
-                    status_text += "配置类型: 静态IP\n"
-                    if 'ip' in current_config:
-                        status_text += f"IP地址: {current_config['ip']}\n"
-                    if 'subnet' in current_config:
-                        status_text += f"子网掩码: {current_config['subnet']}\n"
-                    if 'gateway' in current_config:
-                        status_text += f"默认网关: {current_config['gateway']}\n"
-                
-                if 'dns1' in current_config:
-                    status_text += f"首选DNS: {current_config['dns1']}\n"
-                if 'dns2' in current_config:
-                    status_text += f"备用DNS: {current_config['dns2']}\n"
-                
-                self.status_text.setText(status_text)
-            else:
-                self.status_text.setText("无法获取当前网络配置")
+            # 后台获取当前配置，完成后经信号回到界面线程显示
+            self.refresher.set_adapter(self.current_adapter)
         else:
+            self.refresher.set_adapter(None)
             self.adapter_detail_label.setText("未选择适配器")
             self.status_text.setText("请先选择网络适配器")
         
         # 更新配置列表
         self.refresh_config_list()
     
-    def refresh_config_list(self):
-        """刷新配置列表"""
-        self.config_list.clear()
-        
-        for config in self.network_manager.configs:
-            item = QListWidgetItem(config.name)
-            item.setData(Qt.UserRole, config)
-            self.config_list.addItem(item)
+    def show_current_config(self, adapter, current_config):
+        """显示当前网络配置"""
+        # 查询期间切换了适配器，丢弃过期结果
+        if adapter is not self.current_adapter:
+            return
         
-        # 选中第一项
-        if self.config_list.count() > 0:
-            self.config_list.setCurrentRow(0)
-            self.show_config_detail()
+        if current_config:
+            status_text = "当前网络配置:\n\n"
+            
+            if current_config.get('dhcp', False):
+                status_text += "配置类型: DHCP (自动获取)\n"
+            else:
+                status_text += "配置类型: 静态IP\n"
+                if 'ip' in current_config:
+                    status_text += f"IP地址: {current_config['ip']}\n"
+                if 'subnet' in current_config:
+                    status_text += f"子网掩码: {current_config['subnet']}\n"
+                if 'gateway' in current_config:
+                    status_text += f"默认网关: {current_config['gateway']}\n"
+            
+            if 'dns1' in current_config:
+                status_text += f"首选DNS: {current_config['dns1']}\n"
+            if 'dns2' in current_config:
+                status_text += f"备用DNS: {current_config['dns2']}\n"
+
+            # 命令熔断期间显示的是上次成功获取的快照
+            metrics = self.network_manager.command_metrics()
+            if any(m.get('state') == 'open' for m in metrics.values()):
+                status_text += "\n注意: 系统命令暂时无响应，显示的是上次获取的配置\n"
+
+            self.set_status_text(status_text)
+        else:
+            self.set_status_text("无法获取当前网络配置")
+    
+    def set_status_text(self, text):
+        """更新状态文本，内容未变时不重设（避免重置滚动位置和选中的文字）"""
+        if text != self.status_text.toPlainText():
+            self.status_text.setText(text)
+    
+    def refresh_config_list(self, select: str = None):
+        """刷新配置列表（配置没有修改时不做任何事，有修改时只更新变化的行并保留选中项）
+
+        select 为需要选中的配置名称（新建或改名后的配置），有搜索内容时只显示匹配的配置
+        """
+        selected = self.selected_config()
+        query = self.filter_edit.text().strip()
+        revision = self.network_manager.config_revision
+        if query:
+            configs = self.network_manager.search_configs(query)
+        else:
+            configs = self.network_manager.configs
+        if not self.config_model.sync(configs, (revision, query)):
+            return
         
-        # 连接选择变化事件
-        self.config_list.currentItemChanged.connect(self.on_config_selection_changed)
+        # 选中项被删除或列表整体重建时，按名称恢复，找不到则选中第一项
+        if select is not None or not self.config_list.currentIndex().isValid():
+            row = self.config_model.row_of(select or (selected.name if selected else ''))
+            if row < 0 and self.config_model.rowCount() > 0:
+                row = 0
+            if row >= 0:
+                self.config_list.setCurrentIndex(self.config_model.index(row))
+        # 选中的配置内容可能已修改
+        self.show_config_detail()
+    
+    def selected_config(self):
+        """当前选中的配置，没有选中时返回None"""
+        index = self.config_list.currentIndex()
+        return self.config_model.config_at(index.row()) if index.isValid() else None
     
-    def on_config_selection_changed(self):
+    def on_config_selection_changed(self, current=None, previous=None):
         """配置选择变化"""
         self.show_config_detail()
     
     def show_config_detail(self):
         """显示配置详情"""
-        current_item = self.config_list.currentItem()
-        if current_item:
-            config = current_item.data(Qt.UserRole)
-            detail_text = f"配置名称: {config.name}\n\n"
+        config = self.selected_config()
+        if config:
+            detail_text = f"配置名称: {config.name}\n"
+            if config.tags:
+                detail_text += f"标签: {', '.join(config.tags)}\n"
+            detail_text += "\n"
             
             if config.dhcp:
                 detail_text += "配置类型: DHCP (自动获取IP地址)\n"
@@ -318,14 +428,15 @@ class MainWindow(QMainWindow):
                 if config.dns2:
                     detail_text += f"备用DNS: {config.dns2}\n"
             
-            self.detail_text.setText(detail_text)
+            if detail_text != self.detail_text.toPlainText():
+                self.detail_text.setText(detail_text)
         else:
             self.detail_text.clear()
     
     def apply_selected_config(self):
         """应用选中的配置"""
-        current_item = self.config_list.currentItem()
-        if not current_item:
+        config = self.selected_config()
+        if not config:
             QMessageBox.warning(self, "警告", "请先选择一个配置")
             return
         
@@ -333,19 +444,105 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "请先选择网络适配器")
             return
         
-        config = current_item.data(Qt.UserRole)
-        
         try:
-            success = self.network_manager.apply_config(self.current_adapter.name, config)
-            if success:
-                QMessageBox.information(self, "成功", f"已成功应用配置: {config.name}")
-                # 延迟刷新状态
-                QTimer.singleShot(2000, self.refresh_status)
+            plan = self.network_manager.apply_config(self.current_adapter.name, config)
+            finished = time.monotonic()
+            if plan and plan.is_noop:
+                QMessageBox.information(self, "提示", f"当前已是配置: {config.name}，无需切换")
+            elif plan:
+                # 不弹出对话框：就绪耗时从切换完成时算起，就绪（或超时）后再显示结果
+                self.wait_until_ready(self.current_adapter, config, finished)
             else:
-                QMessageBox.critical(self, "失败", f"应用配置失败: {config.name}")
+                QMessageBox.critical(self, "失败", f"应用配置失败: {config.name}\n{plan}")
         except Exception as e:
             QMessageBox.critical(self, "错误", f"应用配置时发生错误: {str(e)}")
     
+    def wait_until_ready(self, adapter, config, finished=None):
+        """后台等待切换后的网络就绪，就绪（或超时）时刷新主界面和托盘；finished 为切换完成的时刻（time.monotonic()）"""
+        if finished is None:
+            finished = time.monotonic()
+        self.status_text.setText(f"已应用配置 {config.name}，正在等待网络就绪 ...")
+        self.async_bridge.submit(
+            self.async_manager.wait_until_ready(adapter.name, config, start=finished),
+            lambda result: self.on_adapter_ready(adapter, config, result),
+            lambda error: self.status_text.setText(f"检查网络状态失败: {str(error)}")
+        )
+    
+    def on_adapter_ready(self, adapter, config, result):
+        """网络就绪（或等待超时）"""
+        self.test_result.setText(f"{config.name}: {result}")
+        if adapter is self.current_adapter:
+            self.refresh_status()
+        if hasattr(self, 'tray_app'):
+            self.tray_app.on_adapter_ready(adapter, config, result)
+    
+    def refresh_scene_list(self):
+        """刷新场景下拉框"""
+        self.scene_combo.clear()
+        for scene in self.network_manager.scenes:
+            self.scene_combo.addItem(scene.name, scene)
+    
+    def apply_selected_scene(self):
+        """应用选中的场景"""
+        scene = self.scene_combo.currentData()
+        if not scene:
+            QMessageBox.warning(self, "警告", "请先选择一个场景")
+            return
+        self.apply_scene(scene)
+    
+    def apply_scene(self, scene):
+        """在后台并发切换场景中的所有适配器，完成后显示各适配器的结果"""
+        self.status_text.setText(f"正在应用场景: {scene.name} ...")
+        self.async_bridge.submit(
+            self.async_manager.apply_scene(scene),
+            lambda result: self.on_scene_applied(scene, result),
+            lambda error: self.status_text.setText(f"应用场景失败: {str(error)}")
+        )
+    
+    def on_scene_applied(self, scene, result):
+        """场景应用完成"""
+        self.test_result.setText(f"场景 {scene.name}:\n{result}")
+        self.refresh_status()
+        if hasattr(self, 'tray_app'):
+            self.tray_app.on_scene_applied(scene, result)
+    
+    def new_scene(self):
+        """新建场景"""
+        adapters = self.network_manager.get_network_adapters()
+        if not adapters:
+            QMessageBox.warning(self, "警告", "未找到可用的网络适配器")
+            return
+        
+        dialog = SceneDialog(adapters, self.network_manager.configs, self)
+        if dialog.exec_() == dialog.Accepted:
+            scene = dialog.get_scene()
+            if scene:
+                self.network_manager.add_scene(scene)
+                self.refresh_scene_list()
+                if hasattr(self, 'tray_app'):
+                    self.tray_app.invalidate_menu()
+                QMessageBox.information(self, "成功", f"场景 '{scene.name}' 已保存")
+    
+    def delete_scene(self):
+        """删除场景"""
+        scene = self.scene_combo.currentData()
+        if not scene:
+            QMessageBox.warning(self, "警告", "请先选择要删除的场景")
+            return
+        
+        reply = QMessageBox.question(
+            self, "确认删除",
+            f"确定要删除场景 '{scene.name}' 吗？",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        
+        if reply == QMessageBox.Yes:
+            self.network_manager.remove_scene(scene.name)
+            self.refresh_scene_list()
+            if hasattr(self, 'tray_app'):
+                self.tray_app.invalidate_menu()
+    
     def new_config(self):
         """新建配置"""
         dialog = NetworkConfigDialog(self)
@@ -353,36 +550,32 @@ class MainWindow(QMainWindow):
             config = dialog.get_config()
             if config:
                 self.network_manager.add_config(config)
-                self.refresh_config_list()
+                self.refresh_config_list(select=config.name)
                 QMessageBox.information(self, "成功", f"配置 '{config.name}' 已保存")
     
     def edit_config(self):
         """编辑配置"""
-        current_item = self.config_list.currentItem()
-        if not current_item:
+        config = self.selected_config()
+        if not config:
             QMessageBox.warning(self, "警告", "请先选择要编辑的配置")
             return
         
-        config = current_item.data(Qt.UserRole)
         dialog = NetworkConfigDialog(self, config=config, edit_mode=True)
         if dialog.exec_() == dialog.Accepted:
             new_config = dialog.get_config()
             if new_config:
-                # 删除旧配置，添加新配置
-                self.network_manager.remove_config(config.name)
-                self.network_manager.add_config(new_config)
-                self.refresh_config_list()
+                # 原位更新，保持配置在列表中的位置
+                self.network_manager.update_config(config.name, new_config)
+                self.refresh_config_list(select=new_config.name)
                 QMessageBox.information(self, "成功", "配置已更新")
     
     def delete_config(self):
         """删除配置"""
-        current_item = self.config_list.currentItem()
-        if not current_item:
+        config = self.selected_config()
+        if not config:
             QMessageBox.warning(self, "警告", "请先选择要删除的配置")
             return
         
-        config = current_item.data(Qt.UserRole)
-        
         reply = QMessageBox.question(
             self, "确认删除", 
             f"确定要删除配置 '{config.name}' 吗？",
@@ -419,44 +612,34 @@ class MainWindow(QMainWindow):
             print(f"保存设置失败: {e}")
     
     def test_network(self):
-        """测试网络连接"""
-        import subprocess
-        import threading
-        
-        def run_test():
-            try:
-                self.test_result.setText("正在测试网络连接...")
-                
-                # 测试本地网关
-                if self.current_adapter:
-                    current_config = self.network_manager.get_current_config(self.current_adapter.name)
-                    if current_config and 'gateway' in current_config:
-                        gateway = current_config['gateway']
-                        result = subprocess.run(
-                            f'ping -n 1 -w 1000 {gateway}', 
-                            shell=True, capture_output=True, text=True
-                        )
-                        if result.returncode == 0:
-                            self.test_result.setText(f"✓ 网关连接正常 ({gateway})")
-                        else:
-                            self.test_result.setText(f"✗ 网关连接失败 ({gateway})")
-                            return
-                
-                # 测试外网连接
-                result = subprocess.run(
-                    'ping -n 1 -w 3000 8.8.8.8', 
-                    shell=True, capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    self.test_result.setText("✓ 网络连接正常")
-                else:
-                    self.test_result.setText("✗ 无法连接到外网")
-                    
-            except Exception as e:
-                self.test_result.setText(f"测试失败: {str(e)}")
-        
-        # 在后台线程运行测试
-        threading.Thread(target=run_test, daemon=True).start()
+        """测试网络连接（在后台事件循环中执行，结果回到界面线程显示）"""
+        self.test_result.setText("正在测试网络连接...")
+        adapter_name = self.current_adapter.name if self.current_adapter else None
+        self.async_bridge.submit(
+            self._run_network_test(adapter_name),
+            self.test_result.setText,
+            lambda error: self.test_result.setText(f"测试失败: {str(error)}")
+        )
+    
+    async def _run_network_test(self, adapter_name):
+        """同时ping网关和外网，返回测试结果文本"""
+        gateway = None
+        if adapter_name:
+            current_config = await self.async_manager.get_current_config(adapter_name)
+            if current_config and 'gateway' in current_config:
+                gateway = current_config['gateway']
+        
+        # 测试本地网关和外网连接（并发执行）
+        checks = [self.async_manager.ping('8.8.8.8', 3000)]
+        if gateway:
+            checks.append(self.async_manager.ping(gateway, 1000))
+        results = await asyncio.gather(*checks)
+        
+        if gateway and not results[1]:
+            return f"✗ 网关连接失败 ({gateway})"
+        if results[0]:
+            return "✓ 网络连接正常"
+        return "✗ 无法连接到外网"
     
     def set_current_adapter(self, adapter):
         """设置当前适配器"""
@@ -468,6 +651,18 @@ class MainWindow(QMainWindow):
         """更新当前适配器（兼容性方法）"""
         self.set_current_adapter(adapter)
     
+    def showEvent(self, event):
+        """窗口显示时恢复定时刷新"""
+        super().showEvent(event)
+        self.refresher.resume()
+    
+    def hideEvent(self, event):
+        """隐藏到托盘时暂停定时刷新"""
+        super().hideEvent(event)
+        # 最小化也会收到隐藏事件，只有真正隐藏时才暂停
+        if not self.isVisible():
+            self.refresher.pause()
+    
     def closeEvent(self, event):
         """关闭事件"""
         if self.settings.get('remember_choice', False):
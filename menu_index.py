@@ -0,0 +1,102 @@
+from typing import List, Dict, Optional
+from profile_store import diff_configs
+
+# 没有标签的配置所在的分组
+UNGROUPED = "未分组"
+
+class ConfigGroups:
+    """托盘菜单用的配置分组索引
+
+    配置按标签（站点）分组，有多个标签的配置出现在每个分组中，没有标签的归入“未分组”。
+    sync 按配置修订号和增量差异只更新受影响的分组，并记录哪些分组需要重新生成子菜单。
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self._sorted = {}
+        self._dirty = set()
+        self._configs = []
+        self._revision = None
+
+    def sync(self, configs, revision: Optional[int] = None) -> bool:
+        """与配置列表同步，返回是否有变化"""
+        if revision is not None and revision == self._revision:
+            return False
+        self._revision = revision
+        configs = list(configs)
+        operations = diff_configs(self._configs, configs)
+        if operations is None:
+            self._dirty.update(self.groups)
+            self.groups = {}
+            self._sorted = {}
+            for config in configs:
+                self._add(config)
+        else:
+            previous = {config.name: config for config in self._configs}
+            for operation in operations:
+                kind, first = operation[0], operation[1]
+                if kind == 'remove':
+                    for config in self._configs[first:operation[2] + 1]:
+                        self._discard(config)
+                elif kind == 'insert':
+                    for config in configs[first:operation[2] + 1]:
+                        self._add(config)
+                else:
+                    self._discard(previous[configs[first].name])
+                    self._add(configs[first])
+        self._configs = configs
+        return bool(operations) or operations is None
+
+    def _add(self, config):
+        for tag in config.tags or (UNGROUPED,):
+            group = self.groups.get(tag)
+            if group is None:
+                group = self.groups[tag] = {}
+            group[config.name] = config
+            self._dirty.add(tag)
+            self._sorted.pop(tag, None)
+
+    def _discard(self, config):
+        for tag in config.tags or (UNGROUPED,):
+            group = self.groups.get(tag)
+            if group is None or group.pop(config.name, None) is None:
+                continue
+            if not group:
+                del self.groups[tag]
+            self._dirty.add(tag)
+            self._sorted.pop(tag, None)
+
+    def __len__(self):
+        return len(self._configs)
+
+    def titles(self) -> List[str]:
+        """分组名称（按名称排序，“未分组”在最后）"""
+        return sorted(self.groups, key=lambda tag: (tag == UNGROUPED, tag))
+
+    def entries(self, tag: str) -> List:
+        """分组中的配置（按名称排序，排序结果在分组变化前复用）"""
+        entries = self._sorted.get(tag)
+        if entries is None:
+            group = self.groups.get(tag, {})
+            entries = self._sorted[tag] = [group[name] for name in sorted(group)]
+        return entries
+
+    def take_dirty(self, tag: str) -> bool:
+        """分组自上次取出后是否变化过（取出后清除标记）"""
+        if tag in self._dirty:
+            self._dirty.discard(tag)
+            return True
+        return False
+
+def pages(entries: List, size: int) -> List[tuple]:
+    """把较长的分组按 size 分页：[(标题, 条目), ...]，标题为首尾两项的名称"""
+    return [(f"{chunk[0].name} … {chunk[-1].name}", chunk)
+            for chunk in (entries[start:start + size] for start in range(0, len(entries), size))]
+
+def usage_sections(usage, lookup, limit: int = 5) -> Dict[str, List]:
+    """托盘菜单顶层的“最近使用”和“常用”配置（lookup 按名称取配置，已删除的配置不显示，常用中不重复最近使用的配置）"""
+    recent = [config for config in (lookup(name) for name in usage.recent(limit)) if config is not None]
+    shown = {config.name for config in recent}
+    frequent = [config for config in (lookup(name) for name in usage.most_used(limit + len(shown)))
+                if config is not None and config.name not in shown][:limit]
+    return {'recent': recent, 'frequent': frequent}
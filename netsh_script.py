@@ -0,0 +1,127 @@
+import re
+import uuid
+from typing import List
+from command_runner import CommandRunner, format_command
+
+# netsh的错误提示（中英文）。多数set命令成功时没有输出，但也有成功时输出提示的情况，
+# 如 "Ok."、"DHCP is already enabled on this interface."，因此按错误提示而不是有无输出判断失败
+_ERROR_RE = re.compile(
+    r'\b(?:error|fail(?:ed|ure)?|invalid|incorrect|not valid|not found|does not exist|denied|'
+    r'already exists|requires elevation|cannot|unable|usage:|not registered)\b'
+    r'|错误|失败|无效|不正确|不存在|找不到|拒绝访问|已存在|需要提升|无法|用法:|语法|没有.*注册',
+    re.IGNORECASE)
+# 交互提示符，如 "netsh>"、"netsh interface ip>"（后面可能紧跟命令输出）
+_PROMPT_RE = re.compile(r'netsh(?: \w+)*>[ \t]*')
+
+class NetshCommandResult:
+    """脚本中单条netsh命令的执行结果
+
+    unknown 为True表示netsh超时或中途退出时该命令还没有报告结果，命令可能已经生效（ok 为False）。
+    """
+    def __init__(self, command: List[str], ok: bool, output: str = '', unknown: bool = False):
+        self.command = command
+        self.ok = ok
+        self.output = output
+        self.unknown = unknown
+
+    def __str__(self):
+        if self.unknown:
+            status = f"结果未知（可能已生效）: {self.output}"
+        else:
+            status = "成功" if self.ok else f"失败: {self.output}"
+        return f"netsh {format_command(self.command)} -> {status}"
+
+class NetshScript:
+    """把多条netsh命令合并为一次netsh调用
+
+    命令通过标准输入交给交互式netsh执行，每条命令后插入一个不存在的标记命令，
+    netsh 对标记报"找不到命令"，据此把输出切分到各条命令上，逐条判断成败。
+    """
+
+    def __init__(self):
+        self.commands = []
+        self._token = f"__netswitch_{uuid.uuid4().hex[:8]}"
+
+    def add(self, args: List[str]):
+        """添加一条命令（参数列表，可带或不带开头的 'netsh'）"""
+        if args and args[0] == 'netsh':
+            args = args[1:]
+        self.commands.append(list(args))
+
+    def __len__(self):
+        return len(self.commands)
+
+    def _marker(self, index: int) -> str:
+        return f"{self._token}_{index}__"
+
+    def render(self) -> str:
+        """生成写入netsh标准输入的脚本"""
+        lines = []
+        for index, command in enumerate(self.commands):
+            lines.append(render_command(command))
+            lines.append(self._marker(index))
+        lines.append('exit')
+        return '\n'.join(lines) + '\n'
+
+    def parse_output(self, output: str, complete: bool = True) -> List[NetshCommandResult]:
+        """按标记切分netsh输出，得到每条命令的结果
+
+        complete 为False表示netsh超时或中途退出，输出只是一部分：已报告结果的命令照常判断，
+        之后的命令结果未知。
+        """
+        results = []
+        rest = output
+        for index, command in enumerate(self.commands):
+            marker = self._marker(index)
+            position = rest.find(marker)
+            if position < 0:
+                if complete:
+                    # netsh提前退出，之后的命令都没有执行
+                    results.append(NetshCommandResult(command, False, _clean(rest) or "netsh未执行该命令"))
+                else:
+                    results.append(NetshCommandResult(command, False, _clean(rest) or "netsh超时或意外退出",
+                                                      unknown=True))
+                rest = ''
+                continue
+
+            # 标记所在行是"找不到命令"的提示，不属于命令输出
+            line_start = rest.rfind('\n', 0, position) + 1
+            chunk = _clean(rest[:line_start])
+            line_end = rest.find('\n', position)
+            rest = rest[line_end + 1:] if line_end >= 0 else ''
+
+            ok = not _ERROR_RE.search(chunk)
+            results.append(NetshCommandResult(command, ok, chunk))
+        return results
+
+    def run(self, runner: CommandRunner) -> List[NetshCommandResult]:
+        """通过一次netsh调用执行全部命令"""
+        result = runner.run(['netsh'], input=self.render())
+        return self.parse_output(result.stdout + result.stderr, _completed(result))
+
+    async def run_async(self, runner: CommandRunner, timeout: float = None) -> List[NetshCommandResult]:
+        """异步执行全部命令"""
+        result = await runner.run_async(['netsh'], timeout, input=self.render())
+        return self.parse_output(result.stdout + result.stderr, _completed(result))
+
+def _completed(result) -> bool:
+    """netsh是否正常结束（被熔断拒绝时没有启动，也算作结果确定）"""
+    return result.rejected or (not result.timed_out and result.returncode >= 0)
+
+def render_command(command: List[str]) -> str:
+    """把参数列表转换为交互式netsh中输入的一行命令"""
+    return ' '.join(_quote(arg) for arg in command)
+
+def _quote(arg: str) -> str:
+    """netsh参数中含空格时加引号（name=以太网 2 -> name="以太网 2"）"""
+    if ' ' not in arg:
+        return arg
+    if '=' in arg:
+        key, value = arg.split('=', 1)
+        return f'{key}="{value}"'
+    return f'"{arg}"'
+
+def _clean(text: str) -> str:
+    """去掉提示符和空行"""
+    text = _PROMPT_RE.sub('', text)
+    return '\n'.join(line.strip() for line in text.split('\n') if line.strip())
@@ -0,0 +1,295 @@
+import asyncio
+import atexit
+import queue
+import re
+import subprocess
+import threading
+import time
+import uuid
+from typing import List, Dict, Optional
+from command_runner import CommandRunner, CommandResult, SubprocessRunner, POPEN_KWARGS, kill_process_tree
+from netsh_script import render_command
+
+# 行首的交互提示符（空命令会连续输出多个）
+_PROMPT_RE = re.compile(rb'^(?:netsh(?: \w+)*>[ \t]*)+')
+_EXIT_COMMANDS = (b'exit', b'quit', b'bye')
+
+class NetshSession:
+    """常驻的交互式netsh进程
+
+    命令通过标准输入写入，每次请求末尾追加一个不存在的结束标记命令，
+    读到标记的应答行即表示本次请求的输出已经完整。
+    进程退出或超时无应答时终止并在下次请求时重新启动。
+    """
+
+    def __init__(self, command: List[str] = None, timeout: float = 10.0):
+        self.command = command or ['netsh']
+        self.timeout = timeout
+        self.spawn_count = 0
+        self.restart_count = 0
+        # 从未成功应答过就超时，说明该环境下无法交互使用netsh，不再尝试
+        self.broken = False
+        # 最近一次失败的原因（"无响应"、"意外退出"等）和失败前已经读到的输出
+        self.last_failure = None
+        self.partial_output = None
+        self._completed = 0
+        self._process = None
+        self._lines = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _start(self) -> bool:
+        try:
+            self._process = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, **POPEN_KWARGS
+            )
+        except OSError as e:
+            print(f"启动netsh会话失败: {e}")
+            self.broken = True
+            return False
+
+        self.spawn_count += 1
+        # 每个进程使用独立的队列，被终止进程的残留输出不会混入新会话
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_lines, args=(self._process, self._lines), daemon=True).start()
+        return True
+
+    def _read_lines(self, process, lines: queue.Queue):
+        """后台读取进程输出，进程退出时放入None"""
+        try:
+            for line in iter(process.stdout.readline, b''):
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    def _stop(self):
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                kill_process_tree(process.pid)
+                process.kill()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def _restart(self, reason: str):
+        print(f"netsh会话{reason}，重新启动")
+        self.last_failure = reason
+        self.restart_count += 1
+        self._stop()
+
+    def execute(self, script: bytes, timeout: float = None) -> Optional[bytes]:
+        """执行一段netsh命令（每行一条），返回去掉提示符的输出；失败或超时返回None"""
+        with self._lock:
+            if self.broken:
+                return None
+            self.last_failure = None
+            self.partial_output = None
+            marker = f"__netswitch_end_{uuid.uuid4().hex[:8]}__".encode('ascii')
+            lines = [line for line in script.splitlines() if line.strip() not in _EXIT_COMMANDS]
+            data = b'\n'.join(lines + [marker]) + b'\n'
+
+            # 写入失败说明进程已经退出且命令没有送达，可以安全地重试一次
+            for attempt in range(2):
+                if self._process is None or self._process.poll() is not None:
+                    if self._process is not None:
+                        self._restart("已退出")
+                    if not self._start():
+                        return None
+                try:
+                    self._process.stdin.write(data)
+                    self._process.stdin.flush()
+                    break
+                except OSError:
+                    self._restart("写入失败")
+            else:
+                return None
+
+            output = self._read_until(marker, time.monotonic() + (timeout or self.timeout))
+            if output is None:
+                if not self._completed:
+                    self.broken = True
+                return None
+            self._completed += 1
+            return output
+
+    def _read_until(self, marker: bytes, deadline: float) -> Optional[bytes]:
+        output = []
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0)) if remaining > 0 else self._lines.get_nowait()
+            except queue.Empty:
+                self.partial_output = b''.join(output)
+                self._restart("无响应")
+                return None
+            if line is None:
+                self.partial_output = b''.join(output)
+                self._restart("意外退出")
+                return None
+            if marker in line:
+                return b''.join(output)
+            output.append(_PROMPT_RE.sub(b'', line))
+
+    def close(self):
+        """结束netsh进程"""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                try:
+                    self._process.stdin.write(b'exit\n')
+                    self._process.stdin.flush()
+                except OSError:
+                    pass
+            self._stop()
+
+class NetshSessionPool:
+    """netsh会话池
+
+    与 NetshSession 接口相同，并发请求各自使用空闲的会话，
+    没有空闲会话时新建，最多 size 个；单线程使用时只会启动一个netsh进程。
+    """
+
+    def __init__(self, command: List[str] = None, timeout: float = 10.0, size: int = 4):
+        self.command = command
+        self.timeout = timeout
+        self.size = size
+        self.sessions = []
+        self._idle = []
+        self._available = threading.Condition()
+        self._local = threading.local()
+
+    def _acquire(self) -> NetshSession:
+        with self._available:
+            while not self._idle and len(self.sessions) >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            session = NetshSession(self.command, self.timeout)
+            self.sessions.append(session)
+            return session
+
+    def _release(self, session: NetshSession):
+        with self._available:
+            self._idle.append(session)
+            self._available.notify()
+
+    def execute(self, script: bytes, timeout: float = None) -> Optional[bytes]:
+        """在一个空闲会话中执行，失败原因和失败前的输出见 last_failure / partial_output（按调用线程记录）"""
+        session = self._acquire()
+        try:
+            output = session.execute(script, timeout)
+            self._local.last_failure = session.last_failure
+            self._local.partial_output = session.partial_output
+            return output
+        finally:
+            self._release(session)
+
+    @property
+    def last_failure(self) -> Optional[str]:
+        return getattr(self._local, 'last_failure', None)
+
+    @property
+    def partial_output(self) -> Optional[bytes]:
+        return getattr(self._local, 'partial_output', None)
+
+    @property
+    def broken(self) -> bool:
+        # 任一会话从未应答过，说明该环境下无法交互使用netsh
+        return any(session.broken for session in self.sessions)
+
+    @property
+    def spawn_count(self) -> int:
+        return sum(session.spawn_count for session in self.sessions)
+
+    @spawn_count.setter
+    def spawn_count(self, value: int):
+        for session in self.sessions:
+            session.spawn_count = value
+
+    @property
+    def restart_count(self) -> int:
+        return sum(session.restart_count for session in self.sessions)
+
+    def close(self):
+        """结束所有netsh进程"""
+        for session in list(self.sessions):
+            session.close()
+
+class NetshSessionRunner(CommandRunner):
+    """netsh命令通过常驻会话执行，其他命令交给内部执行器
+
+    单条netsh命令在会话中执行后返回该命令的输出，交互模式下没有逐条的返回码，
+    因此只要会话应答就视为返回码0；会话不可用时单条命令改为启动独立进程执行。
+    从标准输入传入的netsh脚本（见 NetshScript）在会话中执行，会话失败时不重试，
+    以免重复执行已生效的修改命令。
+    默认使用会话池，多个适配器并发切换时各自使用独立的netsh进程。
+    """
+
+    def __init__(self, runner: CommandRunner = None, session=None):
+        super().__init__()
+        self.runner = runner or SubprocessRunner()
+        self.session = session or NetshSessionPool()
+
+    def _uses_session(self, args: List[str]) -> bool:
+        return bool(args) and args[0] == 'netsh' and not self.session.broken
+
+    def run(self, args: List[str], input: str = None, timeout: float = None) -> CommandResult:
+        if not self._uses_session(args):
+            return self.runner.run(args, input, timeout)
+        return super().run(args, input, timeout)
+
+    async def run_async(self, args: List[str], timeout: float = None, input: str = None) -> CommandResult:
+        if not self._uses_session(args):
+            return await self.runner.run_async(args, timeout, input)
+        return await super().run_async(args, timeout, input)
+
+    def _execute(self, args: List[str], input: Optional[bytes], timeout: float) -> CommandResult:
+        is_script = input is not None and len(args) == 1
+        if not is_script:
+            input = self._encode_input(render_command(args[1:]))
+        output = self.session.execute(input, timeout)
+        if output is not None:
+            return CommandResult(args, 0, output)
+
+        if self.session.broken and not is_script:
+            # 会话在该环境下不可用，查询等单条命令改为启动独立进程执行
+            fallback = self.runner.run(args, timeout=timeout)
+            return CommandResult(args, fallback.returncode, fallback.raw_stdout, fallback.raw_stderr,
+                                 fallback.timed_out, fallback.rejected)
+        # 保留失败前的输出：脚本中已经报告结果的命令据此判断成败
+        reason = self.session.last_failure or "执行失败"
+        return CommandResult(args, -1, self.session.partial_output or b'', self._encode_input(f"netsh会话{reason}"),
+                             timed_out=reason == "无响应")
+
+    def metrics(self) -> Dict[str, Dict]:
+        """合并会话与内部执行器的熔断指标，并附加会话重启次数"""
+        metrics = self.runner.metrics()
+        metrics.update(super().metrics())
+        metrics['netsh_session'] = {
+            'spawns': self.session.spawn_count,
+            'restarts': self.session.restart_count,
+            'broken': self.session.broken,
+        }
+        return metrics
+
+    def _detect_encoding(self) -> Optional[str]:
+        return self.runner._detect_encoding()
+
+    @property
+    def spawn_count(self) -> int:
+        """已启动的进程数（会话进程 + 内部执行器启动的进程）"""
+        return self.session.spawn_count + self.runner.spawn_count
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.runner.reset_stats()
+        self.session.spawn_count = 0
+
+    def close(self):
+        self.session.close()
+        self.runner.close()
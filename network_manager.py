@@ -1,62 +1,251 @@
-import subprocess
-import re
 import json
 import os
 import ctypes
-from typing import List, Dict, Optional
+import time
+import ipv4
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterator, Sequence
+from command_runner import CommandRunner
+from parsers import parse_ipconfig_all, iter_ipconfig_all, index_records, parse_netsh_config, InterfaceConfigRecord
+from snapshot_cache import SnapshotCache
+from netsh_script import NetshScript, NetshCommandResult
+from netsh_session import NetshSessionRunner
+from adapter_registry import AdapterRegistry
+from adapter_filter import AdapterFilter
+from profile_store import ProfileStore, SqliteProfileStore, ProfileUsage, write_json_atomic
+from search_index import ProfileSearchIndex
+
+IPCONFIG_COMMAND = ['ipconfig', '/all']
+NETSH_CONFIG_COMMAND = ['netsh', 'interface', 'ip', 'show', 'config']
 
 class NetworkAdapter:
     """网络适配器类"""
-    def __init__(self, name: str, description: str, index: int):
+    def __init__(self, name: str, description: str, index: int, mac: str = None):
         self.name = name
         self.description = description
         self.index = index
+        self.mac = mac
         self.current_config = None
     
     def __str__(self):
         return f"{self.description} ({self.name})"
 
 class NetworkConfig:
-    """网络配置类"""
+    """网络配置类
+    
+    地址字段（IP、子网掩码、网关、DNS）以32位整数紧凑保存，读取时仍为点分十进制字符串；
+    不规范的地址文本原样保存，to_dict/from_dict 往返不丢失信息。
+    按全部字段比较相等和计算哈希，比较时不需要重新解析地址；标签保存为元组，比较键不必每次复制。
+    """
+    __slots__ = ('name', '_ip', '_subnet', '_gateway', '_dns1', '_dns2', 'dhcp', 'tags')
+    
     def __init__(self, name: str, ip: str = None, subnet: str = None, 
                  gateway: str = None, dns1: str = None, dns2: str = None, 
-                 dhcp: bool = False):
+                 dhcp: bool = False, tags: Sequence[str] = None):
         self.name = name
-        self.ip = ip
-        self.subnet = subnet
-        self.gateway = gateway
-        self.dns1 = dns1
-        self.dns2 = dns2
+        self._ip = ipv4.compact(ip)
+        self._subnet = ipv4.compact(subnet)
+        self._gateway = ipv4.compact(gateway)
+        self._dns1 = ipv4.compact(dns1)
+        self._dns2 = ipv4.compact(dns2)
         self.dhcp = dhcp
+        # 标签（站点、用途等），用于分组和查找
+        self.tags = tuple(tags) if tags else ()
+    
+    ip = ipv4.AddressField('_ip')
+    subnet = ipv4.AddressField('_subnet')
+    gateway = ipv4.AddressField('_gateway')
+    dns1 = ipv4.AddressField('_dns1')
+    dns2 = ipv4.AddressField('_dns2')
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'ip': ipv4.expand(self._ip),
+            'subnet': ipv4.expand(self._subnet),
+            'gateway': ipv4.expand(self._gateway),
+            'dns1': ipv4.expand(self._dns1),
+            'dns2': ipv4.expand(self._dns2),
+            'dhcp': self.dhcp,
+            'tags': list(self.tags)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+    
+    @classmethod
+    def from_current(cls, name: str, current: Dict):
+        """由 get_current_config 返回的当前配置字典创建"""
+        return cls(name, current.get('ip'), current.get('subnet'), current.get('gateway'),
+                   current.get('dns1'), current.get('dns2'), current.get('dhcp', False))
+    
+    def address_key(self) -> tuple:
+        """地址部分的比较键：DHCP时只有DHCP标志，静态时为(IP, 掩码, 网关)"""
+        if self.dhcp:
+            return (True,)
+        return (False, self._ip, self._subnet, self._gateway or None)
+    
+    def dns_key(self) -> tuple:
+        """静态DNS的比较键，没有首选DNS时视为没有静态DNS"""
+        if not self._dns1:
+            return (None,)
+        return (self._dns1, self._dns2 or None)
+
+    def validate(self) -> Optional[str]:
+        """检查配置是否可以应用，返回错误说明，没有问题时返回None"""
+        if not self.dhcp:
+            error = ipv4.check_interface(self._ip, self._subnet, self._gateway)
+            if error:
+                return error
+        for label, value in (("首选DNS", self._dns1), ("备用DNS", self._dns2)):
+            if value and value.__class__ is not int:
+                return f"{label}无效: {value}"
+        return None
+
+    def warning(self) -> Optional[str]:
+        """可以应用但可能有误的配置（如网关不在同一网段），返回提示，没有时返回None"""
+        if self.dhcp:
+            return None
+        return ipv4.check_gateway(self._ip, self._subnet, self._gateway)
+
+    def _key(self) -> tuple:
+        return (self.name, bool(self.dhcp), self._ip, self._subnet, self._gateway,
+                self._dns1, self._dns2, self.tags)
+    
+    def __eq__(self, other):
+        if not isinstance(other, NetworkConfig):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
+    
+    def __repr__(self):
+        return f"NetworkConfig({self.name!r}, ip={self.ip!r}, dhcp={self.dhcp!r})"
+
+class NetworkScene:
+    """多适配器场景：适配器名称 -> 配置名称，一次切换多块网卡"""
+    def __init__(self, name: str, assignments: Dict[str, str] = None):
+        self.name = name
+        self.assignments = dict(assignments or {})
     
     def to_dict(self):
         return {
             'name': self.name,
-            'ip': self.ip,
-            'subnet': self.subnet,
-            'gateway': self.gateway,
-            'dns1': self.dns1,
-            'dns2': self.dns2,
-            'dhcp': self.dhcp
+            'assignments': dict(self.assignments)
         }
     
     @classmethod
     def from_dict(cls, data: dict):
         return cls(**data)
 
+class ApplyPlan:
+    """一次配置切换的执行计划和结果
+
+    address / dns 表示是否需要改写地址和DNS，与当前配置相同的部分记录在 skipped 中。
+    current 为切换前的配置，部分命令失败时据此回滚，回滚结果和耗时记录在 rollback_* 中，
+    切换前的配置不完整（无法据此回滚）时原因记录在 rollback_error 中。
+    bool(plan) 为切换是否成功（目标配置已生效时也为True），与原来返回bool的用法兼容。
+    """
+    ADDRESS = 'address'
+    DNS = 'dns'
+
+    def __init__(self, adapter_name: str, config: NetworkConfig):
+        self.adapter_name = adapter_name
+        self.config = config
+        self.current = None
+        self.connection_name = None
+        self.address = True
+        self.dns = True
+        self.skipped = []
+        self.results = []
+        self.success = False
+        self.error = None
+        self.rollback_results = []
+        self.rollback_seconds = None
+        self.rollback_error = None
+        self.elapsed = None
+
+    @property
+    def rolled_back(self) -> bool:
+        """是否已成功恢复切换前的配置"""
+        return bool(self.rollback_results) and all(result.ok for result in self.rollback_results)
+
+    @property
+    def is_noop(self) -> bool:
+        """目标配置已经生效，不需要执行任何命令"""
+        return not self.address and not self.dns
+
+    def __bool__(self):
+        return self.success
+
+    def __str__(self):
+        if self.error and not self.results:
+            return f"{self.config.name}: 失败 ({self.error})"
+        if self.is_noop:
+            return f"{self.config.name}: 已是当前配置，跳过切换"
+        parts = [part for part in (self.ADDRESS, self.DNS) if getattr(self, part)]
+        status = "成功" if self.success else "失败"
+        text = f"{self.config.name}: 改写 {'+'.join(parts)} {status}"
+        if self.rollback_seconds is not None:
+            rollback = "已恢复原配置" if self.rolled_back else "恢复原配置失败"
+            text += f"，{rollback}（{self.rollback_seconds:.2f} 秒）"
+        elif self.rollback_error:
+            text += f"，无法恢复原配置: {self.rollback_error}"
+        return text
+
+class BulkApplyResult:
+    """多适配器切换的结果：每个适配器的执行计划（含耗时）和总耗时"""
+    def __init__(self, plans: Dict[str, ApplyPlan], elapsed: float):
+        self.plans = plans
+        self.elapsed = elapsed
+    
+    @property
+    def failed(self) -> List[ApplyPlan]:
+        return [plan for plan in self.plans.values() if not plan]
+    
+    def __bool__(self):
+        return not self.failed
+    
+    def __str__(self):
+        lines = [f"{len(self.plans) - len(self.failed)}/{len(self.plans)} 个适配器切换成功，总用时 {self.elapsed:.2f} 秒"]
+        for adapter_name, plan in self.plans.items():
+            elapsed = f"（{plan.elapsed:.2f} 秒）" if plan.elapsed is not None else ""
+            lines.append(f"{adapter_name}: {plan}{elapsed}")
+        return '\n'.join(lines)
+
 class NetworkManager:
     """网络管理器"""
     
-    def __init__(self):
+    def __init__(self, runner: CommandRunner = None, cache_ttl: float = 3.0):
+        # 默认通过常驻netsh会话执行netsh命令，其他命令直接启动进程
+        self.runner = runner or NetshSessionRunner()
+        # 同一次刷新内复用系统状态快照，apply_config后失效
+        self.cache = SnapshotCache(cache_ttl)
         self.adapters = []
-        self.configs = []
+        # 适配器名称到netsh连接名称的索引，查找失败时才重建
+        self.registry = None
+        self.scenes = []
+        self.scene_file = 'network_scenes.json'
+        # 适配器过滤规则和配置库类型保存在应用设置中
+        self.settings_file = 'app_settings.json'
+        settings = self._load_settings()
+        self.adapter_filter = AdapterFilter()
+        self.load_adapter_filter(settings)
         self.config_file = 'network_configs.json'
+        self.profiles = self._create_profile_store(settings)
+        # 搜索索引在第一次搜索时建立，之后随增删改配置增量更新
+        self._search_index = None
         self.load_configs()
+        self.load_scenes()
         self._load_default_configs()
+        # 切换成功的次数和时间，托盘菜单据此显示最近使用和常用配置
+        self.usage = ProfileUsage('profile_usage.json')
     
     def _load_default_configs(self):
         """加载默认配置"""
-        if not self.configs:
+        if not self.profiles:
             # 添加默认的家庭网络配置
             home_config = NetworkConfig(
                 name="家庭网络",
@@ -73,92 +262,131 @@ class NetworkManager:
                 dhcp=True
             )
             
-            self.configs = [home_config, dhcp_config]
-            self.save_configs()
+            self.profiles.replace_all([home_config, dhcp_config])
     
-    def get_network_adapters(self) -> List[NetworkAdapter]:
-        """获取网络适配器列表（优先显示活跃的适配器，过滤无法获取配置的适配器）"""
-        adapters = []
+    def close(self):
+        """释放执行器持有的资源（常驻netsh进程）和配置库"""
+        self.runner.close()
+        if isinstance(self.profiles, SqliteProfileStore):
+            self.profiles.close()
+    
+    def command_metrics(self) -> Dict[str, Dict]:
+        """外部命令的执行指标：各类命令的熔断状态、超时/失败/拒绝次数"""
+        return self.runner.metrics()
+    
+    def invalidate_cache(self):
+        """使系统状态快照失效，下次查询重新执行命令"""
+        self.cache.invalidate()
+    
+    def state_fingerprint(self) -> Dict[str, Optional[str]]:
+        """轮询检测网络变化用的状态：ipconfig（适配器）和 netsh（地址、DNS）的原始输出，命令失败时为None"""
+        fingerprint = {}
+        for kind, command in (('link', IPCONFIG_COMMAND), ('address', NETSH_CONFIG_COMMAND)):
+            result = self.runner.run(command)
+            fingerprint[kind] = result.stdout if result.returncode == 0 else None
+        return fingerprint
+    
+    def _get_ipconfig_records(self):
+        """获取 ipconfig /all 的解析结果（使用快照缓存），失败时返回None"""
+        records = self.cache.get('ipconfig')
+        if records is not SnapshotCache.MISSING:
+            return records
+        
+        # 输出编码由执行器检测并缓存
+        return self._store_ipconfig_result(self.runner.run(IPCONFIG_COMMAND))
+    
+    def _last_good_snapshot(self, key: str, result):
+        """命令超时或被熔断时返回上次成功的快照，没有时返回None"""
+        if not (result.timed_out or result.rejected):
+            return None
+        snapshot = self.cache.last_good(key)
+        if snapshot is SnapshotCache.MISSING:
+            return None
+        print(f"使用上次成功获取的快照: {key}")
+        return snapshot
+    
+    def _store_ipconfig_result(self, result):
+        """解析 ipconfig /all 的执行结果并写入快照，失败时返回None（超时或熔断时返回上次的快照）"""
+        if result.returncode != 0:
+            print(f"ipconfig命令执行失败 (返回码: {result.returncode}): {result.stderr}")
+            return self._last_good_snapshot('ipconfig', result)
+        
+        records = parse_ipconfig_all(result.stdout)
+        self.cache.put('ipconfig', records)
+        return records
+    
+    def get_network_adapters(self, refresh: bool = False) -> List[NetworkAdapter]:
+        """获取网络适配器列表（优先显示活跃的适配器，过滤无法获取配置的适配器）
+        
+        refresh为True时丢弃快照缓存，重新查询系统状态
+        """
+        return list(self.iter_network_adapters(refresh))
+    
+    def iter_network_adapters(self, refresh: bool = False) -> Iterator[NetworkAdapter]:
+        """逐个生成网络适配器，每解析出一个适配器即返回，便于界面逐步显示
+        
+        活跃的适配器解析出来就立即返回，未连接的适配器在全部解析完后返回，
+        顺序与 get_network_adapters 相同；完整遍历后写入快照。
+        """
+        if refresh:
+            self.invalidate_cache()
+        cached = self.cache.get('adapters')
+        if cached is not SnapshotCache.MISSING:
+            self.adapters = cached
+            yield from list(cached)
+            return
+        
+        records = self.cache.get('ipconfig')
+        if records is SnapshotCache.MISSING:
+            result = self.runner.run(IPCONFIG_COMMAND)
+            records = self._stream_ipconfig_result(result)
+        yield from self._iter_adapters(records)
+    
+    def _stream_ipconfig_result(self, result) -> Optional[Iterator]:
+        """逐个生成 ipconfig /all 执行结果中的适配器记录，完整遍历后写入快照（失败时同 _store_ipconfig_result）"""
+        if result.returncode != 0:
+            return self._store_ipconfig_result(result)
+        
+        def stream():
+            records = []
+            for record in iter_ipconfig_all(result.stdout):
+                records.append(record)
+                yield record
+            self.cache.put('ipconfig', records)
+        return stream()
+    
+    def _build_adapters(self, records) -> List[NetworkAdapter]:
+        """从ipconfig记录生成过滤后的适配器列表并写入快照"""
+        return list(self._iter_adapters(records))
+    
+    def _iter_adapters(self, records) -> Iterator[NetworkAdapter]:
+        """从ipconfig记录逐个生成过滤后的适配器（活跃的先返回），完整遍历后写入快照"""
+        if records is None:
+            print("获取适配器列表失败")
+            return
+        
         active_adapters = []
+        adapters = []
         try:
-            # 使用ipconfig命令获取适配器信息，尝试多种编码方式
-            encodings = ['gbk', 'utf-8', 'cp936', 'gb2312']
-            result = None
-            
-            for encoding in encodings:
-                try:
-                    result = subprocess.run('ipconfig /all', shell=True, capture_output=True, text=True, encoding=encoding)
-                    if result.returncode == 0:
-                        print(f"成功使用编码 {encoding} 获取适配器信息")
-                        break
-                except UnicodeDecodeError:
-                    print(f"编码 {encoding} 解码失败，尝试下一个")
-                    continue
-            
-            if result is None or result.returncode != 0:
-                print(f"获取适配器列表失败: {result.stderr if result else '所有编码尝试失败'}")
-                return adapters
-            
-            # 解析ipconfig输出
-            current_adapter = None
-            current_description = None
-            has_ip = False
             adapter_index = 1
-            
-            for line in result.stdout.split('\n'):
-                line = line.strip()
-                
-                # 检测适配器名称行（支持中英文格式）
-                # 英文格式："Ethernet adapter 以太网:" 或 "Wireless LAN adapter WLAN 2:"
-                # 中文格式："以太网适配器 以太网:" 或 "无线局域网适配器 WLAN 2:"
-                if line and not line.startswith(' ') and line.endswith(':') and ('adapter' in line or '适配器' in line):
-                    # 处理上一个适配器
-                    if current_adapter and current_description:
-                        self._process_adapter(current_adapter, current_description, has_ip, adapter_index, active_adapters, adapters)
-                        adapter_index += 1
-                    
-                    # 提取适配器名称
-                    adapter_name = None
-                    if 'adapter ' in line:
-                        # 英文格式："Ethernet adapter 以太网:"
-                        adapter_name = line.split('adapter ')[1].rstrip(':')
-                    elif '适配器 ' in line:
-                        # 中文格式："以太网适配器 以太网:"
-                        adapter_name = line.split('适配器 ')[1].rstrip(':')
-                    
-                    if adapter_name:
-                        # 过滤一些不需要的适配器
-                        skip_keywords = [
-                            'Loopback', 'Teredo', 'ISATAP', 'Tunnel', 
-                            '隧道', '环回', '本地连接* '
-                        ]
-                        
-                        if not any(keyword in adapter_name for keyword in skip_keywords):
-                            current_adapter = adapter_name
-                            current_description = None
-                            has_ip = False
-                        else:
-                            current_adapter = None
-                    else:
-                        current_adapter = None
-                
-                # 获取适配器描述
-                elif current_adapter and (line.startswith('Description') or line.startswith('描述')):
-                    current_description = line.split(':', 1)[1].strip() if ':' in line else ''
+            for record in records:
+                if not self.adapter_filter.is_visible(record.name, record.description, record.mac):
+                    continue
                 
-                # 检查是否有IP地址
-                elif current_adapter and ('IPv4' in line or 'IP 地址' in line) and ':' in line:
-                    ip_part = line.split(':', 1)[1].strip()
-                    if ip_part and not ip_part.startswith('169.254') and ip_part != '0.0.0.0':
-                        has_ip = True
-            
-            # 处理最后一个适配器
-            if current_adapter and current_description:
-                self._process_adapter(current_adapter, current_description, has_ip, adapter_index, active_adapters, adapters)
+                # 只要有IP地址就认为是已连接的适配器，没有IP的适配器也添加到列表中但排在后面
+                adapter = NetworkAdapter(record.name, record.description, adapter_index, record.mac)
+                adapter_index += 1
+                if record.has_ipv4:
+                    active_adapters.append(adapter)
+                    yield adapter
+                else:
+                    adapters.append(adapter)
             
         except Exception as e:
             print(f"获取网络适配器失败: {e}")
         
+        yield from adapters
+        
         # 优先返回活跃的适配器，然后是其他可用适配器
         final_adapters = active_adapters + adapters
         print(f"最终适配器列表 (共{len(final_adapters)}个): {[str(a) for a in final_adapters]}")
@@ -166,355 +394,141 @@ class NetworkManager:
             print(f"活跃适配器 (共{len(active_adapters)}个): {[str(a) for a in active_adapters]}")
         
         self.adapters = final_adapters
-        return final_adapters
-    
-    def _process_adapter(self, adapter_name: str, description: str, has_ip: bool, index: int, active_adapters: List[NetworkAdapter], adapters: List[NetworkAdapter]):
-        """处理单个适配器"""
-        # 进一步过滤虚拟适配器
-        virtual_keywords = [
-            'Microsoft', 'Teredo', 'ISATAP', 'Loopback',
-            'WAN Miniport', 'Hyper-V', 'Virtual', 'Tailscale',
-            'Tunnel', 'Wintun'
-        ]
-        
-        # 检查是否为虚拟适配器
-        is_virtual = any(keyword in description for keyword in virtual_keywords)
-        
-        if not is_virtual:
-            print(f"检查适配器: {adapter_name} ({description})")
-            
-            # 降低过滤条件：只要有IP地址就认为是已连接的适配器
-            if has_ip:
-                adapter = NetworkAdapter(adapter_name, description, index)
-                active_adapters.append(adapter)
-                print(f"已连接适配器: {adapter_name}")
-            else:
-                # 对于没有IP的适配器，也添加到列表中但标记为未连接
-                adapter = NetworkAdapter(adapter_name, description, index)
-                adapters.append(adapter)
-                print(f"未连接适配器: {adapter_name}")
+        self.cache.put('adapters', final_adapters)
     
-    def get_current_config(self, adapter_name: str) -> Optional[Dict]:
-        """获取当前网络配置"""
+    def _load_settings(self) -> Dict:
+        """读取应用设置，文件不存在或损坏时返回空字典"""
         try:
-            # 获取IP配置，尝试多种编码方式
-            cmd = f'netsh interface ip show config name="{adapter_name}"'
-            encodings = ['gbk', 'utf-8', 'cp936', 'gb2312']
-            result = None
-            
-            for encoding in encodings:
-                try:
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding=encoding, errors='ignore')
-                    if result.returncode == 0:
-                        print(f"netsh命令成功，使用编码: {encoding}")
-                        break
-                except (UnicodeDecodeError, Exception) as e:
-                    print(f"netsh命令编码 {encoding} 失败: {e}")
-                    continue
-            
-            if result is None or result.returncode != 0:
-                error_msg = result.stderr if result else "所有编码尝试失败"
-                print(f"netsh命令失败 (返回码: {result.returncode if result else 'N/A'}): {error_msg}")
-                print(f"尝试使用备选方案获取适配器 '{adapter_name}' 的配置")
-                # 如果netsh命令失败，尝试使用ipconfig作为备选方案
-                return self._get_config_fallback(adapter_name)
-            
-            output = result.stdout
-            config = {}
-            
-            # 解析输出
-            if "DHCP enabled:                         Yes" in output or "DHCP 已启用:                         是" in output:
-                config['dhcp'] = True
-            elif "DHCP enabled:                         No" in output or "DHCP 已启用:                         否" in output:
-                config['dhcp'] = False
-            else:
-                # 如果无法确定DHCP状态，默认为False并尝试解析静态配置
-                config['dhcp'] = False
-            
-            # 如果不是DHCP，解析静态IP配置
-            if not config.get('dhcp', True):
-                # 提取IP地址
-                ip_match = re.search(r'IP Address:\s*([0-9.]+)', output)
-                if not ip_match:
-                    ip_match = re.search(r'IP 地址:\s*([0-9.]+)', output)
-                if ip_match:
-                    config['ip'] = ip_match.group(1)
-                
-                # 提取子网掩码
-                subnet_match = re.search(r'Subnet Prefix:\s*[0-9.]+/(\d+)', output)
-                if not subnet_match:
-                    subnet_match = re.search(r'子网前缀长度:\s*(\d+)', output)
-                if subnet_match:
-                    prefix_length = int(subnet_match.group(1))
-                    config['subnet'] = self._prefix_to_netmask(prefix_length)
-                
-                # 提取网关
-                gateway_match = re.search(r'Default Gateway:\s*([0-9.]+)', output)
-                if not gateway_match:
-                    gateway_match = re.search(r'默认网关:\s*([0-9.]+)', output)
-                if gateway_match:
-                    config['gateway'] = gateway_match.group(1)
-            
-            # 从主输出中提取DNS配置（netsh ip show config已包含DNS信息）
-            # 先尝试多行匹配获取完整的DNS部分
-            dns_section = re.search(r'Statically Configured DNS Servers:[\s\S]*?(?=\n\s*[A-Z]|$)', output)
-            if not dns_section:
-                dns_section = re.search(r'静态配置的 DNS 服务器:[\s\S]*?(?=\n\s*[A-Z]|$)', output)
-            
-            dns_matches = []
-            if dns_section:
-                # 从DNS部分提取所有IP地址
-                dns_matches = re.findall(r'([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})', dns_section.group())
-            
-            if dns_matches:
-                config['dns1'] = dns_matches[0] if len(dns_matches) > 0 else None
-                config['dns2'] = dns_matches[1] if len(dns_matches) > 1 else None
+            if os.path.exists(self.settings_file):
+                with open(self.settings_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"加载设置失败: {e}")
+        return {}
+    
+    def load_adapter_filter(self, settings: Dict = None):
+        """从应用设置加载适配器过滤规则（adapter_filter 项，追加到默认规则），未设置时使用默认规则"""
+        try:
+            if settings is None:
+                settings = self._load_settings()
+            self.set_adapter_filter(AdapterFilter.from_settings(settings))
+        except Exception as e:
+            print(f"加载适配器过滤规则失败: {e}")
+    
+    def set_adapter_filter(self, adapter_filter: AdapterFilter):
+        """更换适配器过滤规则，下次枚举时生效"""
+        self.adapter_filter = adapter_filter
+        self.cache.invalidate('adapters')
+    
+    def get_all_current_configs(self, refresh: bool = False) -> Dict[str, Dict]:
+        """一次netsh调用获取所有接口的当前配置，返回按接口名称索引的配置字典"""
+        if refresh:
+            self.invalidate_cache()
+        configs = self.cache.get('netsh_configs')
+        if configs is SnapshotCache.MISSING:
+            # 不带名称过滤，一次获取全部接口
+            configs = self._store_netsh_result(self.runner.run(NETSH_CONFIG_COMMAND))
+        return {name: dict(config) for name, config in (configs or {}).items()}
+    
+    def _store_netsh_result(self, result) -> Optional[Dict[str, Dict]]:
+        """解析批量netsh查询的执行结果并写入快照，失败时返回None（超时或熔断时返回上次的快照）"""
+        try:
+            if result.returncode != 0:
+                print(f"netsh命令失败 (返回码: {result.returncode}): {result.stderr or result.stdout}")
+                return self._last_good_snapshot('netsh_configs', result)
             
-            return config
+            configs = {name: self._netsh_record_to_config(record)
+                       for name, record in parse_netsh_config(result.stdout).items()}
+            self.cache.put('netsh_configs', configs)
+            return configs
             
         except Exception as e:
-            print(f"获取当前配置失败: {e}")
+            print(f"获取接口配置失败: {e}")
             return None
     
+    def _netsh_record_to_config(self, record: InterfaceConfigRecord) -> Dict:
+        """将netsh接口记录转换为配置字典"""
+        config = {'dhcp': bool(record.dhcp)}
+        
+        # 如果不是DHCP，返回静态IP配置
+        if not config['dhcp']:
+            if record.ip:
+                config['ip'] = record.ip
+            if record.subnet:
+                config['subnet'] = record.subnet
+            elif record.prefix_length is not None:
+                try:
+                    config['subnet'] = ipv4.prefix_to_netmask(record.prefix_length)
+                except ValueError as e:
+                    print(f"忽略netsh输出中的前缀长度: {e}")
+            if record.gateway:
+                config['gateway'] = record.gateway
+        
+        # 静态配置的DNS服务器
+        if record.static_dns:
+            config['dns1'] = record.static_dns[0]
+            config['dns2'] = record.static_dns[1] if len(record.static_dns) > 1 else None
+        
+        return config
+    
+    def get_current_config(self, adapter_name: str, refresh: bool = False) -> Optional[Dict]:
+        """获取当前网络配置（从批量查询的接口索引中读取，refresh为True时重新查询）"""
+        config = self.get_all_current_configs(refresh=refresh).get(adapter_name)
+        if config is None:
+            print(f"netsh输出中未找到适配器 '{adapter_name}'，尝试使用备选方案")
+            # 如果netsh中没有该接口，尝试使用ipconfig作为备选方案
+            config = self._get_config_fallback(adapter_name)
+        return config
+    
     def _get_config_fallback(self, adapter_name: str) -> Optional[Dict]:
         """备选方案：使用ipconfig获取网络配置"""
         try:
             print(f"使用ipconfig备选方案获取适配器 '{adapter_name}' 的配置")
-            # 使用ipconfig /all获取详细信息，尝试多种编码
-            encodings = ['gbk', 'utf-8', 'cp936', 'gb2312']
-            result = None
-            
-            for encoding in encodings:
-                try:
-                    result = subprocess.run('ipconfig /all', shell=True, capture_output=True, text=True, encoding=encoding)
-                    if result.returncode == 0:
-                        print(f"ipconfig备选方案成功，使用编码: {encoding}")
-                        break
-                except UnicodeDecodeError:
-                    print(f"ipconfig备选方案编码 {encoding} 解码失败")
-                    continue
-            
-            if result is None or result.returncode != 0:
-                error_msg = result.stderr if result else "所有编码尝试失败"
-                print(f"ipconfig命令执行失败 (返回码: {result.returncode if result else 'N/A'}): {error_msg}")
+            # 使用ipconfig /all获取详细信息（与适配器枚举共享快照）
+            records = self._get_ipconfig_records()
+            if records is None:
                 return None
             
-            output = result.stdout
-            config = {}
-            
-            # 查找指定适配器的配置段
-            adapter_section = None
-            lines = output.split('\n')
-            # 开始查找适配器配置段
-            
-            for i, line in enumerate(lines):
-                # 检查适配器标题行（不以空格开头的行且包含'适配器'或以':'结尾）
-                if (not line.startswith(' ') and line.strip() and 
-                    ('适配器' in line or line.strip().endswith(':'))):
-                    # 检查适配器标题行
-                    
-                    # 收集这个适配器的配置段
-                    temp_section = []
-                    j = i + 1
-                    while j < len(lines) and (not lines[j].strip() or lines[j].startswith(' ')):
-                        temp_section.append(lines[j])
-                        j += 1
-                        # 如果遇到下一个适配器标题行，停止
-                        if j < len(lines) and lines[j].strip() and not lines[j].startswith(' '):
-                            break
-                    
-                    # 检查这个适配器段是否包含目标描述
-                    temp_text = '\n'.join(temp_section)
-                    # 支持中英文描述格式
-                    description_line_cn = f'描述. . . . . . . . . . . . . . . : {adapter_name}'
-                    description_line_en = f'Description . . . . . . . . . . . : {adapter_name}'
-                    
-                    if description_line_cn in temp_text or description_line_en in temp_text:
-                        adapter_section = temp_section
-                        # 通过描述匹配找到适配器
-                        break
-                    else:
-                        # 继续查找下一个适配器
-                        pass
-            
-            # 如果没找到指定适配器，尝试使用第一个有IPv4地址的适配器
-            if not adapter_section:
-                # 未找到指定适配器，尝试使用第一个有IPv4地址的适配器
-                for i, line in enumerate(lines):
-                    if ('以太网适配器' in line or '无线局域网适配器' in line or '隧道适配器' in line):
-                        # 检查这个适配器是否有IPv4地址
-                        temp_section = []
-                        j = i + 1
-                        while j < len(lines) and not (lines[j].strip() and not lines[j].startswith(' ')):
-                            temp_section.append(lines[j])
-                            j += 1
-                        
-                        # 检查是否包含IPv4地址和目标适配器描述
-                        temp_text = '\n'.join(temp_section)
-                        if 'IPv4 地址' in temp_text:
-                            # 检查描述是否匹配
-                            if f'描述. . . . . . . . . . . . . . . : {adapter_name}' in temp_text:
-                                adapter_section = temp_section
-                                print(f"通过IPv4地址和描述匹配找到适配器: {line.strip()}")
-                                break
-                            # 如果没有找到精确匹配，使用第一个有IPv4的适配器作为备选
-                            elif not adapter_section:
-                                adapter_section = temp_section
-                                print(f"使用备选适配器: {line.strip()}")
-            
-            if not adapter_section:
-                # 未找到适配器配置信息
-                # 显示可用的适配器列表
-                for line in lines:
-                    if '适配器' in line and line.strip():
-                        print(f"  - {line.strip()}")
+            # 按适配器名称或描述查找，找不到时不再猜测其他适配器
+            record = index_records(records).get(adapter_name)
+            if not record:
+                print(f"ipconfig输出中未找到适配器 '{adapter_name}'")
                 return None
             
-            adapter_text = '\n'.join(adapter_section)
-            
-            # 检查DHCP状态 - 支持中英文
-            if ('DHCP 已启用' in adapter_text or 'DHCP Enabled' in adapter_text or
-                'DHCP enabled' in adapter_text):
-                config['dhcp'] = True
-            else:
-                config['dhcp'] = False
-            
-            # 提取IP地址 - 支持中英文格式
-            ip_match = re.search(r'IPv4 地址[^:]*:\s*([0-9.]+)', adapter_text)
-            if not ip_match:
-                ip_match = re.search(r'IPv4 Address[^:]*:\s*([0-9.]+)', adapter_text)
-            if not ip_match:
-                ip_match = re.search(r'IP Address[^:]*:\s*([0-9.]+)', adapter_text)
-            if ip_match:
-                config['ip'] = ip_match.group(1)
-            
-            # 提取子网掩码 - 支持中英文格式
-            subnet_match = re.search(r'子网掩码[^:]*:\s*([0-9.]+)', adapter_text)
-            if not subnet_match:
-                subnet_match = re.search(r'Subnet Mask[^:]*:\s*([0-9.]+)', adapter_text)
-            if subnet_match:
-                config['subnet'] = subnet_match.group(1)
-            
-            # 提取默认网关 - 支持中英文格式和多行格式
-            gateway_match = re.search(r'默认网关[^:]*:[^\n]*\n?[^\n]*?([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})', adapter_text, re.MULTILINE)
-            if not gateway_match:
-                gateway_match = re.search(r'Default Gateway[^:]*:[^\n]*\n?[^\n]*?([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})', adapter_text, re.MULTILINE)
-            if not gateway_match:
-                gateway_match = re.search(r'默认网关[^:]*:\s*([0-9.]+)', adapter_text)
-            if not gateway_match:
-                gateway_match = re.search(r'Default Gateway[^:]*:\s*([0-9.]+)', adapter_text)
-            if not gateway_match:
-                gateway_match = re.search(r'网关[^:]*:\s*([0-9.]+)', adapter_text)
-            if gateway_match:
-                config['gateway'] = gateway_match.group(1)
-            
-            # 提取DNS服务器 - 支持中英文格式和多行格式
-            dns_matches = re.findall(r'DNS 服务器[^:]*:[^\n]*\n?[^\n]*?([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})', adapter_text, re.MULTILINE)
-            if not dns_matches:
-                dns_matches = re.findall(r'DNS Servers[^:]*:[^\n]*\n?[^\n]*?([0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3})', adapter_text, re.MULTILINE)
-            if not dns_matches:
-                dns_matches = re.findall(r'DNS 服务器[^:]*:\s*([0-9.]+)', adapter_text)
-            if not dns_matches:
-                dns_matches = re.findall(r'DNS Servers[^:]*:\s*([0-9.]+)', adapter_text)
-            if not dns_matches:
-                dns_matches = re.findall(r'DNS[^:]*:\s*([0-9.]+)', adapter_text)
-            if dns_matches:
-                config['dns1'] = dns_matches[0] if len(dns_matches) > 0 else None
-                config['dns2'] = dns_matches[1] if len(dns_matches) > 1 else None
-            
-            # 检查是否解析到了有效的配置信息
-            if config and ('ip' in config or 'dhcp' in config):
-                return config
-            else:
-                return None
+            return record.to_config()
             
         except Exception as e:
             print(f"备选方案获取配置失败: {e}")
             return None
     
-    def _get_interface_names(self) -> List[str]:
-        """获取netsh接口名称列表"""
-        try:
-            cmd = 'netsh interface show interface'
-            
-            # 尝试不同的编码方式
-            encodings = ['utf-8', 'gbk', 'cp936', 'latin1']
-            result = None
-            
-            for encoding in encodings:
-                try:
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding=encoding)
-                    if result.returncode == 0 and result.stdout:
-                        break
-                except UnicodeDecodeError:
-                    continue
-            
-            if not result or result.returncode != 0:
-                print(f"获取接口列表失败")
-                return []
-            
-            interface_names = []
-            lines = result.stdout.strip().split('\n')
-            
-            for line in lines[3:]:  # 跳过标题行
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        # 接口名称是最后一部分，可能包含空格
-                        interface_name = ' '.join(parts[3:])
-                        interface_names.append(interface_name)
-            
-            return interface_names
-            
-        except Exception as e:
-            print(f"获取接口名称失败: {e}")
-            return []
+    def adapter_registry(self, refresh: bool = False) -> Optional[AdapterRegistry]:
+        """获取适配器标识注册表（首次使用时由当前快照建立，refresh为True时重新查询系统状态后重建）"""
+        if self.registry is not None and not refresh:
+            return self.registry
+        if refresh:
+            self.invalidate_cache()
+        records = self._get_ipconfig_records()
+        configs = self.get_all_current_configs()
+        if records is None and not configs:
+            return self.registry
+        self.registry = AdapterRegistry(records or [], configs)
+        return self.registry
     
     def _get_connection_name(self, adapter_name: str) -> Optional[str]:
-        """根据适配器名称获取netsh可识别的连接名称"""
+        """根据适配器名称或描述获取netsh可识别的连接名称，注册表中找不到时刷新一次再查"""
         try:
-            # 首先尝试直接使用适配器名称
-            test_cmd = f'netsh interface ip show config name="{adapter_name}"'
-            result = subprocess.run(test_cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                return adapter_name
-            
-            # 获取所有可用的连接名称
-            interface_names = self._get_interface_names()
-            
-            # 尝试模糊匹配
-            adapter_lower = adapter_name.lower()
-            for interface_name in interface_names:
-                interface_lower = interface_name.lower()
-                # 检查是否包含关键词
-                if (adapter_lower in interface_lower or 
-                    interface_lower in adapter_lower or
-                    any(word in interface_lower for word in adapter_lower.split()) or
-                    any(word in adapter_lower for word in interface_lower.split())):
-                    return interface_name
-            
-            # 如果没有找到匹配，返回None
+            for refresh in (False, True):
+                registry = self.adapter_registry(refresh=refresh)
+                identity = registry.resolve(adapter_name) if registry else None
+                if identity and identity.connection_name:
+                    return identity.connection_name
+                print(f"适配器注册表中未找到 '{adapter_name}'" + ("" if refresh else "，重新获取适配器信息"))
             return None
             
         except Exception as e:
             print(f"获取连接名称失败: {e}")
             return None
     
-    def _prefix_to_netmask(self, prefix_length: int) -> str:
-        """将前缀长度转换为子网掩码"""
-        mask_map = {
-            8: "255.0.0.0",
-            16: "255.255.0.0",
-            24: "255.255.255.0",
-            25: "255.255.255.128",
-            26: "255.255.255.192",
-            27: "255.255.255.224",
-            28: "255.255.255.240",
-            29: "255.255.255.248",
-            30: "255.255.255.252"
-        }
-        return mask_map.get(prefix_length, "255.255.255.0")
-    
     def _is_admin(self) -> bool:
         """检查是否有管理员权限"""
         try:
@@ -522,96 +536,352 @@ class NetworkManager:
         except:
             return False
     
-    def apply_config(self, adapter_name: str, config: NetworkConfig) -> bool:
-        """应用网络配置"""
-        try:
-            # 检查管理员权限
-            if not self._is_admin():
-                print("错误：需要管理员权限才能修改网络配置")
-                return False
-            
-            # 获取netsh可识别的连接名称
-            connection_name = self._get_connection_name(adapter_name)
-            if not connection_name:
-                print(f"无法找到适配器 '{adapter_name}' 对应的连接名称")
-                return False
-            
+    def _build_apply_script(self, connection_name: str, config: NetworkConfig,
+                            address: bool = True, dns: bool = True) -> NetshScript:
+        """生成应用配置的netsh脚本（地址命令在前，DNS命令在后），address/dns为False时跳过对应部分"""
+        script = NetshScript()
+        name = f'name={connection_name}'
+        if address:
             if config.dhcp:
                 # 设置为DHCP
-                ip_cmd = f'netsh interface ip set address name="{connection_name}" dhcp'
-                dns_cmd = f'netsh interface ip set dns name="{connection_name}" dhcp'
+                script.add(['interface', 'ip', 'set', 'address', name, 'dhcp'])
             else:
                 # 设置静态IP
-                ip_cmd = f'netsh interface ip set address name="{connection_name}" static {config.ip} {config.subnet}'
+                ip_cmd = ['interface', 'ip', 'set', 'address', name, 'static', config.ip, config.subnet]
                 if config.gateway:
-                    ip_cmd += f' {config.gateway}'
-                
-                # 设置DNS
-                if config.dns1:
-                    dns_cmd = f'netsh interface ip set dns name="{connection_name}" static {config.dns1}'
-                    if config.dns2:
-                        dns_cmd += f' && netsh interface ip add dns name="{connection_name}" {config.dns2} index=2'
-                else:
-                    dns_cmd = f'netsh interface ip set dns name="{connection_name}" dhcp'
-            
-            print(f"正在应用配置到适配器: {adapter_name} (连接名称: {connection_name})")
-            
-            # 执行IP配置命令
-            ip_result = subprocess.run(ip_cmd, shell=True, capture_output=True, text=True, encoding='gbk')
-            if ip_result.returncode != 0:
-                error_msg = ip_result.stderr or ip_result.stdout
-                print(f"设置IP失败: {error_msg}")
-                return False
-            
-            # 执行DNS配置命令
-            dns_result = subprocess.run(dns_cmd, shell=True, capture_output=True, text=True, encoding='gbk')
-            if dns_result.returncode != 0:
-                error_msg = dns_result.stderr or dns_result.stdout
-                print(f"设置DNS失败: {error_msg}")
-                return False
-            
-            print("网络配置应用成功")
-            return True
-            
+                    ip_cmd.append(config.gateway)
+                script.add(ip_cmd)
+        
+        if dns:
+            # 设置DNS（不验证DNS服务器可达，避免成功时输出警告）
+            if config.dns1:
+                script.add(['interface', 'ip', 'set', 'dns', name, 'static', config.dns1, 'validate=no'])
+                if config.dns2:
+                    script.add(['interface', 'ip', 'add', 'dns', name, config.dns2, 'index=2', 'validate=no'])
+            else:
+                script.add(['interface', 'ip', 'set', 'dns', name, 'dhcp'])
+        return script
+    
+    def _plan_apply(self, plan: ApplyPlan, current: Optional[Dict]):
+        """比较目标配置与当前配置，只保留需要改写的部分"""
+        plan.current = current
+        if current is None:
+            return
+        live = NetworkConfig.from_current(plan.config.name, current)
+        if plan.config.address_key() == live.address_key():
+            plan.address = False
+            plan.skipped.append(ApplyPlan.ADDRESS)
+        # 目标没有静态DNS时要求当前也没有
+        if plan.config.dns_key() == live.dns_key():
+            plan.dns = False
+            plan.skipped.append(ApplyPlan.DNS)
+    
+    def _report_script_results(self, results: List[NetshCommandResult]) -> bool:
+        """逐条输出脚本执行结果，全部成功时返回True"""
+        success = True
+        for result in results:
+            if not result.ok:
+                print(f"命令执行失败: {result}")
+                success = False
+        return success
+    
+    def apply_config(self, adapter_name: str, config: NetworkConfig,
+                     current_configs: Dict[str, Dict] = None) -> ApplyPlan:
+        """应用网络配置，只改写与当前配置不同的部分，返回执行计划（执行过命令后系统状态快照失效）
+
+        current_configs 为批量切换前预先获取的全部接口配置，用于与当前配置比较；
+        此时执行后不使快照失效，由调用方在全部切换完成后统一处理。
+        """
+        plan = ApplyPlan(adapter_name, config)
+        start = time.perf_counter()
+        try:
+            script = self._prepare_apply(plan, current_configs)
+            if script is not None:
+                rollback = self._finish_apply(plan, script.run(self.runner))
+                if rollback is not None:
+                    rollback_start = time.perf_counter()
+                    results = rollback.run(self.runner)
+                    self._finish_rollback(plan, results, time.perf_counter() - rollback_start)
         except Exception as e:
-            print(f"应用配置失败: {e}")
-            return False
+            self._fail_apply(plan, f"应用配置失败: {e}")
+        finally:
+            self._complete_apply(plan, start, invalidate=current_configs is None)
+        return plan
+    
+    def apply_configs(self, assignments: Dict[str, NetworkConfig], max_workers: int = 4) -> BulkApplyResult:
+        """同时切换多个适配器（适配器名称 -> 配置），最多 max_workers 个并发"""
+        start = time.perf_counter()
+        plans = {}
+        if assignments:
+            # 预先获取一次配置快照，各适配器共享，避免并发重复查询；全部完成后才使快照失效
+            current_configs = self.get_all_current_configs()
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(assignments)))) as pool:
+                futures = {adapter_name: pool.submit(self.apply_config, adapter_name, config, current_configs)
+                           for adapter_name, config in assignments.items()}
+                plans = {adapter_name: future.result() for adapter_name, future in futures.items()}
+            self._complete_bulk_apply(plans)
+        result = BulkApplyResult(plans, time.perf_counter() - start)
+        print(result)
+        return result
+    
+    def resolve_scene(self, scene: NetworkScene) -> Dict[str, Optional[NetworkConfig]]:
+        """把场景中的配置名称解析为配置对象（找不到的配置为None）"""
+        return {adapter_name: self.get_config_by_name(config_name)
+                for adapter_name, config_name in scene.assignments.items()}
+    
+    def apply_scene(self, scene: NetworkScene, max_workers: int = 4) -> BulkApplyResult:
+        """应用多适配器场景"""
+        assignments = self.resolve_scene(scene)
+        result = self.apply_configs({name: config for name, config in assignments.items() if config is not None},
+                                    max_workers)
+        self._fail_missing_configs(scene, assignments, result)
+        return result
+    
+    def _fail_missing_configs(self, scene: NetworkScene, assignments: Dict[str, Optional[NetworkConfig]],
+                              result: BulkApplyResult):
+        """场景中引用的配置已被删除时，对应适配器记为失败"""
+        for adapter_name, config in assignments.items():
+            if config is None:
+                config_name = scene.assignments[adapter_name]
+                plan = ApplyPlan(adapter_name, NetworkConfig(config_name))
+                self._fail_apply(plan, f"配置 '{config_name}' 不存在")
+                result.plans[adapter_name] = plan
+    
+    def _prepare_apply(self, plan: ApplyPlan, current_configs: Dict[str, Dict] = None) -> Optional[NetshScript]:
+        """检查配置、权限、确定连接名称并与当前配置比较，返回需要执行的脚本（无需执行时返回None）
+
+        current_configs 为批量切换预先获取的全部接口配置，其中没有该连接时再单独查询
+        """
+        # 无效的静态配置在本地拒绝，不必等netsh报错
+        error = plan.config.validate()
+        if error:
+            self._fail_apply(plan, f"配置 '{plan.config.name}' 无效: {error}")
+            return None
+        warning = plan.config.warning()
+        if warning:
+            print(f"配置 '{plan.config.name}' 提示: {warning}")
+        
+        # 检查管理员权限
+        if not self._is_admin():
+            self._fail_apply(plan, "错误：需要管理员权限才能修改网络配置")
+            return None
+        
+        # 获取netsh可识别的连接名称
+        connection_name = self._get_connection_name(plan.adapter_name)
+        if not connection_name:
+            self._fail_apply(plan, f"无法找到适配器 '{plan.adapter_name}' 对应的连接名称")
+            return None
+        plan.connection_name = connection_name
+        
+        current = (current_configs or {}).get(connection_name)
+        self._plan_apply(plan, current if current is not None else self.get_current_config(connection_name))
+        if plan.is_noop:
+            print(f"适配器 {plan.adapter_name} 已是目标配置 {plan.config.name}，跳过切换")
+            plan.success = True
+            return None
+        if plan.skipped:
+            print(f"与当前配置相同，跳过: {', '.join(plan.skipped)}")
+        
+        print(f"正在应用配置到适配器: {plan.adapter_name} (连接名称: {connection_name})")
+        return self._build_apply_script(connection_name, plan.config, plan.address, plan.dns)
+    
+    def _finish_apply(self, plan: ApplyPlan, results: List[NetshCommandResult]) -> Optional[NetshScript]:
+        """记录脚本执行结果，部分命令失败时返回恢复切换前配置的脚本"""
+        plan.results = results
+        # 所有命令通过一次netsh调用执行，逐条报告结果
+        plan.success = self._report_script_results(results)
+        if plan.success:
+            print("网络配置应用成功")
+            return None
+        
+        plan.error = "部分命令执行失败"
+        if any(result.unknown for result in results):
+            plan.error = "netsh超时或意外退出，部分命令的结果未知"
+        # 失败的命令也可能已部分生效（如地址已设置但网关设置失败），结果未知的命令可能已经生效，
+        # 因此只要知道切换前的配置就恢复
+        if plan.current is None:
+            return None
+        previous = NetworkConfig.from_current("切换前的配置", plan.current)
+        # 当前配置中缺少子网掩码等字段时无法生成恢复命令
+        error = previous.validate()
+        if error:
+            plan.rollback_error = f"切换前的配置不完整: {error}"
+            print(f"切换失败，无法恢复适配器 {plan.adapter_name} 切换前的配置: {error}")
+            return None
+        print(f"切换失败，恢复适配器 {plan.adapter_name} 切换前的配置")
+        # 只恢复本次改写过的部分
+        return self._build_apply_script(plan.connection_name, previous, plan.address, plan.dns)
+    
+    def _finish_rollback(self, plan: ApplyPlan, results: List[NetshCommandResult], elapsed: float):
+        """记录回滚结果和耗时"""
+        plan.rollback_results = results
+        plan.rollback_seconds = elapsed
+        if self._report_script_results(results):
+            print(f"已恢复切换前的配置，用时 {elapsed:.2f} 秒")
+        else:
+            print(f"恢复切换前的配置失败，用时 {elapsed:.2f} 秒")
+    
+    def _complete_apply(self, plan: ApplyPlan, start: float, invalidate: bool = True):
+        """切换结束（同步和异步接口共用）：执行过命令后系统状态快照失效（invalidate 为False时由批量切换统一处理），
+        记录耗时，成功时记录配置的使用"""
+        if plan.results and invalidate:
+            self.invalidate_cache()
+        plan.elapsed = time.perf_counter() - start
+        if plan.success:
+            self.usage.record(plan.config.name)
+    
+    def _complete_bulk_apply(self, plans: Dict[str, ApplyPlan]):
+        """批量切换全部完成：有适配器执行过命令时使快照失效一次"""
+        if any(plan.results for plan in plans.values()):
+            self.invalidate_cache()
+    
+    def _fail_apply(self, plan: ApplyPlan, message: str):
+        print(message)
+        plan.error = message
+        plan.success = False
+    
+    def _create_profile_store(self, settings: Dict):
+        """按设置的 profile_backend 创建配置库：默认JSON文件，"sqlite" 时使用SQLite数据库
+        
+        首次使用SQLite时自动导入原有的JSON配置文件（原文件保留）。
+        """
+        if settings.get('profile_backend') == 'sqlite':
+            try:
+                store = SqliteProfileStore(settings.get('profile_database', 'network_configs.db'), NetworkConfig)
+                store.migrate_from_json(self.config_file)
+                return store
+            except Exception as e:
+                print(f"打开配置数据库失败，改用JSON配置文件: {e}")
+        return ProfileStore(self.config_file, NetworkConfig)
+    
+    def search_configs(self, query: str, limit: int = None) -> List[NetworkConfig]:
+        """按名称、标签、IP、子网掩码、网段、网关或DNS的前缀搜索配置（多个词须都匹配），按配置列表顺序返回"""
+        index = self._search_index
+        if index is None or index.revision != self.config_revision:
+            # 第一次搜索，或配置经由其他途径（整体替换、批量修改回滚等）发生了变化
+            index = self._search_index = ProfileSearchIndex()
+            index.rebuild(self.configs, self.config_revision)
+        return index.search(query, limit)
+    
+    def _update_search_index(self, before: int, config: NetworkConfig = None, name: str = None):
+        """配置增删改后增量更新搜索索引：config 为加入或修改后的配置，name 为被删除或改名前的配置名称。
+        索引尚未建立或在此之前已经过期时不更新，下次搜索时重建"""
+        index = self._search_index
+        if index is None or index.revision != before or before == self.config_revision:
+            return
+        if config is None:
+            index.remove(name)
+        else:
+            index.add(config, name)
+        index.revision = self.config_revision
+    
+    def find_configs(self, tag: str = None, subnet: str = None) -> List[NetworkConfig]:
+        """按标签和/或网段（192.168.1.0/24 或 192.168.1.20）查找配置"""
+        if tag is None and subnet is None:
+            return list(self.configs)
+        if tag is not None:
+            configs = self.profiles.find_by_tag(tag)
+            if subnet is not None:
+                names = {config.name for config in self.profiles.find_by_subnet(subnet)}
+                configs = [config for config in configs if config.name in names]
+            return configs
+        return self.profiles.find_by_subnet(subnet)
+    
+    @property
+    def configs(self) -> List[NetworkConfig]:
+        """全部配置（按添加顺序）"""
+        return self.profiles.configs
+    
+    @property
+    def config_revision(self) -> int:
+        """配置修订号，配置有任何修改时递增"""
+        return self.profiles.revision
     
     def save_configs(self):
         """保存配置到文件"""
-        try:
-            data = [config.to_dict() for config in self.configs]
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存配置失败: {e}")
+        self.profiles.save()
     
     def load_configs(self):
         """从文件加载配置"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                self.configs = [NetworkConfig.from_dict(item) for item in data]
-            else:
-                self.configs = []
-        except Exception as e:
-            print(f"加载配置失败: {e}")
-            self.configs = []
+        self.profiles.load()
     
     def add_config(self, config: NetworkConfig):
-        """添加新配置"""
-        self.configs.append(config)
-        self.save_configs()
+        """添加新配置（已有同名配置时原位替换）"""
+        before = self.config_revision
+        self.profiles.add(config)
+        self._update_search_index(before, config)
+    
+    def update_config(self, name: str, config: NetworkConfig) -> bool:
+        """原位更新配置（可以改名），保持配置在列表中的位置，只写入一次文件"""
+        before = self.config_revision
+        if not self.profiles.update(name, config):
+            return False
+        self._update_search_index(before, config, name)
+        if config.name != name:
+            self.usage.rename(name, config.name)
+            # 改名后同步更新引用该配置的场景
+            renamed = [scene for scene in self.scenes if name in scene.assignments.values()]
+            for scene in renamed:
+                scene.assignments = {adapter: config.name if value == name else value
+                                     for adapter, value in scene.assignments.items()}
+            if renamed:
+                self.save_scenes()
+        return True
     
     def remove_config(self, config_name: str):
         """删除配置"""
-        self.configs = [c for c in self.configs if c.name != config_name]
-        self.save_configs()
+        before = self.config_revision
+        if self.profiles.remove(config_name):
+            self.usage.remove(config_name)
+            self._update_search_index(before, name=config_name)
+    
+    def config_batch(self):
+        """批量修改配置，结束时只写入一次文件，出错时全部撤销：
+        
+            with manager.config_batch():
+                manager.add_config(a)
+                manager.remove_config('b')
+        """
+        return self.profiles.batch()
     
     def get_config_by_name(self, name: str) -> Optional[NetworkConfig]:
         """根据名称获取配置"""
-        for config in self.configs:
-            if config.name == name:
-                return config
+        return self.profiles.get(name)
+    
+    def save_scenes(self):
+        """保存场景到文件"""
+        try:
+            write_json_atomic(self.scene_file, [scene.to_dict() for scene in self.scenes])
+        except Exception as e:
+            print(f"保存场景失败: {e}")
+    
+    def load_scenes(self):
+        """从文件加载场景"""
+        try:
+            if os.path.exists(self.scene_file):
+                with open(self.scene_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.scenes = [NetworkScene.from_dict(item) for item in data]
+            else:
+                self.scenes = []
+        except Exception as e:
+            print(f"加载场景失败: {e}")
+            self.scenes = []
+    
+    def add_scene(self, scene: NetworkScene):
+        """添加场景（同名场景会被替换）"""
+        self.scenes = [s for s in self.scenes if s.name != scene.name]
+        self.scenes.append(scene)
+        self.save_scenes()
+    
+    def remove_scene(self, scene_name: str):
+        """删除场景"""
+        self.scenes = [s for s in self.scenes if s.name != scene_name]
+        self.save_scenes()
+    
+    def get_scene_by_name(self, name: str) -> Optional[NetworkScene]:
+        """根据名称获取场景"""
+        for scene in self.scenes:
+            if scene.name == name:
+                return scene
         return None
\ No newline at end of file
@@ -0,0 +1,236 @@
+import re
+import ipv4
+from typing import List, Dict, Optional, Iterator
+
+# 适配器标题行，如 "Ethernet adapter Ethernet 2:" / "以太网适配器 以太网 2:"
+_HEADER_RE = re.compile(r'^(?P<type>\S.*?)\s*(?:adapter|适配器) (?P<name>.+):\s*$')
+# 字段行，如 "   IPv4 Address. . . . . . . . . . . : 192.168.1.50(Preferred)"
+_FIELD_RE = re.compile(r'^ {1,9}(?P<key>[^\s:.][^:.]*?)[ .]*:\s*(?P<value>.*?)\s*$')
+# 多值字段的续行（网关、DNS服务器），缩进远大于字段行
+_CONTINUATION_RE = re.compile(r'^ {10,}(?P<value>\S.*?)\s*$')
+_IPV4_RE = re.compile(r'^(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})')
+
+# 中英文字段名到记录属性的映射
+_FIELD_KEYS = {
+    'Description': 'description',
+    '描述': 'description',
+    'Physical Address': 'mac',
+    '物理地址': 'mac',
+    'DHCP Enabled': 'dhcp',
+    'DHCP 已启用': 'dhcp',
+    'IPv4 Address': 'ipv4',
+    'IPv4 地址': 'ipv4',
+    'IP Address': 'ipv4',
+    'IP 地址': 'ipv4',
+    'Autoconfiguration IPv4 Address': 'ipv4',
+    '自动配置 IPv4 地址': 'ipv4',
+    'Subnet Mask': 'subnet',
+    '子网掩码': 'subnet',
+    'Default Gateway': 'gateways',
+    '默认网关': 'gateways',
+    'DNS Servers': 'dns_servers',
+    'DNS 服务器': 'dns_servers',
+    'Media State': 'media_state',
+    '媒体状态': 'media_state',
+    'Lease Obtained': 'lease_obtained',
+    '获得租约的时间': 'lease_obtained',
+}
+
+_MULTI_VALUE_FIELDS = ('gateways', 'dns_servers')
+_YES_VALUES = ('Yes', '是')
+
+class AdapterRecord:
+    """ipconfig /all 中单个适配器的解析结果"""
+    def __init__(self, name: str, adapter_type: str = ''):
+        self.name = name
+        self.adapter_type = adapter_type
+        self.description = ''
+        self.mac = None
+        self.dhcp = None
+        self.ipv4 = None
+        self.subnet = None
+        self.gateways = []
+        self.dns_servers = []
+        self.media_state = None
+        self.lease_obtained = None
+
+    @property
+    def has_ipv4(self) -> bool:
+        """是否有可用的IPv4地址（排除APIPA和0.0.0.0）"""
+        return bool(self.ipv4) and not self.ipv4.startswith('169.254') and self.ipv4 != '0.0.0.0'
+
+    def to_config(self) -> Dict:
+        """转换为与 NetworkManager.get_current_config 相同格式的配置字典"""
+        config = {'dhcp': bool(self.dhcp)}
+        if self.ipv4:
+            config['ip'] = self.ipv4
+        if self.subnet:
+            config['subnet'] = self.subnet
+        if self.gateways:
+            config['gateway'] = self.gateways[0]
+        if self.dns_servers:
+            config['dns1'] = self.dns_servers[0]
+            config['dns2'] = self.dns_servers[1] if len(self.dns_servers) > 1 else None
+        return config
+
+    def __repr__(self):
+        return f"AdapterRecord({self.name!r}, {self.description!r}, ipv4={self.ipv4!r})"
+
+def _ipv4_value(value: str) -> Optional[str]:
+    """提取值开头的IPv4地址（去掉"(首选)"等后缀），不是IPv4时返回None"""
+    match = _IPV4_RE.match(value)
+    return match.group(1) if match else None
+
+def parse_ipconfig_all(output: str) -> List[AdapterRecord]:
+    """单遍解析 ipconfig /all 输出，按出现顺序返回适配器记录（支持中英文）"""
+    return list(iter_ipconfig_all(output))
+
+def iter_ipconfig_all(output: str) -> Iterator[AdapterRecord]:
+    """逐个生成 ipconfig /all 中的适配器记录，每个适配器的字段解析完（遇到下一个标题行）即返回"""
+    record = None
+    multi_field = None
+
+    for line in output.split('\n'):
+        line = line.rstrip('\r')
+        if not line.strip():
+            continue
+
+        if not line[0].isspace():
+            if record:
+                yield record
+            match = _HEADER_RE.match(line)
+            record = AdapterRecord(match.group('name'), match.group('type')) if match else None
+            multi_field = None
+            continue
+
+        if record is None:
+            continue
+
+        match = _FIELD_RE.match(line)
+        if match:
+            field = _FIELD_KEYS.get(match.group('key'))
+            value = match.group('value')
+            multi_field = field if field in _MULTI_VALUE_FIELDS else None
+
+            if field in _MULTI_VALUE_FIELDS:
+                address = _ipv4_value(value)
+                if address:
+                    getattr(record, field).append(address)
+            elif field == 'dhcp':
+                record.dhcp = value in _YES_VALUES
+            elif field in ('ipv4', 'subnet'):
+                # 多个IPv4地址时只保留第一个
+                if getattr(record, field) is None:
+                    setattr(record, field, _ipv4_value(value))
+            elif field:
+                setattr(record, field, value)
+            continue
+
+        match = _CONTINUATION_RE.match(line)
+        if match and multi_field:
+            address = _ipv4_value(match.group('value'))
+            if address:
+                getattr(record, multi_field).append(address)
+
+    if record:
+        yield record
+
+def index_records(records: List[AdapterRecord]) -> Dict[str, AdapterRecord]:
+    """按适配器名称和描述建立索引（名称优先）"""
+    index = {}
+    for record in records:
+        if record.description:
+            index.setdefault(record.description, record)
+    for record in records:
+        index[record.name] = record
+    return index
+
+# netsh interface ip show config 的接口标题行
+_NETSH_HEADER_RE = re.compile(r'^(?:Configuration for interface "(?P<en>.+)"|接口 "(?P<zh>.+)" 的配置)\s*$')
+# netsh 字段行，如 "    Subnet Prefix:                        192.168.1.0/24 (mask 255.255.255.0)"
+_NETSH_FIELD_RE = re.compile(r'^ {1,9}(?P<key>\S[^:]*?):\s*(?P<value>.*?)\s*$')
+_PREFIX_RE = re.compile(r'/(\d{1,2})')
+_MASK_RE = re.compile(r'\((?:mask|掩码) (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})\)')
+
+_NETSH_FIELD_KEYS = {
+    'DHCP enabled': 'dhcp',
+    'DHCP 已启用': 'dhcp',
+    'IP Address': 'ip',
+    'IP 地址': 'ip',
+    'Subnet Prefix': 'prefix',
+    '子网前缀': 'prefix',
+    'Default Gateway': 'gateway',
+    '默认网关': 'gateway',
+    'Statically Configured DNS Servers': 'static_dns',
+    '静态配置的 DNS 服务器': 'static_dns',
+    'DNS servers configured through DHCP': 'dhcp_dns',
+    '通过 DHCP 配置的 DNS 服务器': 'dhcp_dns',
+}
+
+class InterfaceConfigRecord:
+    """netsh interface ip show config 中单个接口的解析结果"""
+    def __init__(self, name: str):
+        self.name = name
+        self.dhcp = None
+        self.ip = None
+        self.prefix_length = None
+        self.subnet = None
+        self.gateway = None
+        self.static_dns = []
+        self.dhcp_dns = []
+
+    def __repr__(self):
+        return f"InterfaceConfigRecord({self.name!r}, dhcp={self.dhcp!r}, ip={self.ip!r})"
+
+def parse_netsh_config(output: str) -> Dict[str, InterfaceConfigRecord]:
+    """单遍解析 netsh interface ip show config 输出（可包含多个接口），返回按接口名称索引的记录"""
+    records = {}
+    record = None
+    dns_field = None
+
+    for line in output.split('\n'):
+        line = line.rstrip('\r')
+        if not line.strip():
+            continue
+
+        if not line[0].isspace():
+            match = _NETSH_HEADER_RE.match(line)
+            record = None
+            if match:
+                record = InterfaceConfigRecord(match.group('en') or match.group('zh'))
+                records[record.name] = record
+            dns_field = None
+            continue
+
+        if record is None:
+            continue
+
+        match = _NETSH_FIELD_RE.match(line)
+        if match:
+            field = _NETSH_FIELD_KEYS.get(match.group('key'))
+            value = match.group('value')
+            dns_field = field if field in ('static_dns', 'dhcp_dns') else None
+
+            if field == 'dhcp':
+                record.dhcp = value in _YES_VALUES
+            elif field in ('ip', 'gateway'):
+                if getattr(record, field) is None:
+                    setattr(record, field, _ipv4_value(value))
+            elif field == 'prefix' and record.prefix_length is None:
+                prefix = _PREFIX_RE.search(value)
+                mask = _MASK_RE.search(value)
+                record.prefix_length = int(prefix.group(1)) if prefix else None
+                # 只接受连续的掩码，否则按前缀长度换算
+                record.subnet = mask.group(1) if mask and ipv4.is_valid_netmask(mask.group(1)) else None
+            elif dns_field:
+                address = _ipv4_value(value)
+                if address:
+                    getattr(record, dns_field).append(address)
+            continue
+
+        if dns_field:
+            address = _ipv4_value(line.strip())
+            if address:
+                getattr(record, dns_field).append(address)
+
+    return records
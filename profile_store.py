@@ -0,0 +1,542 @@
+import ipaddress
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Tuple
+
+def write_json_atomic(path: str, data: Any):
+    """写入JSON文件：先写同目录下的临时文件再替换，写入过程中崩溃不会截断原文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def network_of(ip: Optional[str], subnet: Optional[str]) -> Optional[Tuple[int, int, str]]:
+    """配置所在的网段：(起始地址, 结束地址, "网络地址/前缀")，没有静态地址时返回None"""
+    if not ip or not subnet:
+        return None
+    try:
+        network = ipaddress.IPv4Network(f"{ip}/{subnet}", strict=False)
+    except ValueError:
+        return None
+    return int(network.network_address), int(network.broadcast_address), str(network)
+
+def subnet_matcher(value: str):
+    """按网段查找的条件：带前缀（如 192.168.1.0/24）时匹配同一网段，否则匹配包含该地址的网段"""
+    if '/' in value:
+        network = str(ipaddress.IPv4Network(value, strict=False))
+        return lambda config: (network_of(config.ip, config.subnet) or (0, 0, None))[2] == network
+    address = int(ipaddress.IPv4Address(value))
+    def contains(config):
+        network = network_of(config.ip, config.subnet)
+        return network is not None and network[0] <= address <= network[1]
+    return contains
+
+def diff_configs(old: List, new: List) -> Optional[List[tuple]]:
+    """计算把配置列表 old 变为 new 的增量操作，按顺序应用：
+    ('remove', 首行, 末行)、('insert', 首行, 末行)（行号为 new 中的位置）、('change', 行)。
+    保留下来的配置顺序改变或名称重复时返回None（只能整体重建）。
+    """
+    old_names = [config.name for config in old]
+    new_names = [config.name for config in new]
+    old_index = dict(zip(old_names, old))
+    new_set = set(new_names)
+    if len(old_index) != len(old) or len(new_set) != len(new):
+        return None
+
+    operations = []
+    # 删除：从下往上，连续的行合并为一次
+    removed = [row for row, name in enumerate(old_names) if name not in new_set]
+    kept = [name for name in old_names if name in new_set]
+    if kept != [name for name in new_names if name in old_index]:
+        return None
+    while removed:
+        last = first = removed.pop()
+        while removed and removed[-1] == first - 1:
+            first = removed.pop()
+        operations.append(('remove', first, last))
+
+    # 插入：从上往下，连续的新配置合并为一次
+    row = 0
+    while row < len(new_names):
+        if new_names[row] in old_index:
+            row += 1
+            continue
+        first = row
+        while row + 1 < len(new_names) and new_names[row + 1] not in old_index:
+            row += 1
+        operations.append(('insert', first, row))
+        row += 1
+
+    for row, config in enumerate(new):
+        previous = old_index.get(config.name)
+        if previous is not None and previous is not config and previous != config:
+            operations.append(('change', row))
+    return operations
+
+class ProfileStore:
+    """网络配置（profile）存储，保存在JSON文件中
+
+    保持配置的顺序，并按名称记录每个配置在列表中的位置：查找、替换和改名不再逐个比较，
+    删除时只需把其后各项的位置减一。
+    每次修改后整体写入一次文件（原子替换）；在 batch() 中的多次修改只在结束时写入一次，
+    中途出错时全部撤销，文件保持不变。
+    """
+
+    def __init__(self, path: str, config_type):
+        self.path = path
+        self.config_type = config_type
+        self._configs = []
+        # 配置名称 -> 在 _configs 中的位置
+        self._positions = {}
+        self._batch_depth = 0
+        self._dirty = False
+        # 每次修改递增，界面据此判断配置列表是否需要更新
+        self.revision = 0
+
+    @property
+    def configs(self) -> List:
+        """按顺序排列的全部配置（只读，修改请使用 add/update/remove）"""
+        return self._configs
+
+    def __len__(self):
+        return len(self._configs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def load(self):
+        """从文件加载配置，文件不存在或损坏时为空"""
+        configs = []
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                configs = [self.config_type.from_dict(item) for item in data]
+        except Exception as e:
+            print(f"加载配置失败: {e}")
+            configs = []
+        self._replace_all(configs)
+
+    def save(self):
+        """写入文件（在 batch() 中时推迟到批量修改结束）"""
+        if self._batch_depth:
+            self._dirty = True
+            return
+        try:
+            write_json_atomic(self.path, [config.to_dict() for config in self._configs])
+            self._dirty = False
+        except Exception as e:
+            print(f"保存配置失败: {e}")
+
+    def _replace_all(self, configs: List):
+        self.revision += 1
+        self._configs = []
+        self._positions = {}
+        for config in configs:
+            self._put(config)
+
+    def _put(self, config):
+        """同名配置原位替换，否则追加到末尾"""
+        self.revision += 1
+        position = self._positions.get(config.name)
+        if position is None:
+            self._positions[config.name] = len(self._configs)
+            self._configs.append(config)
+        else:
+            self._configs[position] = config
+
+    def _delete(self, name: str):
+        """删除配置，其后各项的位置前移"""
+        position = self._positions.pop(name)
+        del self._configs[position]
+        for config in self._configs[position:]:
+            self._positions[config.name] -= 1
+
+    def get(self, name: str):
+        """按名称获取配置，不存在时返回None"""
+        position = self._positions.get(name)
+        return None if position is None else self._configs[position]
+
+    def find_by_tag(self, tag: str) -> List:
+        """带有指定标签的配置"""
+        return [config for config in self._configs if tag in config.tags]
+
+    def find_by_subnet(self, value: str) -> List:
+        """按网段查找配置，value 为网段（192.168.1.0/24）或地址（192.168.1.20）"""
+        matches = subnet_matcher(value)
+        return [config for config in self._configs if matches(config)]
+
+    def add(self, config):
+        """添加配置（已有同名配置时原位替换）"""
+        self._put(config)
+        self.save()
+
+    def update(self, name: str, config) -> bool:
+        """原位更新配置（可以改名），保持其在列表中的位置；配置不存在时返回False"""
+        if name not in self._positions:
+            return False
+        if config.name != name and config.name in self._positions:
+            # 改成已存在的名称：覆盖原位置，删除同名的另一项
+            self._delete(config.name)
+        self.revision += 1
+        position = self._positions.pop(name)
+        self._positions[config.name] = position
+        self._configs[position] = config
+        self.save()
+        return True
+
+    def remove(self, name: str) -> bool:
+        """删除配置，不存在时返回False"""
+        if name not in self._positions:
+            return False
+        self.revision += 1
+        self._delete(name)
+        self.save()
+        return True
+
+    def replace_all(self, configs: List):
+        """替换全部配置"""
+        self._replace_all(configs)
+        self.save()
+
+    @contextmanager
+    def batch(self):
+        """批量修改：结束时只写入一次文件，出错时撤销本次批量中的全部修改"""
+        configs = list(self._configs)
+        positions = dict(self._positions)
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._configs = configs
+            self._positions = positions
+            self.revision += 1
+            if self._batch_depth == 1:
+                self._dirty = False
+            raise
+        finally:
+            self._batch_depth -= 1
+        if not self._batch_depth and self._dirty:
+            self.save()
+
+class SqliteProfileStore:
+    """SQLite 保存的网络配置库，接口与 ProfileStore 相同，适合数千条配置
+
+    加载时一次查询读取全部配置保存在内存中（配置列表、托盘菜单和搜索索引启动时都要用到全部配置），
+    按名称查找不再访问数据库；按标签和网段查找使用数据库中的索引。
+    每次修改是一个事务，batch() 中的修改合并为一个事务，出错时回滚。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL UNIQUE,
+            ip TEXT, subnet TEXT, gateway TEXT, dns1 TEXT, dns2 TEXT,
+            dhcp INTEGER NOT NULL DEFAULT 0,
+            tags TEXT NOT NULL DEFAULT '[]',
+            network TEXT
+        );
+        CREATE INDEX IF NOT EXISTS profiles_position ON profiles (position);
+        CREATE INDEX IF NOT EXISTS profiles_network ON profiles (network);
+        CREATE TABLE IF NOT EXISTS profile_tags (
+            profile_id INTEGER NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+            tag TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS profile_tags_tag ON profile_tags (tag);
+        CREATE INDEX IF NOT EXISTS profile_tags_profile ON profile_tags (profile_id);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+    COLUMNS = "name, ip, subnet, gateway, dns1, dns2, dhcp, tags"
+
+    def __init__(self, path: str, config_type):
+        self.path = path
+        self.config_type = config_type
+        self._configs = []
+        # 配置名称 -> 在 _configs 中的位置
+        self._positions = {}
+        self._batch_depth = 0
+        self.revision = 0
+        # 查询可能来自后台事件循环线程
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(self.SCHEMA)
+
+    @property
+    def configs(self) -> List:
+        """按顺序排列的全部配置（只读，修改请使用 add/update/remove）"""
+        return self._configs
+
+    def __len__(self):
+        return len(self._configs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def load(self):
+        """从数据库读取全部配置"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {self.COLUMNS} FROM profiles ORDER BY position").fetchall()
+            self._configs = [self._from_row(row) for row in rows]
+            self._positions = {config.name: position for position, config in enumerate(self._configs)}
+            self.revision += 1
+
+    def save(self):
+        """提交修改（在 batch() 中时推迟到批量修改结束）"""
+        if self._batch_depth:
+            return
+        with self._lock:
+            try:
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"保存配置失败: {e}")
+
+    def _from_row(self, row):
+        name, ip, subnet, gateway, dns1, dns2, dhcp, tags = row
+        return self.config_type(name, ip, subnet, gateway, dns1, dns2, bool(dhcp), json.loads(tags))
+
+    def get(self, name: str):
+        """按名称获取配置，不存在时返回None"""
+        position = self._positions.get(name)
+        return None if position is None else self._configs[position]
+
+    def _select(self, where: str, params: tuple) -> List:
+        """按条件查询配置名称，返回内存中对应的配置"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT name FROM profiles WHERE {where} ORDER BY position", params).fetchall()
+            return [self._configs[self._positions[row[0]]] for row in rows]
+
+    def find_by_tag(self, tag: str) -> List:
+        """带有指定标签的配置"""
+        return self._select("id IN (SELECT profile_id FROM profile_tags WHERE tag = ?)", (tag,))
+
+    def find_by_subnet(self, value: str) -> List:
+        """按网段查找配置，value 为网段（192.168.1.0/24）或地址（192.168.1.20）"""
+        if '/' in value:
+            return self._select("network = ?", (str(ipaddress.IPv4Network(value, strict=False)),))
+        # 包含该地址的网段只可能是 /0 到 /32 这33个，逐个走网段索引
+        networks = tuple(str(ipaddress.IPv4Network(f"{value}/{prefix}", strict=False)) for prefix in range(33))
+        return self._select(f"network IN ({', '.join('?' * len(networks))})", networks)
+
+    def _values(self, config) -> tuple:
+        network = network_of(config.ip, config.subnet)
+        return (config.name, config.ip, config.subnet, config.gateway, config.dns1, config.dns2,
+                int(bool(config.dhcp)), json.dumps(list(config.tags), ensure_ascii=False),
+                network[2] if network else None)
+
+    def _write_tags(self, profile_id: int, tags):
+        self._conn.execute("DELETE FROM profile_tags WHERE profile_id = ?", (profile_id,))
+        self._conn.executemany("INSERT INTO profile_tags (profile_id, tag) VALUES (?, ?)",
+                               [(profile_id, tag) for tag in set(tags)])
+
+    def _insert(self, config, position: int):
+        cursor = self._conn.execute(
+            "INSERT INTO profiles (name, ip, subnet, gateway, dns1, dns2, dhcp, tags, network, position)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._values(config) + (position,)
+        )
+        self._write_tags(cursor.lastrowid, config.tags)
+        self.revision += 1
+        self._positions[config.name] = len(self._configs)
+        self._configs.append(config)
+
+    def _update_row(self, name: str, config):
+        """原位更新一行，返回是否存在"""
+        row = self._conn.execute("SELECT id FROM profiles WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return False
+        self._conn.execute(
+            "UPDATE profiles SET name = ?, ip = ?, subnet = ?, gateway = ?, dns1 = ?, dns2 = ?, dhcp = ?, tags = ?,"
+            " network = ? WHERE id = ?", self._values(config) + (row[0],)
+        )
+        self._write_tags(row[0], config.tags)
+        self.revision += 1
+        position = self._positions.pop(name)
+        self._positions[config.name] = position
+        self._configs[position] = config
+        return True
+
+    def _next_position(self) -> int:
+        row = self._conn.execute("SELECT MAX(position) FROM profiles").fetchone()
+        return (row[0] or 0) + 1
+
+    def add(self, config):
+        """添加配置（已有同名配置时原位替换）"""
+        with self._lock, self._transaction():
+            if not self._update_row(config.name, config):
+                self._insert(config, self._next_position())
+
+    def update(self, name: str, config) -> bool:
+        """原位更新配置（可以改名），保持其在列表中的位置；配置不存在时返回False"""
+        with self._lock, self._transaction():
+            if name not in self._positions:
+                return False
+            if config.name != name:
+                # 改成已存在的名称：删除同名的另一项
+                self._delete_row(config.name)
+            return self._update_row(name, config)
+
+    def _delete_row(self, name: str) -> bool:
+        cursor = self._conn.execute("DELETE FROM profiles WHERE name = ?", (name,))
+        if not cursor.rowcount:
+            return False
+        self.revision += 1
+        # 其后各项的位置前移
+        position = self._positions.pop(name)
+        del self._configs[position]
+        for config in self._configs[position:]:
+            self._positions[config.name] -= 1
+        return True
+
+    def remove(self, name: str) -> bool:
+        """删除配置，不存在时返回False"""
+        with self._lock, self._transaction():
+            return self._delete_row(name)
+
+    def replace_all(self, configs: List):
+        """替换全部配置"""
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM profiles")
+            self.revision += 1
+            self._configs = []
+            self._positions = {}
+            for position, config in enumerate(configs, 1):
+                if not self._update_row(config.name, config):
+                    self._insert(config, position)
+
+    @contextmanager
+    def _transaction(self):
+        """单次修改：不在批量修改中时立即提交，出错时回滚"""
+        try:
+            yield
+        except BaseException:
+            if not self._batch_depth:
+                self._rollback()
+            raise
+        self.save()
+
+    def _rollback(self):
+        self._conn.rollback()
+        self.load()
+
+    @contextmanager
+    def batch(self):
+        """批量修改：合并为一个事务，出错时回滚本次批量中的全部修改"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self._batch_depth == 1:
+                    self._rollback()
+                raise
+            finally:
+                self._batch_depth -= 1
+            self.save()
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """把JSON配置文件导入到空的数据库（只导入一次，原文件保留），返回导入的配置数"""
+        with self._lock:
+            if self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone():
+                return 0
+            source = ProfileStore(json_path, self.config_type)
+            source.load()
+            imported = 0
+            with self.batch():
+                # 此时可能还没有 load()，直接查询表中的行数
+                if not self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]:
+                    self.replace_all(source.configs)
+                    imported = len(source)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                                   (os.path.abspath(json_path),))
+            if imported:
+                print(f"已从 {json_path} 导入 {imported} 个配置")
+            return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class ProfileUsage:
+    """配置的使用记录（切换成功的次数和最近一次的时间），保存在JSON文件中，用于托盘菜单的最近使用和常用配置"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._usage = {}
+        # 并行切换多个适配器时会同时记录
+        self._lock = threading.Lock()
+        self.revision = 0
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._usage = {name: (int(entry['count']), float(entry['last_used']))
+                                   for name, entry in json.load(f).items()}
+        except Exception as e:
+            print(f"加载配置使用记录失败: {e}")
+            self._usage = {}
+        self.revision += 1
+
+    def save(self):
+        try:
+            write_json_atomic(self.path, {name: {'count': count, 'last_used': last_used}
+                                          for name, (count, last_used) in self._usage.items()})
+        except Exception as e:
+            print(f"保存配置使用记录失败: {e}")
+
+    def record(self, name: str):
+        """记录一次使用"""
+        with self._lock:
+            count, _ = self._usage.get(name, (0, 0.0))
+            self._usage[name] = (count + 1, time.time())
+            self.revision += 1
+            self.save()
+
+    def rename(self, old_name: str, new_name: str):
+        with self._lock:
+            if old_name in self._usage:
+                self._usage[new_name] = self._usage.pop(old_name)
+                self.revision += 1
+                self.save()
+
+    def remove(self, name: str):
+        with self._lock:
+            if self._usage.pop(name, None) is not None:
+                self.revision += 1
+                self.save()
+
+    def count(self, name: str) -> int:
+        return self._usage.get(name, (0, 0.0))[0]
+
+    def recent(self, limit: int = 5) -> List[str]:
+        """最近使用的配置名称，最近的在前"""
+        with self._lock:
+            items = sorted(self._usage.items(), key=lambda item: item[1][1], reverse=True)
+        return [name for name, _ in items[:limit]]
+
+    def most_used(self, limit: int = 5) -> List[str]:
+        """使用次数最多的配置名称，次数相同时最近使用的在前"""
+        with self._lock:
+            items = sorted(self._usage.items(), key=lambda item: item[1], reverse=True)
+        return [name for name, _ in items[:limit]]
+
+    def to_dict(self) -> Dict[str, Tuple[int, float]]:
+        with self._lock:
+            return dict(self._usage)
@@ -0,0 +1,155 @@
+import sys
+import asyncio
+import threading
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from change_monitor import start_change_source
+
+class AsyncBridge(QObject):
+    """Qt 与 asyncio 的桥接
+
+    在后台线程运行 asyncio 事件循环，界面线程通过 submit 提交协程，
+    协程结果经由信号回到界面线程再调用回调，回调中可以安全地更新控件。
+    """
+
+    _finished = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Windows 上只有 Proactor 事件循环支持子进程
+        if sys.platform == 'win32':
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.new_event_loop()
+        self._finished.connect(self._dispatch)
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro, callback=None, errback=None):
+        """提交协程，返回 concurrent.futures.Future（可调用 cancel() 取消）"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        def on_done(f):
+            if f.cancelled():
+                return
+            error = f.exception()
+            if error is not None:
+                self._finished.emit(errback, error)
+            else:
+                self._finished.emit(callback, f.result())
+
+        future.add_done_callback(on_done)
+        return future
+
+    def stream(self, agen, item_callback, callback=None, errback=None):
+        """提交异步生成器，每生成一项即在界面线程中调用 item_callback，结束后调用 callback（参数为项数）"""
+        async def consume():
+            count = 0
+            async for item in agen:
+                count += 1
+                self._finished.emit(item_callback, item)
+            return count
+        return self.submit(consume(), callback, errback)
+
+    def _dispatch(self, handler, value):
+        """在界面线程中调用回调"""
+        if handler is not None:
+            handler(value)
+        elif isinstance(value, BaseException):
+            print(f"后台任务失败: {value}")
+
+    def shutdown(self):
+        """停止事件循环"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+
+class StatusRefresher(QObject):
+    """定时在后台刷新当前配置
+
+    每次定时触发时通过 AsyncBridge 在后台查询，结果经 refreshed / failed 信号回到界面线程。
+    上一次查询尚未完成时跳过本次触发（不会堆积查询），窗口隐藏时暂停定时器。
+    """
+
+    refreshed = pyqtSignal(object, object)  # (适配器, 当前配置)
+    failed = pyqtSignal(object, object)     # (适配器, 异常)
+
+    def __init__(self, bridge: AsyncBridge, query, interval: int = 5000, parent=None):
+        """query 为 adapter -> 协程 的函数"""
+        super().__init__(parent)
+        self.bridge = bridge
+        self.query = query
+        self.adapter = None
+        self.skipped = 0
+        self._pending = None
+        self._periodic = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.refresh)
+
+    def start(self):
+        """开始定时刷新（有网络变化通知时不需要）"""
+        self._periodic = True
+        self.timer.start()
+
+    def stop(self):
+        self._periodic = False
+        self.timer.stop()
+
+    def pause(self):
+        """暂停定时刷新（窗口隐藏到托盘时）"""
+        self.timer.stop()
+
+    def resume(self):
+        """恢复定时刷新并立即刷新一次"""
+        if self._periodic and not self.timer.isActive():
+            self.timer.start()
+        self.refresh()
+
+    def set_adapter(self, adapter):
+        """切换要刷新的适配器并立即刷新"""
+        self.adapter = adapter
+        self.refresh(force=True)
+
+    def is_running(self) -> bool:
+        return self._pending is not None and not self._pending.done()
+
+    def refresh(self, force: bool = False):
+        """发起一次查询；上一次查询仍在进行时跳过（force 时取消上一次）"""
+        adapter = self.adapter
+        if adapter is None:
+            return
+        if self.is_running():
+            if not force:
+                self.skipped += 1
+                return
+            self._pending.cancel()
+        self._pending = self.bridge.submit(
+            self.query(adapter),
+            lambda config: self.refreshed.emit(adapter, config),
+            lambda error: self.failed.emit(adapter, error)
+        )
+
+class ChangeNotifier(QObject):
+    """网络变化通知
+
+    启动当前系统可用的通知源（Windows IP Helper / Linux netlink，不可用时轮询 snapshot），
+    后台线程中的通知经 changed 信号（参数为变化类型的集合）回到界面线程。
+    """
+
+    changed = pyqtSignal(object)
+
+    def __init__(self, snapshot=None, interval: float = 5.0, parent=None):
+        super().__init__(parent)
+        self.source = start_change_source(self.changed.emit, snapshot, interval)
+
+    @property
+    def available(self) -> bool:
+        return self.source is not None
+
+    def stop(self):
+        if self.source is not None:
+            self.source.stop()
+            self.source = None
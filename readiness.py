@@ -0,0 +1,131 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from network_manager import NetworkManager, NetworkConfig, IPCONFIG_COMMAND
+from parsers import AdapterRecord, index_records
+
+class ReadinessResult:
+    """切换后等待网络就绪的结果"""
+    def __init__(self, ready: bool, elapsed: float, attempts: int, checks: Dict[str, bool]):
+        self.ready = ready
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.checks = checks
+
+    def __bool__(self):
+        return self.ready
+
+    def __str__(self):
+        if self.ready:
+            return f"网络已就绪，用时 {self.elapsed:.2f} 秒（检查 {self.attempts} 次）"
+        pending = ', '.join(name for name, ok in self.checks.items() if not ok)
+        return f"等待网络就绪超时（{self.elapsed:.1f} 秒），未就绪: {pending}"
+
+class ReadinessProbe:
+    """切换配置后轮询适配器状态，直到新配置生效
+
+    就绪条件：地址已绑定（静态配置为目标IP，DHCP为非APIPA地址）、
+    DHCP配置已获得租约、网关可以ping通（没有网关时不检查）。
+    两次检查之间按指数退避等待，超过 deadline 秒仍未就绪则放弃。
+    """
+
+    def __init__(self, manager: NetworkManager, initial_delay: float = 0.1,
+                 max_delay: float = 2.0, factor: float = 2.0, deadline: float = 30.0):
+        self.manager = manager
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.deadline = deadline
+
+    def evaluate(self, record: Optional[AdapterRecord], config: NetworkConfig) -> Dict[str, bool]:
+        """根据ipconfig记录判断地址和DHCP租约是否就绪"""
+        checks = {}
+        if record is None or not record.has_ipv4:
+            checks['address'] = False
+        else:
+            checks['address'] = config.dhcp or record.ipv4 == config.ip
+        if config.dhcp:
+            checks['dhcp'] = bool(record and record.dhcp and record.has_ipv4 and record.lease_obtained)
+        return checks
+
+    def _gateway(self, record: Optional[AdapterRecord], config: NetworkConfig) -> Optional[str]:
+        if not config.dhcp:
+            return config.gateway
+        return record.gateways[0] if record and record.gateways else None
+
+    def _ping_command(self, gateway: str):
+        return ['ping', '-n', '1', '-w', '500', gateway]
+
+    def _find_record(self, result, adapter_name: str) -> Optional[AdapterRecord]:
+        # 命令失败时不使用旧快照，视为未就绪
+        if result.returncode != 0:
+            return None
+        records = self.manager._store_ipconfig_result(result) or []
+        return index_records(records).get(adapter_name)
+
+    def check(self, adapter_name: str, config: NetworkConfig) -> Dict[str, bool]:
+        """检查一次"""
+        record = self._find_record(self.manager.runner.run(IPCONFIG_COMMAND), adapter_name)
+        checks = self.evaluate(record, config)
+        gateway = self._gateway(record, config)
+        if gateway:
+            # 地址未绑定时不必ping网关
+            reachable = False
+            if all(checks.values()):
+                reachable = self.manager.runner.run(self._ping_command(gateway)).returncode == 0
+            checks['gateway'] = reachable
+        return checks
+
+    async def check_async(self, adapter_name: str, config: NetworkConfig) -> Dict[str, bool]:
+        """异步检查一次"""
+        record = self._find_record(await self.manager.runner.run_async(IPCONFIG_COMMAND), adapter_name)
+        checks = self.evaluate(record, config)
+        gateway = self._gateway(record, config)
+        if gateway:
+            reachable = False
+            if all(checks.values()):
+                reachable = (await self.manager.runner.run_async(self._ping_command(gateway))).returncode == 0
+            checks['gateway'] = reachable
+        return checks
+
+    def _next(self, start: float, attempts: int, checks: Dict[str, bool], delay: float):
+        """返回(结果, 下次等待秒数)，已就绪或超过期限时结果不为None"""
+        elapsed = time.monotonic() - start
+        if all(checks.values()):
+            return ReadinessResult(True, elapsed, attempts, checks), 0
+        remaining = self.deadline - elapsed
+        if remaining <= 0:
+            return ReadinessResult(False, elapsed, attempts, checks), 0
+        return None, min(delay, remaining)
+
+    def _finish(self, adapter_name: str, result: ReadinessResult) -> ReadinessResult:
+        # 状态已经变化，后续查询重新获取
+        self.manager.invalidate_cache()
+        print(f"{adapter_name}: {result}")
+        return result
+
+    def wait(self, adapter_name: str, config: NetworkConfig, start: float = None) -> ReadinessResult:
+        """阻塞等待新配置生效，start 为切换完成的时刻（time.monotonic()），就绪耗时和期限从此时算起"""
+        start = time.monotonic() if start is None else start
+        delay = self.initial_delay
+        attempts = 0
+        while True:
+            attempts += 1
+            result, wait = self._next(start, attempts, self.check(adapter_name, config), delay)
+            if result is not None:
+                return self._finish(adapter_name, result)
+            time.sleep(wait)
+            delay = min(delay * self.factor, self.max_delay)
+
+    async def wait_async(self, adapter_name: str, config: NetworkConfig, start: float = None) -> ReadinessResult:
+        """异步等待新配置生效，start 同 wait"""
+        start = time.monotonic() if start is None else start
+        delay = self.initial_delay
+        attempts = 0
+        while True:
+            attempts += 1
+            result, wait = self._next(start, attempts, await self.check_async(adapter_name, config), delay)
+            if result is not None:
+                return self._finish(adapter_name, result)
+            await asyncio.sleep(wait)
+            delay = min(delay * self.factor, self.max_delay)
@@ -0,0 +1,131 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Set
+import ipv4
+
+# 名称和标签按空白、标点拆分为词
+_SPLIT_RE = re.compile(r'[\s\-_/\\.,:;|()（）\[\]【】，、]+')
+# 连续的汉字不好分词，索引其每个后缀，前缀查找即可匹配其中任意一段
+_CJK_RE = re.compile(r'[\u3400-\u9fff]+')
+_MAX_CHAR = '\U0010ffff'
+
+def config_tokens(config) -> Set[str]:
+    """配置的全部索引词（小写）：名称及其各段、标签、IP、子网掩码、网段、网关、DNS"""
+    tokens = set()
+    for text in [config.name] + list(config.tags):
+        text = text.lower()
+        tokens.add(text)
+        tokens.update(part for part in _SPLIT_RE.split(text) if part)
+        for run in _CJK_RE.findall(text):
+            tokens.update(run[start:] for start in range(1, len(run)))
+    if config.dhcp:
+        tokens.add('dhcp')
+    for address in (config.ip, config.subnet, config.gateway, config.dns1, config.dns2):
+        if address:
+            tokens.add(address)
+    # 网段，如 192.168.1.0/24
+    ip, mask = ipv4.compact(config.ip), ipv4.compact(config.subnet)
+    if ip.__class__ is int and ipv4.is_valid_netmask(mask):
+        tokens.add(f"{ipv4.unpack(ip & mask)}/{ipv4.netmask_to_prefix(mask)}")
+    return tokens
+
+class ProfileSearchIndex:
+    """配置的内存搜索索引
+
+    每个（索引词, 配置编号）按索引词排序保存在两个并列的列表中，前缀查询用二分查找确定范围，
+    范围内的配置编号直接切片取出；查询中的多个词取交集。
+    配置编号即配置在列表中的顺序，add / remove 逐个配置增量更新，改名和修改时编号不变。
+    """
+
+    def __init__(self, configs: Iterable = ()):
+        self.revision = None
+        self.rebuild(configs)
+
+    def rebuild(self, configs: Iterable, revision: Optional[int] = None):
+        """按配置列表重建索引"""
+        self._configs = {}
+        self._tokens = {}
+        self._ids = {}
+        entries = []
+        for config_id, config in enumerate(configs):
+            tokens = self._tokens[config_id] = config_tokens(config)
+            self._ids[config.name] = config_id
+            self._configs[config_id] = config
+            entries.extend((token, config_id) for token in tokens)
+        self._next_id = len(self._configs)
+        entries.sort()
+        self._terms = [term for term, _ in entries]
+        self._term_ids = [config_id for _, config_id in entries]
+        self.revision = revision
+
+    def add(self, config, replaces: str = None):
+        """加入一个配置；替换同名配置或 replaces 指定的配置（改名）时保持原来的编号，只更新变化了的索引词"""
+        old_name = replaces or config.name
+        config_id = self._ids.pop(old_name, None)
+        if config.name != old_name:
+            self.remove(config.name)
+        if config_id is None:
+            config_id = self._next_id
+            self._next_id += 1
+            old_tokens = set()
+        else:
+            old_tokens = self._tokens[config_id]
+        tokens = config_tokens(config)
+        self._ids[config.name] = config_id
+        self._configs[config_id] = config
+        self._tokens[config_id] = tokens
+        for token in old_tokens - tokens:
+            self._remove_term(token, config_id)
+        for token in tokens - old_tokens:
+            position = bisect_right(self._terms, token)
+            self._terms.insert(position, token)
+            self._term_ids.insert(position, config_id)
+
+    def remove(self, name: str) -> bool:
+        """删除一个配置，不存在时返回False"""
+        config_id = self._ids.pop(name, None)
+        if config_id is None:
+            return False
+        del self._configs[config_id]
+        for token in self._tokens.pop(config_id):
+            self._remove_term(token, config_id)
+        return True
+
+    def _remove_term(self, token: str, config_id: int):
+        start = bisect_left(self._terms, token)
+        end = bisect_right(self._terms, token, start)
+        position = self._term_ids.index(config_id, start, end)
+        del self._terms[position]
+        del self._term_ids[position]
+
+    def __len__(self):
+        return len(self._configs)
+
+    def _match_word(self, word: str) -> Set[int]:
+        start = bisect_left(self._terms, word)
+        end = bisect_left(self._terms, word + _MAX_CHAR, start)
+        return set(self._term_ids[start:end])
+
+    def match(self, query: str) -> Set[str]:
+        """与查询匹配的配置名称：查询按空白拆分为多个词，每个词匹配任一索引词的前缀，所有词都须匹配"""
+        return {self._configs[config_id].name for config_id in self._match_ids(query)}
+
+    def _match_ids(self, query: str) -> Set[int]:
+        words = query.lower().split()
+        if not words:
+            return set(self._configs)
+        result = None
+        for word in words:
+            ids = self._match_word(word)
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, limit: int = None) -> List:
+        """与查询匹配的配置（按配置列表顺序），limit 为最多返回的数量"""
+        ids = sorted(self._match_ids(query))
+        if limit is not None:
+            ids = ids[:limit]
+        configs = self._configs
+        return [configs[config_id] for config_id in ids]
@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import Any, Hashable
+
+class SnapshotCache:
+    """短期系统状态缓存
+
+    在 ttl 秒内复用同一份 ipconfig / netsh 查询结果，使一次刷新中的
+    适配器枚举、配置读取和接口名称查询共享同一份快照。
+    每个键最近一次成功的值单独保留（不受过期和失效影响），命令失败时可用作备用。
+    """
+
+    MISSING = object()
+
+    def __init__(self, ttl: float = 3.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._last_good = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """获取未过期的缓存值，不存在或已过期时返回 SnapshotCache.MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return self.MISSING
+        timestamp, value = entry
+        if time.monotonic() - timestamp > self.ttl:
+            return self.MISSING
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """写入缓存值"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._last_good[key] = value
+
+    def invalidate(self, key: Hashable = None):
+        """使指定缓存项失效，不指定时清空全部"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def last_good(self, key: Hashable) -> Any:
+        """获取最近一次写入的值（忽略过期和失效），从未写入时返回 SnapshotCache.MISSING"""
+        with self._lock:
+            return self._last_good.get(key, self.MISSING)
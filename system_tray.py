@@ -2,12 +2,23 @@ import sys
 from PyQt5.QtWidgets import (
     QApplication, QSystemTrayIcon, QMenu, QAction, QMessageBox,
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QCheckBox, QComboBox, QWidget
+    QPushButton, QCheckBox, QComboBox, QWidget, QWidgetAction
 )
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QIcon, QPixmap, QPainter, QBrush, QColor
-from network_manager import NetworkManager, NetworkConfig
+from network_manager import NetworkManager, NetworkConfig, NetworkScene
+from qt_workers import ChangeNotifier
+from menu_index import ConfigGroups, usage_sections, pages
+import ipv4
 import os
+import time
+
+# 托盘菜单：配置不超过此数量时直接列出，分组超过 MENU_PAGE_SIZE 项时分页，生成菜单的时间预算（毫秒），
+# 搜索框最多列出的结果数
+MENU_INLINE_LIMIT = 20
+MENU_PAGE_SIZE = 50
+MENU_BUDGET_MS = 50
+MENU_SEARCH_LIMIT = 15
 
 class NetworkConfigDialog(QDialog):
     """网络配置对话框"""
@@ -23,7 +34,7 @@ class NetworkConfigDialog(QDialog):
     
     def init_ui(self):
         self.setWindowTitle("编辑网络配置" if self.edit_mode else "新建网络配置")
-        self.setFixedSize(400, 300)
+        self.setFixedSize(400, 330)
         self.setWindowFlags(Qt.Dialog | Qt.WindowCloseButtonHint)
         
         layout = QVBoxLayout()
@@ -35,6 +46,14 @@ class NetworkConfigDialog(QDialog):
         name_layout.addWidget(self.name_edit)
         layout.addLayout(name_layout)
         
+        # 标签（逗号分隔）
+        tags_layout = QHBoxLayout()
+        tags_layout.addWidget(QLabel("标签:"))
+        self.tags_edit = QLineEdit()
+        self.tags_edit.setPlaceholderText("多个标签用逗号分隔，如: 办公室, 实验室A")
+        tags_layout.addWidget(self.tags_edit)
+        layout.addLayout(tags_layout)
+        
         # DHCP选项
         self.dhcp_checkbox = QCheckBox("使用DHCP自动获取")
         self.dhcp_checkbox.stateChanged.connect(self.on_dhcp_changed)
@@ -104,6 +123,7 @@ class NetworkConfigDialog(QDialog):
         """加载配置数据到界面"""
         if self.config:
             self.name_edit.setText(self.config.name)
+            self.tags_edit.setText(', '.join(self.config.tags))
             self.dhcp_checkbox.setChecked(self.config.dhcp)
             
             if not self.config.dhcp:
@@ -125,10 +145,11 @@ class NetworkConfigDialog(QDialog):
             QMessageBox.warning(self, "警告", "请输入配置名称")
             return None
         
+        tags = [tag.strip() for tag in self.tags_edit.text().replace('，', ',').split(',') if tag.strip()]
         dhcp = self.dhcp_checkbox.isChecked()
         
         if dhcp:
-            return NetworkConfig(name=name, dhcp=True)
+            return NetworkConfig(name=name, dhcp=True, tags=tags)
         else:
             ip = self.ip_edit.text().strip()
             subnet = self.subnet_edit.text().strip()
@@ -140,22 +161,42 @@ class NetworkConfigDialog(QDialog):
                 QMessageBox.warning(self, "警告", "请输入IP地址")
                 return None
             
-            return NetworkConfig(
+            # 子网掩码也可以填写前缀长度，如 "24" 或 "/24"
+            if subnet.lstrip('/').isdigit():
+                try:
+                    subnet = ipv4.prefix_to_netmask(int(subnet.lstrip('/')))
+                except ValueError as e:
+                    QMessageBox.warning(self, "警告", str(e))
+                    return None
+            
+            config = NetworkConfig(
                 name=name,
                 ip=ip if ip else None,
                 subnet=subnet if subnet else None,
                 gateway=gateway if gateway else None,
                 dns1=dns1 if dns1 else None,
                 dns2=dns2 if dns2 else None,
-                dhcp=False
+                dhcp=False,
+                tags=tags
             )
+            error = config.validate()
+            if error:
+                QMessageBox.warning(self, "警告", error)
+                return None
+            warning = config.warning()
+            if warning:
+                reply = QMessageBox.question(self, "确认", f"{warning}\n\n确定要保存这个配置吗？",
+                                             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    return None
+            return config
 
 class AdapterSelectionDialog(QDialog):
     """网络适配器选择对话框"""
     
-    def __init__(self, adapters, parent=None):
+    def __init__(self, adapters=(), parent=None):
         super().__init__(parent)
-        self.adapters = adapters
+        self.adapters = list(adapters)
         self.selected_adapter = None
         self.init_ui()
     
@@ -165,7 +206,8 @@ class AdapterSelectionDialog(QDialog):
         
         layout = QVBoxLayout()
         
-        layout.addWidget(QLabel("请选择要配置的网络适配器:"))
+        self.hint_label = QLabel("请选择要配置的网络适配器:")
+        layout.addWidget(self.hint_label)
         
         self.adapter_combo = QComboBox()
         for adapter in self.adapters:
@@ -174,22 +216,106 @@ class AdapterSelectionDialog(QDialog):
         layout.addWidget(self.adapter_combo)
         
         button_layout = QHBoxLayout()
-        ok_button = QPushButton("确定")
+        self.ok_button = QPushButton("确定")
+        self.ok_button.setEnabled(bool(self.adapters))
         cancel_button = QPushButton("取消")
         
-        ok_button.clicked.connect(self.accept)
+        self.ok_button.clicked.connect(self.accept)
         cancel_button.clicked.connect(self.reject)
         
-        button_layout.addWidget(ok_button)
+        button_layout.addWidget(self.ok_button)
         button_layout.addWidget(cancel_button)
         layout.addLayout(button_layout)
         
         self.setLayout(layout)
     
+    def add_adapter(self, adapter):
+        """逐步加载时添加一个适配器，添加后即可选择"""
+        self.adapters.append(adapter)
+        self.adapter_combo.addItem(str(adapter), adapter)
+        self.ok_button.setEnabled(True)
+    
+    def finish_loading(self, count):
+        """适配器加载完成"""
+        if not self.adapters:
+            self.hint_label.setText("未找到可用的网络适配器")
+    
     def get_selected_adapter(self):
         """获取选中的适配器"""
         return self.adapter_combo.currentData()
 
+class SceneDialog(QDialog):
+    """多适配器场景编辑对话框：为每个适配器选择一个配置"""
+    
+    def __init__(self, adapters, configs, parent=None, scene=None):
+        super().__init__(parent)
+        self.adapters = adapters
+        self.configs = configs
+        self.scene = scene
+        self.config_combos = {}
+        self.init_ui()
+    
+    def init_ui(self):
+        self.setWindowTitle("编辑场景" if self.scene else "新建场景")
+        self.setMinimumWidth(450)
+        
+        layout = QVBoxLayout()
+        
+        name_layout = QHBoxLayout()
+        name_layout.addWidget(QLabel("场景名称:"))
+        self.name_edit = QLineEdit()
+        if self.scene:
+            self.name_edit.setText(self.scene.name)
+        name_layout.addWidget(self.name_edit)
+        layout.addLayout(name_layout)
+        
+        layout.addWidget(QLabel("为每个适配器选择要应用的配置:"))
+        
+        assignments = self.scene.assignments if self.scene else {}
+        for adapter in self.adapters:
+            row = QHBoxLayout()
+            row.addWidget(QLabel(adapter.name))
+            combo = QComboBox()
+            combo.addItem("不修改", None)
+            for config in self.configs:
+                combo.addItem(config.name, config.name)
+            if adapter.name in assignments:
+                index = combo.findData(assignments[adapter.name])
+                if index >= 0:
+                    combo.setCurrentIndex(index)
+            row.addWidget(combo)
+            layout.addLayout(row)
+            self.config_combos[adapter.name] = combo
+        
+        button_layout = QHBoxLayout()
+        ok_button = QPushButton("确定")
+        cancel_button = QPushButton("取消")
+        
+        ok_button.clicked.connect(self.accept)
+        cancel_button.clicked.connect(self.reject)
+        
+        button_layout.addWidget(ok_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+    
+    def get_scene(self):
+        """获取场景"""
+        name = self.name_edit.text().strip()
+        if not name:
+            QMessageBox.warning(self, "警告", "请输入场景名称")
+            return None
+        
+        assignments = {adapter_name: combo.currentData()
+                       for adapter_name, combo in self.config_combos.items()
+                       if combo.currentData() is not None}
+        if not assignments:
+            QMessageBox.warning(self, "警告", "请至少为一个适配器选择配置")
+            return None
+        
+        return NetworkScene(name, assignments)
+
 class SystemTrayApp:
     """系统托盘应用"""
     
@@ -211,8 +337,13 @@ class SystemTrayApp:
         
         self.init_tray()
         
+        # 网络变化通知（系统通知不可用时轮询），先于主界面订阅，保证主界面刷新前快照已失效
+        self.change_notifier = ChangeNotifier(self.network_manager.state_fingerprint)
+        self.change_notifier.changed.connect(self.on_network_changed)
+        
         # 初始化主界面
         self.init_main_window()
+        self.update_tooltip()
     
     def auto_select_adapter(self):
         """自动选择第一个可用的适配器"""
@@ -257,8 +388,19 @@ class SystemTrayApp:
         self.tray_icon.setIcon(self.create_icon())
         self.tray_icon.setToolTip("网络配置切换工具")
         
-        # 创建右键菜单
-        self.create_menu()
+        # 右键菜单在每次打开时按需生成
+        self.config_groups = ConfigGroups()
+        self._group_menus = {}
+        self._menu_stale = True
+        self._usage_revision = None
+        # 配置较多时菜单顶部显示搜索框，搜索结果插入在 _search_anchor 之前
+        self._search_action = None
+        self._search_anchor = None
+        self._search_results = []
+        self.menu = QMenu()
+        self.menu.aboutToShow.connect(self.populate_menu)
+        self.menu.aboutToHide.connect(lambda: self._search_action and self._search_edit.clear())
+        self.tray_icon.setContextMenu(self.menu)
         
         # 显示托盘图标
         self.tray_icon.show()
@@ -266,9 +408,24 @@ class SystemTrayApp:
         # 连接信号
         self.tray_icon.activated.connect(self.on_tray_activated)
     
-    def create_menu(self):
-        """创建右键菜单"""
-        menu = QMenu()
+    def invalidate_menu(self):
+        """适配器、场景等变化后，下次打开菜单时重新生成顶层菜单（配置的变化按修订号自动检测）"""
+        self._menu_stale = True
+    
+    def populate_menu(self):
+        """打开菜单前更新：顶层只在有变化时重新生成，分组子菜单在展开时才生成"""
+        start = time.perf_counter()
+        configs_changed = self.config_groups.sync(self.network_manager.configs,
+                                                  self.network_manager.config_revision)
+        usage_changed = self.network_manager.usage.revision != self._usage_revision
+        if not (self._menu_stale or configs_changed or usage_changed):
+            self._focus_menu_search()
+            return
+        
+        menu = self.menu
+        menu.clear()
+        self._search_anchor = None
+        self._search_results = []
         
         # 主界面选项
         main_window_action = QAction("打开主界面", menu)
@@ -284,11 +441,29 @@ class SystemTrayApp:
             menu.addAction(adapter_action)
             menu.addSeparator()
         
-        # 网络配置选项
-        for config in self.network_manager.configs:
-            action = QAction(config.name, menu)
-            action.triggered.connect(lambda checked, c=config: self.apply_config(c))
-            menu.addAction(action)
+        # 网络配置选项：配置不多时直接列出，否则显示最近使用、常用和按标签分组的子菜单
+        if len(self.config_groups) <= MENU_INLINE_LIMIT:
+            for config in self.network_manager.configs:
+                self._add_config_action(menu, config)
+        else:
+            menu.addAction(self._menu_search_action())
+            self._search_anchor = menu.addSeparator()
+            sections = usage_sections(self.network_manager.usage, self.network_manager.get_config_by_name)
+            for title, key in (("最近使用", 'recent'), ("常用", 'frequent')):
+                if sections[key]:
+                    menu.addSection(title)
+                    for config in sections[key]:
+                        self._add_config_action(menu, config)
+            menu.addSection(f"全部配置 ({len(self.config_groups)})")
+            self._add_group_menus(menu)
+        
+        # 多适配器场景
+        if self.network_manager.scenes:
+            scene_menu = menu.addMenu("场景")
+            for scene in self.network_manager.scenes:
+                action = QAction(scene.name, scene_menu)
+                action.triggered.connect(lambda checked, s=scene: self.apply_scene(s))
+                scene_menu.addAction(action)
         
         menu.addSeparator()
         
@@ -312,20 +487,123 @@ class SystemTrayApp:
         quit_action.triggered.connect(self.quit_app)
         menu.addAction(quit_action)
         
-        self.tray_icon.setContextMenu(menu)
+        self._menu_stale = False
+        self._usage_revision = self.network_manager.usage.revision
+        self._focus_menu_search()
+        elapsed = (time.perf_counter() - start) * 1000
+        if elapsed > MENU_BUDGET_MS:
+            print(f"托盘菜单生成用时 {elapsed:.1f}ms，超过预算 {MENU_BUDGET_MS}ms")
     
-    def select_adapter(self):
-        """选择网络适配器"""
-        adapters = self.network_manager.get_network_adapters()
+    def _menu_search_action(self):
+        """菜单顶部的搜索框（只创建一次，父对象不是菜单，清空菜单时不会被删除）"""
+        if self._search_action is None:
+            self._search_edit = QLineEdit()
+            self._search_edit.setPlaceholderText("搜索配置，回车应用第一项")
+            self._search_edit.textChanged.connect(self.on_menu_search)
+            self._search_edit.returnPressed.connect(self.apply_first_search_result)
+            self._search_action = QWidgetAction(self.tray_icon)
+            self._search_action.setDefaultWidget(self._search_edit)
+        return self._search_action
+    
+    def _focus_menu_search(self):
+        """菜单显示后把键盘焦点交给搜索框，打开菜单即可直接输入"""
+        if self._search_anchor is not None:
+            QTimer.singleShot(0, lambda: self._search_edit.setFocus(Qt.PopupFocusReason))
+    
+    def on_menu_search(self, text):
+        """搜索框内容变化：在搜索框下方列出匹配的配置"""
+        for action in self._search_results:
+            self.menu.removeAction(action)
+            action.deleteLater()
+        self._search_results = []
+        query = text.strip()
+        if not query or self._search_anchor is None:
+            return
         
-        if not adapters:
-            QMessageBox.warning(None, "警告", "未找到可用的网络适配器")
+        configs = self.network_manager.search_configs(query, MENU_SEARCH_LIMIT + 1)
+        for config in configs[:MENU_SEARCH_LIMIT]:
+            action = QAction(config.name, self.menu)
+            action.triggered.connect(lambda checked, name=config.name: self.apply_config_by_name(name))
+            self._search_results.append(action)
+        if not configs or len(configs) > MENU_SEARCH_LIMIT:
+            action = QAction("没有匹配的配置" if not configs else "更多结果请输入更多内容…", self.menu)
+            action.setEnabled(False)
+            self._search_results.append(action)
+        for action in self._search_results:
+            self.menu.insertAction(self._search_anchor, action)
+    
+    def apply_first_search_result(self):
+        """在搜索框中按回车：应用第一个匹配的配置"""
+        query = self._search_edit.text().strip()
+        configs = self.network_manager.search_configs(query, 1) if query else []
+        if configs:
+            self.menu.hide()
+            self.apply_config(configs[0])
+    
+    def _add_group_menus(self, menu):
+        """添加分组子菜单：已有的子菜单对象保留，只更新标题，内容在展开时按需重新生成"""
+        for tag in list(self._group_menus):
+            if tag not in self.config_groups.groups:
+                self._group_menus.pop(tag).deleteLater()
+        for tag in self.config_groups.titles():
+            group_menu = self._group_menus.get(tag)
+            if group_menu is None:
+                group_menu = self._group_menus[tag] = QMenu(menu)
+                group_menu.aboutToShow.connect(lambda tag=tag, m=group_menu: self.populate_group_menu(tag, m))
+            group_menu.setTitle(f"{tag} ({len(self.config_groups.groups[tag])})")
+            menu.addMenu(group_menu)
+    
+    def populate_group_menu(self, tag, group_menu):
+        """展开分组子菜单时生成其中的配置（分组没有变化时复用上次生成的内容），较长的分组再分页"""
+        if not self.config_groups.take_dirty(tag) and not group_menu.isEmpty():
+            return
+        for page_menu in group_menu.findChildren(QMenu):
+            page_menu.deleteLater()
+        group_menu.clear()
+        entries = self.config_groups.entries(tag)
+        if len(entries) <= MENU_PAGE_SIZE:
+            for config in entries:
+                self._add_config_action(group_menu, config)
             return
+        for title, chunk in pages(entries, MENU_PAGE_SIZE):
+            page_menu = QMenu(title, group_menu)
+            page_menu.aboutToShow.connect(lambda m=page_menu, c=chunk: m.isEmpty() and self._add_config_actions(m, c))
+            group_menu.addMenu(page_menu)
+    
+    def _add_config_actions(self, menu, configs):
+        for config in configs:
+            self._add_config_action(menu, config)
+    
+    def _add_config_action(self, menu, config):
+        """添加切换到配置的菜单项（按名称查找配置，编辑后的菜单项不会使用旧的配置对象）"""
+        action = QAction(config.name, menu)
+        action.triggered.connect(lambda checked, name=config.name: self.apply_config_by_name(name))
+        menu.addAction(action)
+    
+    def apply_config_by_name(self, name):
+        """按名称应用配置"""
+        config = self.network_manager.get_config_by_name(name)
+        if config is None:
+            QMessageBox.warning(None, "警告", f"配置 '{name}' 不存在")
+            return
+        self.apply_config(config)
+    
+    def select_adapter(self):
+        """选择网络适配器"""
+        if self.main_window is None:
+            self.init_main_window()
         
-        dialog = AdapterSelectionDialog(adapters)
+        # 对话框先显示，适配器在后台枚举时逐个加入
+        dialog = AdapterSelectionDialog()
+        self.main_window.async_bridge.stream(
+            self.main_window.async_manager.iter_network_adapters(refresh=True),
+            dialog.add_adapter,
+            dialog.finish_loading,
+            lambda error: dialog.finish_loading(0)
+        )
         if dialog.exec_() == QDialog.Accepted:
             self.current_adapter = dialog.get_selected_adapter()
-            self.create_menu()  # 重新创建菜单
+            self.invalidate_menu()
             
             # 更新主界面
             if self.main_window:
@@ -338,24 +616,64 @@ class SystemTrayApp:
             return
         
         try:
-            success = self.network_manager.apply_config(self.current_adapter.name, config)
-            if success:
+            plan = self.network_manager.apply_config(self.current_adapter.name, config)
+            finished = time.monotonic()
+            if plan and plan.is_noop:
                 self.tray_icon.showMessage(
                     "网络配置",
-                    f"已切换到配置: {config.name}",
+                    f"当前已是配置: {config.name}",
                     QSystemTrayIcon.Information,
                     3000
                 )
+            elif plan:
+                # 网络就绪后再提示（由主界面在后台等待）
+                self.tray_icon.setToolTip(f"网络配置切换工具 - 正在切换到: {config.name}")
+                self.main_window.wait_until_ready(self.current_adapter, config, finished)
             else:
                 self.tray_icon.showMessage(
                     "网络配置",
-                    f"切换配置失败: {config.name}",
+                    f"切换配置失败: {config.name}\n{plan}",
                     QSystemTrayIcon.Critical,
                     3000
                 )
         except Exception as e:
             QMessageBox.critical(None, "错误", f"应用配置时发生错误: {str(e)}")
     
+    def apply_scene(self, scene):
+        """应用多适配器场景（由主界面在后台执行）"""
+        if self.main_window is None:
+            self.init_main_window()
+        self.tray_icon.setToolTip(f"网络配置切换工具 - 正在应用场景: {scene.name}")
+        self.main_window.apply_scene(scene)
+    
+    def on_scene_applied(self, scene, result):
+        """场景应用完成"""
+        self.tray_icon.setToolTip("网络配置切换工具")
+        self.tray_icon.showMessage(
+            "网络场景",
+            f"场景 {scene.name}: {result}",
+            QSystemTrayIcon.Information if result else QSystemTrayIcon.Warning,
+            5000
+        )
+    
+    def on_adapter_ready(self, adapter, config, result):
+        """切换后网络就绪（或等待超时）"""
+        self.tray_icon.setToolTip("网络配置切换工具")
+        if result:
+            self.tray_icon.showMessage(
+                "网络配置",
+                f"已切换到配置: {config.name}\n{result}",
+                QSystemTrayIcon.Information,
+                3000
+            )
+        else:
+            self.tray_icon.showMessage(
+                "网络配置",
+                f"已切换到配置: {config.name}\n{result}",
+                QSystemTrayIcon.Warning,
+                5000
+            )
+    
     def new_config(self):
         """新建配置"""
         dialog = NetworkConfigDialog()
@@ -363,7 +681,9 @@ class SystemTrayApp:
             config = dialog.get_config()
             if config:
                 self.network_manager.add_config(config)
-                self.create_menu()  # 重新创建菜单
+                if self.main_window:
+                    # 主界面不再定时重建配置列表
+                    self.main_window.refresh_config_list()
                 QMessageBox.information(None, "成功", f"配置 '{config.name}' 已保存")
     
     def edit_config(self):
@@ -386,16 +706,17 @@ class SystemTrayApp:
         if dialog.exec_() == QDialog.Accepted:
             new_config = dialog.get_config()
             if new_config:
-                # 删除旧配置，添加新配置
-                self.network_manager.remove_config(config_to_edit.name)
-                self.network_manager.add_config(new_config)
-                self.create_menu()  # 重新创建菜单
+                # 原位更新，保持配置在列表中的位置
+                self.network_manager.update_config(config_to_edit.name, new_config)
+                if self.main_window:
+                    # 主界面不再定时重建配置列表
+                    self.main_window.refresh_config_list()
                 QMessageBox.information(None, "成功", f"配置已更新")
     
     def init_main_window(self):
         """初始化主界面"""
         from main_window import MainWindow
-        self.main_window = MainWindow(self.network_manager, self.current_adapter)
+        self.main_window = MainWindow(self.network_manager, self.current_adapter, self.change_notifier)
         self.main_window.tray_app = self  # 设置托盘应用引用
         # 程序启动时自动显示主界面
         self.main_window.show()
@@ -410,6 +731,27 @@ class SystemTrayApp:
         self.main_window.raise_()
         self.main_window.activateWindow()
     
+    def on_network_changed(self, kinds):
+        """网络发生变化：丢弃系统状态快照，更新托盘提示"""
+        print(f"检测到网络变化: {', '.join(sorted(kinds))}")
+        self.network_manager.invalidate_cache()
+        self.update_tooltip()
+    
+    def update_tooltip(self):
+        """托盘提示显示当前适配器的地址"""
+        adapter = self.current_adapter
+        if adapter is None or self.main_window is None:
+            return
+        
+        def show(config):
+            if adapter is not self.current_adapter:
+                return
+            address = "DHCP" if config and config.get('dhcp') else (config or {}).get('ip', "未知")
+            self.tray_icon.setToolTip(f"网络配置切换工具\n{adapter.description}: {address}")
+        
+        self.main_window.async_bridge.submit(
+            self.main_window.async_manager.get_current_config(adapter.name), show)
+    
     def on_tray_activated(self, reason):
         """托盘图标激活事件"""
         if reason == QSystemTrayIcon.DoubleClick:
@@ -420,6 +762,8 @@ class SystemTrayApp:
         if self.main_window:
             self.main_window.close()
         self.tray_icon.hide()
+        self.change_notifier.stop()
+        self.network_manager.close()
         self.app.quit()
     
     def run(self):
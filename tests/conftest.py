@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# 项目是平铺的模块结构，测试时把项目根目录加入导入路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from command_runner import ReplayRunner
+from network_manager import NetworkManager
+
+FAKE_NETSH = os.path.join(ROOT, 'fixtures', 'fake_netsh.py')
+
+
+class RecordingRunner(ReplayRunner):
+    """记录实际执行的命令（命令行和标准输入）的回放执行器"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executed = []
+
+    def _execute(self, args, input, timeout):
+        self.executed.append((list(args), input))
+        return super()._execute(args, input, timeout)
+
+
+@pytest.fixture(params=['zh_CN', 'en_US'])
+def locale(request):
+    return request.param
+
+
+@pytest.fixture
+def runner(locale):
+    runner = ReplayRunner.from_fixture(locale)
+    return RecordingRunner(runner.responses, encoding=runner.console_encoding,
+                           unknown_command=runner.unknown_command)
+
+
+@pytest.fixture
+def manager(runner, tmp_path, monkeypatch):
+    # 配置、场景和使用记录文件都在当前目录下
+    monkeypatch.chdir(tmp_path)
+    manager = NetworkManager(runner=runner)
+    manager._is_admin = lambda: True
+    return manager
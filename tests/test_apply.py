@@ -0,0 +1,123 @@
+import pytest
+
+from network_manager import NetworkConfig
+
+ADAPTERS = {'zh_CN': '以太网', 'en_US': 'Ethernet'}
+DNS_ERRORS = {
+    'zh_CN': "配置的 DNS 服务器不正确或不存在。",
+    'en_US': "The configured DNS server is incorrect or does not exist.",
+}
+ADDRESS_ERRORS = {
+    'zh_CN': "对象已存在。",
+    'en_US': "The object already exists.",
+}
+
+
+@pytest.fixture
+def adapter(locale):
+    return ADAPTERS[locale]
+
+
+def current_profile(manager, adapter, **changes):
+    current = manager.get_current_config(adapter)
+    return NetworkConfig(**dict(NetworkConfig.from_current('目标', current).to_dict(), **changes))
+
+
+def executed_commands(runner):
+    """回放执行器收到的netsh脚本中的命令（去掉标记和exit）"""
+    commands = []
+    for args, input in runner.executed:
+        if args == ['netsh'] and input is not None:
+            commands.extend(line for line in input.decode(runner.console_encoding).splitlines()
+                            if not line.startswith('__netswitch_') and line != 'exit')
+    return commands
+
+
+def test_same_config_runs_no_commands(manager, runner, adapter):
+    target = current_profile(manager, adapter)
+    runner.executed.clear()
+    plan = manager.apply_config(adapter, target)
+    assert plan.success and plan.is_noop
+    assert executed_commands(runner) == []
+
+
+def test_only_dns_is_rewritten(manager, runner, adapter):
+    target = current_profile(manager, adapter, dns1='223.5.5.5', dns2=None)
+    runner.executed.clear()
+    plan = manager.apply_config(adapter, target)
+    assert plan.success
+    assert (plan.address, plan.dns, plan.skipped) == (False, True, ['address'])
+    assert executed_commands(runner) == [f'interface ip set dns name={adapter} static 223.5.5.5 validate=no']
+
+
+def test_only_address_is_rewritten(manager, runner, adapter):
+    target = current_profile(manager, adapter, ip='192.168.7.10', subnet='255.255.255.0', gateway='192.168.7.1')
+    runner.executed.clear()
+    plan = manager.apply_config(adapter, target)
+    assert plan.success
+    assert plan.skipped == ['dns']
+    assert executed_commands(runner) == [
+        f'interface ip set address name={adapter} static 192.168.7.10 255.255.255.0 192.168.7.1']
+
+
+def test_dhcp_to_dhcp_without_static_dns_is_noop(manager, runner, adapter):
+    plan = manager.apply_config(adapter, NetworkConfig('DHCP', dhcp=True),
+                                current_configs={adapter: {'dhcp': True, 'ip': '10.0.0.8'}})
+    assert plan.is_noop
+
+
+def test_invalid_config_is_rejected_before_running_netsh(manager, runner, adapter):
+    runner.executed.clear()
+    plan = manager.apply_config(adapter, NetworkConfig('坏配置', ip='192.168.1.0', subnet='255.255.255.0'))
+    assert not plan.success
+    assert '网络地址' in plan.error
+    assert runner.executed == []
+
+
+def test_failed_command_rolls_back_what_was_rewritten(manager, runner, locale, adapter):
+    original = current_profile(manager, adapter)
+    target = current_profile(manager, adapter, ip='192.168.7.10', gateway='192.168.7.1', dns1='223.5.5.5', dns2=None)
+    failing = f"netsh interface ip set dns name={adapter} static 223.5.5.5 validate=no"
+    runner.responses = dict({failing: (0, DNS_ERRORS[locale], '')}, **runner.responses)
+    runner.executed.clear()
+
+    plan = manager.apply_config(adapter, target)
+
+    assert not plan.success
+    assert [result.ok for result in plan.results] == [True, False]
+    assert plan.rolled_back
+    assert plan.rollback_seconds is not None
+    # 地址和DNS都被改写过，恢复时两部分都恢复为切换前的配置
+    rollback = executed_commands(runner)[len(plan.results):]
+    assert rollback == [
+        f'interface ip set address name={adapter} static {original.ip} {original.subnet} {original.gateway}',
+        f'interface ip set dns name={adapter} static {original.dns1} validate=no',
+        f'interface ip add dns name={adapter} {original.dns2} index=2 validate=no',
+    ]
+
+
+def test_rollback_only_restores_the_rewritten_part(manager, runner, locale, adapter):
+    target = current_profile(manager, adapter, dns1='223.5.5.5', dns2=None)
+    failing = f"netsh interface ip set dns name={adapter} static 223.5.5.5 validate=no"
+    runner.responses = dict({failing: (0, DNS_ERRORS[locale], '')}, **runner.responses)
+    runner.executed.clear()
+
+    plan = manager.apply_config(adapter, target)
+
+    assert plan.rolled_back
+    rollback = executed_commands(runner)[len(plan.results):]
+    assert all(' dns ' in command for command in rollback)
+
+
+def test_incomplete_previous_config_is_not_rolled_back(manager, runner, locale, adapter):
+    failing = f"netsh interface ip set address name={adapter} static 192.168.7.10 255.255.255.0"
+    runner.responses = dict({failing: (0, ADDRESS_ERRORS[locale], '')}, **runner.responses)
+    runner.executed.clear()
+
+    plan = manager.apply_config(adapter, NetworkConfig('目标', ip='192.168.7.10', subnet='255.255.255.0'),
+                                current_configs={adapter: {'dhcp': False, 'ip': '192.168.1.50'}})
+
+    assert not plan.success
+    assert plan.rollback_error
+    assert plan.rollback_results == []
+    assert executed_commands(runner) == [f'interface ip set address name={adapter} static 192.168.7.10 255.255.255.0']
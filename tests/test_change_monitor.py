@@ -0,0 +1,56 @@
+import threading
+import time
+
+from change_monitor import ADDRESS, ChangeSource, PollingChangeSource
+
+
+class FailingSource(ChangeSource):
+    """每次等待都立即出错的通知源（模拟 WaitForMultipleObjects 返回 WAIT_FAILED）"""
+
+    name = 'failing'
+    retry_interval = 0.05
+
+    def __init__(self):
+        super().__init__(debounce=0.0)
+        self.waits = 0
+        self.closed = threading.Event()
+
+    def _wait(self, timeout):
+        self.waits += 1
+        raise OSError("WAIT_FAILED")
+
+    def _close(self):
+        self.closed.set()
+
+
+def test_wait_failures_back_off_without_fallback():
+    source = FailingSource()
+    source.start(lambda kinds: None)
+    time.sleep(0.3)
+    source.stop()
+    # 每次出错后等待 retry_interval，而不是立即重试
+    assert 1 <= source.waits <= 10
+
+
+def test_repeated_wait_failures_switch_to_polling():
+    state = {ADDRESS: 1}
+    changes = []
+    received = threading.Event()
+    source = FailingSource()
+    source.fallback = PollingChangeSource(lambda: dict(state), interval=0.05)
+
+    def callback(kinds):
+        changes.append(kinds)
+        received.set()
+
+    source.start(callback)
+    try:
+        assert source.closed.wait(2)
+        assert source.waits == source.max_failures
+        state[ADDRESS] = 2
+        assert received.wait(2)
+        assert changes[0] == {ADDRESS}
+    finally:
+        source.stop()
+    assert source._active_fallback is None
+    assert source.fallback._thread is None
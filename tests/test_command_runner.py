@@ -0,0 +1,52 @@
+import pytest
+
+from command_policy import CircuitBreaker, CommandPolicy
+from command_runner import CommandResult, CommandRunner
+
+PING = ['ping', '-n', '1', '10.0.0.1']
+
+
+class FixedRunner(CommandRunner):
+    """每次返回相同返回码的执行器"""
+
+    def __init__(self, returncode=0, timed_out=False):
+        super().__init__(CommandPolicy(failure_threshold=3))
+        self.returncode = returncode
+        self.timed_out = timed_out
+
+    def _execute(self, args, input, timeout):
+        return CommandResult(args, self.returncode, timed_out=self.timed_out)
+
+
+def run_times(runner, count):
+    return [runner.run(PING) for _ in range(count)]
+
+
+def test_timeouts_open_the_breaker():
+    runner = FixedRunner(-1, timed_out=True)
+    results = run_times(runner, 4)
+    assert [result.rejected for result in results] == [False, False, False, True]
+    assert runner.policy.breaker_for(PING).state == CircuitBreaker.OPEN
+    assert runner.metrics()['ping']['timeouts'] == 3
+
+
+@pytest.mark.parametrize('returncode', [-1, -9, 0xC0000005])
+def test_abnormal_exits_open_the_breaker(returncode):
+    runner = FixedRunner(returncode)
+    assert run_times(runner, 4)[-1].rejected
+
+
+def test_nonzero_exit_codes_do_not_open_the_breaker():
+    # ping 目标不可达时返回1，是确定的应答
+    runner = FixedRunner(1)
+    assert not any(result.rejected for result in run_times(runner, 10))
+    assert runner.policy.breaker_for(PING).state == CircuitBreaker.CLOSED
+
+
+def test_breakers_are_per_command_class():
+    runner = FixedRunner(-1, timed_out=True)
+    run_times(runner, 3)
+    runner.timed_out = False
+    runner.returncode = 0
+    assert runner.run(PING).rejected
+    assert not runner.run(['ipconfig', '/all']).rejected
@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+import ipv4
+from network_manager import NetworkConfig
+
+
+def test_mask_table_round_trip():
+    for prefix in range(33):
+        netmask = ipv4.prefix_to_netmask(prefix)
+        assert ipv4.netmask_to_prefix(netmask) == prefix
+        assert ipv4.netmask_to_prefix(ipv4.pack(netmask)) == prefix
+    assert ipv4.prefix_to_netmask(24) == '255.255.255.0'
+    assert ipv4.prefix_to_netmask(0) == '0.0.0.0'
+
+
+@pytest.mark.parametrize('netmask', ['255.0.255.0', '255.255.255.1', '255.255.255', '24'])
+def test_invalid_netmask(netmask):
+    assert not ipv4.is_valid_netmask(netmask)
+    with pytest.raises(ValueError):
+        ipv4.netmask_to_prefix(netmask)
+
+
+@pytest.mark.parametrize('prefix', [-1, 33])
+def test_prefix_out_of_range(prefix):
+    with pytest.raises(ValueError):
+        ipv4.prefix_to_netmask(prefix)
+
+
+def test_compact_round_trip():
+    for text in ['192.168.1.1', '010.0.0.1', '10.1', '', None, 'abc']:
+        assert ipv4.expand(ipv4.compact(text)) == text
+    assert ipv4.compact('192.168.1.1') == 0xC0A80101
+
+
+@pytest.mark.parametrize('ip, subnet, gateway', [
+    ('192.168.1.0', '255.255.255.0', None),      # 网络地址
+    ('192.168.1.255', '255.255.255.0', None),    # 广播地址
+    ('192.168.1.10', '255.0.255.0', None),       # 掩码不连续
+    ('192.168.1.10', '255.255.255.0', '192.168.1.10'),
+    ('192.168.1.10', None, None),
+    ('192.168.1.300', '255.255.255.0', None),
+])
+def test_invalid_static_config_is_rejected(ip, subnet, gateway):
+    assert NetworkConfig('x', ip=ip, subnet=subnet, gateway=gateway).validate()
+
+
+def test_point_to_point_prefixes_have_no_network_address():
+    assert NetworkConfig('x', ip='10.0.0.0', subnet='255.255.255.254').validate() is None
+    assert NetworkConfig('x', ip='10.0.0.0', subnet='255.255.255.255').validate() is None
+
+
+def test_off_subnet_gateway_is_only_a_warning():
+    config = NetworkConfig('公司网络', ip='10.2.3.245', subnet='255.255.255.0', gateway='10.1.0.1')
+    assert config.validate() is None
+    assert '10.1.0.1' in config.warning()
+    on_subnet = NetworkConfig('x', ip='10.2.3.245', subnet='255.255.255.0', gateway='10.2.3.1')
+    assert on_subnet.warning() is None
+
+
+def test_shipped_profiles_are_valid():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'network_configs.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        configs = [NetworkConfig.from_dict(item) for item in json.load(f)]
+    assert configs
+    for config in configs:
+        assert config.validate() is None, config.name
@@ -0,0 +1,93 @@
+import pytest
+
+from netsh_script import NetshScript
+
+
+def make_script(*commands):
+    script = NetshScript()
+    for command in commands:
+        script.add(command)
+    return script
+
+
+def echo_output(script, outputs, unknown='The following command was not found: {command}.'):
+    """模拟交互式netsh的输出：每条命令的输出之后是标记命令的"找不到命令"提示"""
+    lines = []
+    for index, output in enumerate(outputs):
+        lines.append(f"netsh>{output}" if output else "netsh>")
+        lines.append(unknown.format(command=script._marker(index)))
+    return '\r\n'.join(lines) + '\r\n'
+
+
+SET_ADDRESS = ['interface', 'ip', 'set', 'address', 'name=以太网 2', 'dhcp']
+SET_DNS = ['interface', 'ip', 'set', 'dns', 'name=以太网 2', 'static', '223.5.5.5', 'validate=no']
+
+
+def test_render_quotes_arguments_with_spaces():
+    script = make_script(['netsh'] + SET_ADDRESS)
+    lines = script.render().splitlines()
+    assert lines[0] == 'interface ip set address name="以太网 2" dhcp'
+    assert lines[1] == script._marker(0)
+    assert lines[-1] == 'exit'
+
+
+def test_parse_output_success():
+    script = make_script(SET_ADDRESS, SET_DNS)
+    results = script.parse_output(echo_output(script, ['', 'Ok.']))
+    assert [result.ok for result in results] == [True, True]
+
+
+def test_parse_output_failure_is_attributed_to_its_command():
+    script = make_script(SET_ADDRESS, SET_DNS)
+    error = "配置的 DNS 服务器不正确或不存在。"
+    results = script.parse_output(echo_output(script, ['', error], '找不到下列命令: {command}。'))
+    assert [result.ok for result in results] == [True, False]
+    assert results[1].output == error
+
+
+def test_parse_output_netsh_exited_early():
+    script = make_script(SET_ADDRESS, SET_DNS)
+    results = script.parse_output(echo_output(script, [''])[:-2])
+    assert [(result.ok, result.unknown) for result in results] == [(True, False), (False, False)]
+
+
+def test_parse_output_incomplete_marks_rest_unknown():
+    script = make_script(SET_ADDRESS, SET_DNS)
+    results = script.parse_output(echo_output(script, ['']), complete=False)
+    assert results[0].ok
+    assert results[1].unknown and not results[1].ok
+
+
+@pytest.mark.parametrize('output', [
+    'Ok.',
+    '确定。',
+    'DHCP is already enabled on this interface.',
+    '此接口上已启用 DHCP。',
+])
+def test_informational_output_is_success(output):
+    script = make_script(SET_ADDRESS)
+    results = script.parse_output(echo_output(script, [output]))
+    assert results[0].ok
+    assert results[0].output == output
+
+
+@pytest.mark.parametrize('output', [
+    'The configured DNS server is incorrect or does not exist.',
+    '配置的 DNS 服务器不正确或不存在。',
+    'The object already exists.',
+    '对象已存在。',
+    'The filename, directory name, or volume label syntax is incorrect.',
+    '文件名、目录名或卷标语法不正确。',
+    'The requested operation requires elevation (Run as administrator).',
+    '请求的操作需要提升(作为管理员运行)。',
+    'Element not found.',
+    '找不到元素。',
+    'Invalid address parameter (192.168.1.300).',
+    'The parameter is incorrect.',
+    '参数错误。',
+])
+def test_error_output_is_failure(output):
+    script = make_script(SET_ADDRESS)
+    results = script.parse_output(echo_output(script, [output]))
+    assert not results[0].ok
+    assert not results[0].unknown
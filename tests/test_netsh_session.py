@@ -0,0 +1,131 @@
+import sys
+
+import pytest
+
+from command_policy import CommandPolicy
+from conftest import FAKE_NETSH
+from netsh_script import NetshScript
+from netsh_session import NetshSession, NetshSessionRunner
+from network_manager import NetworkConfig, NetworkManager
+
+SHOW_CONFIG = ['netsh', 'interface', 'ip', 'show', 'config']
+SET_DHCP = ['interface', 'ip', 'set', 'address', 'name=Ethernet', 'dhcp']
+# 启动后从不应答的"netsh"
+SILENT_NETSH = [sys.executable, '-c', 'import sys, time\nsys.stdin.readline()\ntime.sleep(60)']
+# 卡死的测试不必等待默认的超时时间
+SHORT_TIMEOUTS = {'netsh_query': 1.0, 'netsh_apply': 1.0}
+
+
+def make_runner(runner, command):
+    session_runner = NetshSessionRunner(runner, NetshSession(command))
+    session_runner.policy = CommandPolicy(SHORT_TIMEOUTS)
+    return session_runner
+
+
+@pytest.fixture
+def session_runner(runner, locale):
+    session_runner = make_runner(runner, [sys.executable, FAKE_NETSH, locale])
+    yield session_runner
+    session_runner.close()
+
+
+@pytest.fixture
+def silent_runner(runner):
+    session_runner = make_runner(runner, SILENT_NETSH)
+    yield session_runner
+    session_runner.close()
+
+
+def test_queries_share_one_process(session_runner, runner):
+    first = session_runner.run(SHOW_CONFIG)
+    second = session_runner.run(SHOW_CONFIG)
+    assert first.returncode == 0
+    assert first.stdout == second.stdout
+    assert first.stdout.strip() == runner.run(SHOW_CONFIG).stdout.strip()
+    assert session_runner.session.spawn_count == 1
+    # 只有上面直接调用回放执行器的一次
+    assert runner.executed == [(SHOW_CONFIG, None)]
+
+
+def test_restart_after_hang_timeout(session_runner):
+    session = session_runner.session
+    assert session_runner.run(SHOW_CONFIG).returncode == 0
+    result = session_runner.run(['netsh', '__hang__'])
+    assert result.timed_out
+    assert session.last_failure == "无响应"
+    assert session.restart_count == 1
+    assert not session.broken
+    # 下一次请求启动新进程
+    assert session_runner.run(SHOW_CONFIG).returncode == 0
+    assert session.spawn_count == 2
+
+
+def test_restart_after_unexpected_exit(session_runner):
+    session = session_runner.session
+    assert session_runner.run(SHOW_CONFIG).returncode == 0
+    result = session_runner.run(['netsh', '__die__'])
+    assert result.returncode == -1 and not result.timed_out
+    assert session.last_failure == "意外退出"
+    assert session.restart_count == 1
+    assert session_runner.run(SHOW_CONFIG).returncode == 0
+    assert session.spawn_count == 2
+
+
+def test_session_that_never_answers_is_broken(silent_runner, runner):
+    session = silent_runner.session
+    result = silent_runner.run(SHOW_CONFIG)
+    assert session.broken
+    # 单条查询改为启动独立进程执行，之后不再使用会话
+    assert result.returncode == 0 and result.stdout
+    silent_runner.run(SHOW_CONFIG)
+    assert runner.executed == [(SHOW_CONFIG, None)] * 2
+    assert session.spawn_count == 1
+    assert silent_runner.metrics()['netsh_session']['broken']
+
+
+def test_script_is_not_executed_twice_when_session_is_broken(silent_runner, runner):
+    script = NetshScript()
+    script.add(SET_DHCP)
+    results = script.run(silent_runner)
+    assert silent_runner.session.broken
+    # 脚本可能已经在会话中生效，不能再交给独立进程执行
+    assert runner.executed == []
+    assert [(result.ok, result.unknown) for result in results] == [(False, True)]
+
+
+def test_script_hang_keeps_reported_results_and_is_not_retried(session_runner, runner):
+    assert session_runner.run(SHOW_CONFIG).returncode == 0
+    script = NetshScript()
+    script.add(SET_DHCP)
+    script.add(['__hang__'])
+    results = script.run(session_runner)
+    assert [(result.ok, result.unknown) for result in results] == [(True, False), (False, True)]
+    assert runner.executed == []
+    assert session_runner.session.spawn_count == 1
+    assert session_runner.session.restart_count == 1
+
+
+def test_unknown_outcome_rolls_back(session_runner, locale, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = NetworkManager(runner=session_runner)
+    manager._is_admin = lambda: True
+    adapter = {'zh_CN': '以太网', 'en_US': 'Ethernet'}[locale]
+    build = manager._build_apply_script
+
+    def hang_after_address(*args, **kwargs):
+        # 只让切换脚本在地址命令之后卡死，恢复脚本照常执行
+        script = build(*args, **kwargs)
+        if not hang_after_address.called:
+            script.commands.insert(1, ['__hang__'])
+            hang_after_address.called = True
+        return script
+    hang_after_address.called = False
+    manager._build_apply_script = hang_after_address
+
+    target = NetworkConfig('目标', ip='192.168.7.10', subnet='255.255.255.0', dns1='223.5.5.5')
+    plan = manager.apply_config(adapter, target)
+
+    assert not plan.success
+    assert plan.results[0].ok
+    assert all(result.unknown for result in plan.results[1:])
+    assert plan.rolled_back
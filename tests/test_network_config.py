@@ -0,0 +1,29 @@
+from network_manager import NetworkConfig
+
+DATA = {'name': '办公室', 'ip': '10.1.2.30', 'subnet': '255.255.255.0', 'gateway': '10.1.2.1',
+        'dns1': '223.5.5.5', 'dns2': None, 'dhcp': False, 'tags': ['office', '有线']}
+
+
+def test_to_dict_round_trip():
+    config = NetworkConfig.from_dict(DATA)
+    assert config.to_dict() == DATA
+    # 不规范的地址文本原样保留
+    odd = dict(DATA, ip='010.1.2.30', gateway='')
+    assert NetworkConfig.from_dict(odd).to_dict() == odd
+
+
+def test_equality_and_hash_include_tags():
+    config = NetworkConfig.from_dict(DATA)
+    same = NetworkConfig.from_dict(dict(DATA))
+    assert config == same and hash(config) == hash(same)
+    assert len({config, same}) == 1
+    assert config != NetworkConfig.from_dict(dict(DATA, tags=['office']))
+    assert config != NetworkConfig.from_dict(dict(DATA, dns2='223.6.6.6'))
+
+
+def test_tags_are_immutable():
+    tags = ['office']
+    config = NetworkConfig('x', dhcp=True, tags=tags)
+    tags.append('lab')
+    assert config.tags == ('office',)
+    assert NetworkConfig('y', dhcp=True).tags == ()
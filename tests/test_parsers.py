@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from conftest import ROOT
+from parsers import index_records, parse_ipconfig_all, parse_netsh_config
+
+
+def read_fixture(locale, name):
+    with open(os.path.join(ROOT, 'fixtures', locale, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_ipconfig_all_zh_cn():
+    records = parse_ipconfig_all(read_fixture('zh_CN', 'ipconfig_all.txt'))
+    assert [record.name for record in records] == ['以太网', '本地连接* 1', 'WLAN', '以太网 2', 'vEthernet (WSL)']
+    ethernet = records[0]
+    assert ethernet.description == 'Realtek PCIe GbE Family Controller'
+    assert ethernet.mac == '3C-7C-3F-12-34-56'
+    assert ethernet.dhcp is False
+    assert (ethernet.ipv4, ethernet.subnet) == ('192.168.124.233', '255.255.255.0')
+    assert ethernet.gateways == ['192.168.124.246']
+    # DNS 服务器的第二个地址在续行中
+    assert ethernet.dns_servers == ['114.114.114.114', '1.2.4.8']
+    assert ethernet.to_config() == {'dhcp': False, 'ip': '192.168.124.233', 'subnet': '255.255.255.0',
+                                    'gateway': '192.168.124.246', 'dns1': '114.114.114.114', 'dns2': '1.2.4.8'}
+    assert not records[1].has_ipv4
+
+
+def test_ipconfig_all_en_us():
+    records = parse_ipconfig_all(read_fixture('en_US', 'ipconfig_all.txt'))
+    wifi = index_records(records)['Intel(R) Wi-Fi 6E AX211 160MHz']
+    assert wifi.name == 'Wi-Fi'
+    assert wifi.dhcp is True
+    # "(Preferred)" 后缀被去掉
+    assert (wifi.ipv4, wifi.subnet) == ('10.20.30.40', '255.255.240.0')
+    assert wifi.dns_servers == ['10.20.0.53', '10.20.0.54']
+
+
+def test_ipconfig_all_ignores_other_text():
+    text = "Windows IP Configuration\r\n\r\n   Host Name . . . . . . . . . . . . : PC\r\n"
+    assert parse_ipconfig_all(text) == []
+
+
+@pytest.mark.parametrize('locale, name, expected', [
+    ('zh_CN', '以太网', (False, '192.168.124.233', '255.255.255.0', 24, '192.168.124.246',
+                         ['114.114.114.114', '1.2.4.8'], [])),
+    ('zh_CN', 'WLAN', (True, '10.0.0.57', '255.255.254.0', 23, '10.0.0.1', [], ['10.0.0.1'])),
+    ('zh_CN', '以太网 2', (True, None, None, None, None, [], [])),
+    ('en_US', 'Ethernet', (False, '192.168.1.50', '255.255.255.0', 24, '192.168.1.1', ['8.8.8.8', '8.8.4.4'], [])),
+    ('en_US', 'Wi-Fi', (True, '10.20.30.40', '255.255.240.0', 20, '10.20.16.1', [],
+                        ['10.20.0.53', '10.20.0.54'])),
+])
+def test_netsh_show_config(locale, name, expected):
+    records = parse_netsh_config(read_fixture(locale, 'netsh_show_config_all.txt'))
+    record = records[name]
+    assert (record.dhcp, record.ip, record.subnet, record.prefix_length, record.gateway,
+            record.static_dns, record.dhcp_dns) == expected
+
+
+def test_netsh_show_config_single_interface_matches_bulk(locale):
+    bulk = parse_netsh_config(read_fixture(locale, 'netsh_show_config_all.txt'))
+    name = 'netsh_show_config_ethernet.txt'
+    single = parse_netsh_config(read_fixture(locale, name))
+    assert len(single) == 1
+    (interface, record), = single.items()
+    assert vars(record) == vars(bulk[interface])
+
+
+def test_netsh_show_config_non_contiguous_mask_is_ignored():
+    text = ('Configuration for interface "Ethernet"\r\n'
+            '    DHCP enabled:                         No\r\n'
+            '    IP Address:                           192.168.1.50\r\n'
+            '    Subnet Prefix:                        192.168.1.0/24 (mask 255.0.255.0)\r\n')
+    record = parse_netsh_config(text)['Ethernet']
+    assert record.prefix_length == 24
+    assert record.subnet is None
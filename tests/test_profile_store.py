@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from network_manager import NetworkConfig
+from profile_store import ProfileStore, SqliteProfileStore
+
+
+def write_profiles(path, names):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([NetworkConfig(name, dhcp=True).to_dict() for name in names], f)
+
+
+def test_migrate_from_json_imports_into_empty_database(tmp_path):
+    json_path = tmp_path / 'network_configs.json'
+    write_profiles(json_path, ['办公室', '家里'])
+    store = SqliteProfileStore(str(tmp_path / 'profiles.db'), NetworkConfig)
+
+    assert store.migrate_from_json(str(json_path)) == 2
+    store.load()
+    assert [config.name for config in store.configs] == ['办公室', '家里']
+
+
+def test_migrate_from_json_keeps_existing_database(tmp_path):
+    db_path = str(tmp_path / 'profiles.db')
+    store = SqliteProfileStore(db_path, NetworkConfig)
+    store.load()
+    store.add(NetworkConfig('实验室', ip='10.0.0.2', subnet='255.255.255.0'))
+    store.close()
+
+    # 数据库中已有配置但没有迁移记录，同时JSON文件存在
+    json_path = tmp_path / 'network_configs.json'
+    write_profiles(json_path, ['办公室'])
+    store = SqliteProfileStore(db_path, NetworkConfig)
+    assert store.migrate_from_json(str(json_path)) == 0
+    store.load()
+    assert [config.name for config in store.configs] == ['实验室']
+    assert store.get('实验室').ip == '10.0.0.2'
+
+
+def profile_names(configs):
+    return [config.name for config in getattr(configs, 'configs', configs)]
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def make_store(request, tmp_path):
+    def make():
+        if request.param == 'json':
+            store = ProfileStore(str(tmp_path / 'network_configs.json'), NetworkConfig)
+        else:
+            store = SqliteProfileStore(str(tmp_path / 'profiles.db'), NetworkConfig)
+        store.load()
+        return store
+    return make
+
+
+def test_store_keeps_order_on_update_and_remove(make_store):
+    store = make_store()
+    store.replace_all([NetworkConfig(name, dhcp=True) for name in 'abcde'])
+
+    assert store.update('b', NetworkConfig('b2', dhcp=True))
+    assert profile_names(store) == ['a', 'b2', 'c', 'd', 'e']
+    # 改成已存在的名称：占用原位置，删除同名的另一项
+    assert store.update('d', NetworkConfig('a', ip='10.0.0.2', subnet='255.255.255.0'))
+    assert profile_names(store) == ['b2', 'c', 'a', 'e']
+    assert store.get('a').ip == '10.0.0.2'
+    assert store.remove('c')
+    assert not store.remove('c')
+    assert not store.update('c', NetworkConfig('c', dhcp=True))
+    store.add(NetworkConfig('b2', ip='10.0.0.3', subnet='255.255.255.0'))
+    store.add(NetworkConfig('f', dhcp=True))
+    assert profile_names(store) == ['b2', 'a', 'e', 'f']
+    assert [store.get(name).name for name in profile_names(store)] == profile_names(store)
+
+    assert list(make_store().configs) == list(store.configs)
+
+
+def test_store_batch_rolls_back(make_store):
+    store = make_store()
+    store.replace_all([NetworkConfig(name, dhcp=True) for name in 'abc'])
+    try:
+        with store.batch():
+            store.remove('a')
+            store.update('b', NetworkConfig('x', dhcp=True))
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert profile_names(store) == ['a', 'b', 'c']
+    assert store.get('b').name == 'b' and store.get('x') is None
+    store.remove('b')
+    assert profile_names(store) == ['a', 'c']
+    assert store.get('c').name == 'c'
+    assert profile_names(make_store()) == ['a', 'c']
+
+
+def test_store_lookups(make_store):
+    store = make_store()
+    store.replace_all([
+        NetworkConfig('a', ip='192.168.1.10', subnet='255.255.255.0', tags=['office']),
+        NetworkConfig('b', ip='192.168.1.20', subnet='255.255.255.0', tags=['lab']),
+        NetworkConfig('c', ip='10.0.0.5', subnet='255.0.0.0', tags=['office', 'lab']),
+        NetworkConfig('d', dhcp=True),
+    ])
+    assert profile_names(store.find_by_tag('office')) == ['a', 'c']
+    assert profile_names(store.find_by_tag('home')) == []
+    assert profile_names(store.find_by_subnet('192.168.1.0/24')) == ['a', 'b']
+    assert profile_names(store.find_by_subnet('10.20.30.40')) == ['c']
+    assert 'd' in store and 'e' not in store
+    store.update('a', NetworkConfig('a', ip='10.1.1.1', subnet='255.255.0.0', tags=['home']))
+    assert profile_names(store.find_by_tag('home')) == ['a']
+    assert profile_names(store.find_by_subnet('10.1.200.1')) == ['a', 'c']
+    assert profile_names(store.find_by_subnet('192.168.1.0/24')) == ['b']
@@ -0,0 +1,81 @@
+import random
+
+from network_manager import NetworkConfig
+from search_index import ProfileSearchIndex, config_tokens
+
+OFFICE = NetworkConfig('北京办公室', ip='10.1.2.30', subnet='255.255.255.0', gateway='10.1.2.1',
+                       dns1='223.5.5.5', tags=['office', '有线'])
+LAB = NetworkConfig('Lab-Bench_2', ip='192.168.50.8', subnet='255.255.254.0', tags=['lab'])
+HOME = NetworkConfig('家里 WiFi', dhcp=True, tags=['home'])
+
+
+def names(configs):
+    return [config.name for config in configs]
+
+
+def test_tokens():
+    tokens = config_tokens(LAB)
+    assert {'lab-bench_2', 'lab', 'bench', '2', '192.168.50.8', '255.255.254.0', '192.168.50.0/23'} <= tokens
+    # 连续的汉字索引每个后缀
+    assert {'北京办公室', '京办公室', '办公室', '公室', '室'} <= config_tokens(OFFICE)
+    assert 'dhcp' in config_tokens(HOME)
+
+
+def test_search_by_prefix_and_order():
+    index = ProfileSearchIndex([OFFICE, LAB, HOME])
+    assert names(index.search('')) == ['北京办公室', 'Lab-Bench_2', '家里 WiFi']
+    assert names(index.search('办公')) == ['北京办公室']
+    assert names(index.search('BENCH')) == ['Lab-Bench_2']
+    assert names(index.search('10.1.2')) == ['北京办公室']
+    assert names(index.search('192.168.50.0/23')) == ['Lab-Bench_2']
+    assert names(index.search('wifi dhcp')) == ['家里 WiFi']
+    assert names(index.search('wifi office')) == []
+    assert names(index.search('', limit=2)) == ['北京办公室', 'Lab-Bench_2']
+
+
+def test_incremental_updates_keep_position():
+    index = ProfileSearchIndex([OFFICE, LAB, HOME])
+    renamed = NetworkConfig('上海办公室', ip='10.9.0.5', subnet='255.255.255.0', tags=['office'])
+    index.add(renamed, replaces='北京办公室')
+    assert names(index.search('office')) == ['上海办公室']
+    assert index.search('10.1.2') == []
+    assert names(index.search('')) == ['上海办公室', 'Lab-Bench_2', '家里 WiFi']
+    assert index.remove('Lab-Bench_2')
+    assert not index.remove('Lab-Bench_2')
+    assert index.search('lab') == []
+    index.add(LAB)
+    assert names(index.search('')) == ['上海办公室', '家里 WiFi', 'Lab-Bench_2']
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(1)
+
+    def make(name):
+        return NetworkConfig(name, f"10.0.{rng.randint(0, 9)}.{rng.randint(2, 200)}", '255.255.255.0',
+                             dns1=f"8.8.{rng.randint(0, 3)}.8", tags=[rng.choice(['甲', '乙', '丙'])])
+
+    configs = [make(f"c{i}") for i in range(30)]
+    index = ProfileSearchIndex(configs)
+    for _ in range(500):
+        operation = rng.random()
+        if operation < 0.3 and configs:
+            config = configs.pop(rng.randrange(len(configs)))
+            index.remove(config.name)
+        elif operation < 0.6:
+            config = make(f"c{rng.randint(0, 100)}")
+            positions = [row for row, existing in enumerate(configs) if existing.name == config.name]
+            if positions:
+                configs[positions[0]] = config
+            else:
+                configs.append(config)
+            index.add(config)
+        elif configs:
+            row = rng.randrange(len(configs))
+            config = make(f"c{rng.randint(0, 100)}")
+            if config.name != configs[row].name and config.name in names(configs):
+                continue
+            index.add(config, replaces=configs[row].name)
+            configs[row] = config
+        rebuilt = ProfileSearchIndex(configs)
+        for query in ['10.0.1', '甲', 'c1', '8.8.2', 'c2 乙', '']:
+            assert names(index.search(query)) == names(rebuilt.search(query))